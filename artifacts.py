@@ -0,0 +1,93 @@
+##############################################################################
+#
+# downloading build artifacts from jenkins, files are streamed to disk,
+# partial downloads are resumed and up to date files skipped
+#
+##############################################################################
+
+import hashlib
+import os
+import urllib
+
+# size of chunks streamed from server to disk
+CHUNK_SIZE = 64 * 1024
+
+
+def md5_file(fpath):
+    """
+    Function returns md5 hex digest of given file, read in chunks
+    """
+    md5 = hashlib.md5()
+    with open(fpath, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def list_artifacts(build):
+    """
+    Function returns a python list of dicts with url, path and md5
+    (None if not fingerprinted) for artifacts of a build returned by
+    JenkinsCI.get_build_artifacts()
+    """
+    hashes = dict((f["fileName"], f["hash"])
+                  for f in build.get("fingerprint") or [])
+    return [{"url": "%sartifact/%s" % (build["url"], urllib.quote(
+                 a["relativePath"].encode("utf-8"))),
+             "path": a["relativePath"],
+             "md5": hashes.get(a["fileName"])}
+            for a in build.get("artifacts") or []]
+
+
+def download_artifact(jenkinsci, artifact, dest):
+    """
+    Function downloads an artifact to dest file
+
+    A file matching artifact's md5, or its size when artifact is not
+    fingerprinted, is skipped. Data is streamed into dest.part which is
+    resumed with a Range request if a previous download broke.
+
+    Returns 'skipped', 'resumed' or 'downloaded'
+    """
+    if os.path.exists(dest):
+        if artifact["md5"]:
+            if md5_file(dest) == artifact["md5"]:
+                return "skipped"
+        else:
+            resp = jenkinsci.open_url(artifact["url"], method="HEAD")
+            size = resp.headers.get("Content-Length")
+            resp.close()
+            if size is not None and int(size) == os.path.getsize(dest):
+                return "skipped"
+
+    parent = os.path.dirname(dest)
+    if parent and not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    part = "%s.part" % dest
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {"Range": "bytes=%d-" % offset} if offset else {}
+
+    resp = jenkinsci.open_url(artifact["url"], headers)
+    try:
+        if resp.status_code == 416:
+            # partial file is already complete
+            status = "resumed"
+        else:
+            resp.raise_for_status()
+
+            # server may ignore Range and send whole file
+            resumed = resp.status_code == 206
+            status = "resumed" if resumed else "downloaded"
+            with open(part, "ab" if resumed else "wb") as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+    finally:
+        resp.close()
+
+    if artifact["md5"] and md5_file(part) != artifact["md5"]:
+        os.remove(part)
+        raise Exception("md5 mismatch for '%s'" % artifact["path"])
+
+    os.rename(part, dest)
+    return status
@@ -0,0 +1,215 @@
+##############################################################################
+#
+# backups of jenkins job, folder and view configs
+#
+# Configs are fetched concurrently and written into a gzipped tar archive
+# as they arrive, with a manifest of their content hashes. An incremental
+# backup keeps only configs changed since its base backup, its manifest
+# points unchanged configs to the archive holding them.
+#
+##############################################################################
+
+import hashlib
+import json
+import os
+import tarfile
+import time
+import urllib
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
+
+MANIFEST = "manifest.json"
+
+# prefix and suffix of archive names in a backup directory
+ARCHIVE_PREFIX = "jenkins-"
+ARCHIVE_SUFFIX = ".tar.gz"
+
+
+def content_hash(data):
+    """
+    Function returns sha1 hex digest of a config
+    """
+    if isinstance(data, unicode):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def member_name(kind, name):
+    """
+    Function returns archive member name of a config of kind 'jobs' or
+    'views', folders of jobs become directories
+    """
+    if isinstance(name, unicode):
+        name = name.encode("utf-8")
+    return "%s/%s.xml" % (kind, urllib.quote(name, safe="/ "))
+
+
+def archive_name(when=None):
+    """
+    Function returns a file name for a new backup archive
+    """
+    return "%s%s%s" % (ARCHIVE_PREFIX, time.strftime(
+        "%Y%m%d-%H%M%S", time.localtime(when)), ARCHIVE_SUFFIX)
+
+
+def latest_archive(path):
+    """
+    Function returns path of newest backup archive in a directory,
+    None if it has none
+    """
+    if not os.path.isdir(path):
+        return None
+    names = sorted(f for f in os.listdir(path)
+                   if f.startswith(ARCHIVE_PREFIX) and
+                   f.endswith(ARCHIVE_SUFFIX))
+    return os.path.join(path, names[-1]) if names else None
+
+
+def read_manifest(fpath):
+    """
+    Function returns manifest of a backup archive
+    """
+    with tarfile.open(fpath, "r:gz") as tar:
+        try:
+            return json.load(tar.extractfile(MANIFEST))
+        except KeyError:
+            raise ValueError("%s is not a backup, it has no %s" % (
+                fpath, MANIFEST))
+
+
+def add_member(tar, name, data):
+    """
+    Function adds data as a file of given name to a tar archive
+    """
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = time.time()
+    tar.addfile(info, StringIO(data))
+
+
+def write_backup(fpath, items, views, fetch, base=None, workers=8):
+    """
+    Function fetches configs in parallel and writes them into a new
+    backup archive at fpath, each one as soon as it is fetched
+
+    items is a python list of dicts with name and folder keys, as
+    returned by JenkinsCI.get_all_items(), views a python list of view
+    names and fetch(kind, name) returns config of a 'jobs' or 'views'
+    item. With manifest of a base backup only changed configs are
+    written.
+
+    Returns a tuple of (manifest, python list of (kind, name, error)
+    of configs which couldn't be fetched). A config failing in an
+    incremental backup keeps its entry of base manifest, so it isn't
+    lost from the chain of backups.
+
+    Archive is written under a temporary name and renamed to fpath
+    once complete, so a failed backup never leaves a partial archive
+    taken for the latest one
+    """
+    archive = os.path.basename(fpath)
+    manifest = {"created": time.time(), "base": base and base["archive"],
+                "archive": archive, "jobs": {}, "views": {}}
+    folders = set(item["name"] for item in items if item["folder"])
+    tasks = ([("jobs", item["name"]) for item in items] +
+             [("views", name) for name in views])
+    failed = []
+
+    def get(task):
+        try:
+            data = fetch(*task)
+            if isinstance(data, unicode):
+                data = data.encode("utf-8")
+            return task, data, None
+        except Exception as e:
+            return task, None, e
+
+    tmp = fpath + ".tmp"
+    pool = ThreadPool(max(1, min(workers, len(tasks))))
+    try:
+        with tarfile.open(tmp, "w:gz") as tar:
+            for (kind, name), data, error in pool.imap_unordered(get, tasks):
+                old = base and base[kind].get(name)
+                if error:
+                    failed.append((kind, name, error))
+                    if old:
+                        manifest[kind][name] = dict(old)
+                    continue
+                entry = {"hash": content_hash(data)}
+                if kind == "jobs":
+                    entry["folder"] = name in folders
+                if old and old["hash"] == entry["hash"]:
+                    entry["archive"] = old["archive"]
+                else:
+                    entry["archive"] = archive
+                    add_member(tar, member_name(kind, name), data)
+                manifest[kind][name] = entry
+            add_member(tar, MANIFEST, json.dumps(
+                manifest, indent=1, sort_keys=True))
+        os.rename(tmp, fpath)
+    finally:
+        pool.close()
+        pool.join()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return manifest, failed
+
+
+def read_backup(fpath):
+    """
+    Function returns a tuple of (manifest, dict of (kind, name) to
+    config) of a backup archive, configs kept in base archives of an
+    incremental backup are read from them, from same directory
+
+    Raises ValueError when an archive is missing or a config doesn't
+    match its hash in manifest
+    """
+    manifest = read_manifest(fpath)
+    path = os.path.dirname(fpath)
+
+    wanted = {}
+    for kind in ("jobs", "views"):
+        for name, entry in manifest[kind].items():
+            wanted.setdefault(entry["archive"], []).append((kind, name))
+
+    configs = {}
+    for archive, names in wanted.items():
+        apath = fpath if archive == manifest["archive"] else \
+            os.path.join(path, archive)
+        if not os.path.isfile(apath):
+            raise ValueError("Base archive %s of %s is missing" % (
+                archive, fpath))
+
+        # members are read in archive order, a gzipped archive can't
+        # be read at random
+        members = dict((member_name(kind, name), (kind, name))
+                       for kind, name in names)
+        with tarfile.open(apath, "r:gz") as tar:
+            for info in tar:
+                key = members.pop(info.name, None)
+                if key is None:
+                    continue
+                data = tar.extractfile(info).read()
+                if content_hash(data) != manifest[key[0]][key[1]]["hash"]:
+                    raise ValueError("Config of %s in %s doesn't match its "
+                                     "hash" % (key[1], archive))
+                configs[key] = data
+        if members:
+            raise ValueError("%s has no config of %s" % (
+                archive, ", ".join(name for _, name in members.values())))
+    return manifest, configs
+
+
+def depth_levels(names):
+    """
+    Function groups full job names by folder depth, returns a python
+    list of python lists of names, top level first, so restoring level
+    by level creates folders before the items in them
+    """
+    levels = []
+    for name in sorted(names):
+        depth = name.count("/")
+        while len(levels) <= depth:
+            levels.append([])
+        levels[depth].append(name)
+    return [level for level in levels if level]
@@ -0,0 +1,136 @@
+##############################################################################
+#
+# bulk job operations run server side by jenkins script console, a whole
+# batch of enable/disable/delete/rename/build operations is a single
+# request instead of one or more requests per job
+#
+##############################################################################
+
+import base64
+import json
+
+ACTIONS = ("enable", "disable", "delete", "rename", "build")
+
+# prefix of the script output line carrying results
+MARKER = "OPENCI-BATCH-RESULTS:"
+
+# operations are passed as base64 encoded json, never spliced into code
+SCRIPT = """
+import groovy.json.JsonOutput
+import groovy.json.JsonSlurper
+import jenkins.model.Jenkins
+
+def ops = new JsonSlurper().parseText(
+    new String("%(payload)s".decodeBase64(), "UTF-8"))
+def results = []
+for (op in ops) {
+    def result = [status: "ok", detail: ""]
+    try {
+        def item = Jenkins.instance.getItemByFullName(op.job)
+        if (item == null) {
+            throw new IllegalArgumentException("job doesn't exist")
+        }
+        switch (op.action) {
+            case "enable":
+                item.makeDisabled(false)
+                break
+            case "disable":
+                item.makeDisabled(true)
+                break
+            case "delete":
+                item.delete()
+                break
+            case "rename":
+                item.renameTo(op.to)
+                result.detail = item.fullName
+                break
+            case "build":
+                if (item.scheduleBuild2(0) == null) {
+                    throw new IllegalStateException("build not scheduled")
+                }
+                break
+            default:
+                throw new IllegalArgumentException(
+                    "unknown action " + op.action)
+        }
+    } catch (Exception e) {
+        result.status = "error"
+        result.detail = e.toString()
+    }
+    results << result
+}
+println("%(marker)s" + JsonOutput.toJson(results))
+"""
+
+
+def make_operation(action, job, to=None):
+    """
+    Function returns an operation dict, raises ValueError for an
+    unknown action or a rename without new name
+    """
+    if action not in ACTIONS:
+        raise ValueError("Unknown action '%s'" % action)
+    if action == "rename" and not to:
+        raise ValueError("rename of '%s' needs a new name" % job)
+    return {"action": action, "job": job, "to": to}
+
+
+def load_operations(fpath):
+    """
+    Function loads operations from a text file with one operation per
+    line, blank lines and lines starting with # are skipped, eg:-
+
+        disable old-app
+        rename old-app legacy-app
+        build app
+    """
+    operations = []
+    with open(fpath) as f:
+        for number, line in enumerate(f, 1):
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            try:
+                operations.append(make_operation(*words[:3]))
+            except (TypeError, ValueError) as e:
+                raise ValueError("%s:%d: %s" % (fpath, number, e))
+    return operations
+
+
+def make_script(operations):
+    """
+    Function returns groovy script running given operations
+    """
+    payload = json.dumps([
+        # jenkins renames a job within its folder, so it takes short name
+        {"action": op["action"], "job": op["job"],
+         "to": op["to"].rsplit("/", 1)[-1] if op.get("to") else None}
+        for op in operations])
+    return SCRIPT % {"payload": base64.b64encode(payload), "marker": MARKER}
+
+
+def parse_results(output, count):
+    """
+    Function returns a python list of (status, detail) of operations
+    from script output
+
+    Raises ValueError if output doesn't have results of count operations
+    """
+    for line in output.splitlines():
+        if line.startswith(MARKER):
+            results = json.loads(line[len(MARKER):])
+            if len(results) != count:
+                raise ValueError("Got results of %d operations, expected %d"
+                                 % (len(results), count))
+            return [(r["status"], r["detail"]) for r in results]
+    raise ValueError("No results in script output: %s" % output[:200])
+
+
+def independent(operations):
+    """
+    Function tells whether no job is touched by more than one of
+    operations, so they can run in any order
+    """
+    names = [op["job"] for op in operations] + \
+        [op["to"] for op in operations if op.get("to")]
+    return len(names) == len(set(names))
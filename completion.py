@@ -0,0 +1,128 @@
+#!/usr/bin/python
+##############################################################################
+#
+# shell completion entry point for openci
+#
+# This runs on every <TAB>, so it must stay fast: it only reads a local
+# cache of job and project names and never imports requests/jenkins or
+# talks to servers. A stale cache is refreshed by `openci refresh_names`
+# started in background.
+#
+# usage: completion.py <index of word being completed> <words...>
+#
+##############################################################################
+
+import json
+import os
+import re
+import sys
+import time
+
+# same as utils.DATA_DIR, utils isn't imported to keep completion fast
+NAMES_CACHE = os.path.expanduser('~/.openci.d/names.json')
+
+# cache older than this many seconds gets refreshed in background
+CACHE_TTL = 300
+
+# commands taking job names, and taking gitlab project paths
+JOB_COMMANDS = set([
+    'build_job', 'build_jobs', 'enable_job', 'disable_job', 'delete_job',
+    'rename_job', 'get_job_info', 'debug_job_info', 'last_build_info',
+    'download_artifacts', 'sync_history', 'analytics', 'analyze_build'])
+PROJECT_COMMANDS = set(['remove_project'])
+
+GLOBAL_OPTIONS = ['--all', '--servers']
+
+OPENCI_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'openci.py')
+
+
+def get_commands():
+    """
+    Function returns names of openci commands, the public methods of
+    OpenCI class, read from its source without importing it
+    """
+    with open(OPENCI_PY) as f:
+        return re.findall(r"^    def ([a-z]\w*)\(self\):", f.read(), re.M)
+
+
+def load_names():
+    """
+    Function returns cached names, starting a background refresh
+    when cache is missing or stale
+    """
+    try:
+        with open(NAMES_CACHE) as f:
+            names = json.load(f)
+    except (EnvironmentError, ValueError):
+        names = {}
+
+    if time.time() - names.get('updated', 0) > CACHE_TTL:
+        refresh_in_background()
+    return names
+
+
+def refresh_in_background():
+    """
+    Function starts `openci refresh_names` detached from the shell,
+    a lock file keeps many <TAB>s from starting many refreshes
+    """
+    lock = NAMES_CACHE + '.lock'
+    try:
+        if time.time() - os.path.getmtime(lock) < 60:
+            return
+    except OSError:
+        pass
+
+    import subprocess
+
+    parent = os.path.dirname(NAMES_CACHE)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    open(lock, 'w').close()
+
+    devnull = open(os.devnull, 'r+')
+    subprocess.Popen([sys.executable, OPENCI_PY, 'refresh_names'],
+                     stdin=devnull, stdout=devnull, stderr=devnull,
+                     close_fds=True, preexec_fn=os.setsid)
+
+
+def complete(cword, words):
+    """
+    Function returns a python list of candidates for word at index
+    cword of command line words
+    """
+    current = words[cword] if cword < len(words) else ''
+
+    # finding the command, skipping global options
+    command = None
+    position = 1
+    while position < cword:
+        word = words[position]
+        if word == '--servers':
+            position += 1
+        elif not word.startswith('-'):
+            command = word
+            break
+        position += 1
+
+    if command is None:
+        if current.startswith('-'):
+            candidates = GLOBAL_OPTIONS
+        else:
+            candidates = get_commands()
+    elif current.startswith('-') or words[cword - 1] == '--servers':
+        return []
+    elif command in JOB_COMMANDS:
+        candidates = load_names().get('jobs', [])
+    elif command in PROJECT_COMMANDS:
+        candidates = load_names().get('projects', [])
+    else:
+        return []
+
+    return sorted(c for c in candidates if c.startswith(current))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        print '\n'.join(complete(int(sys.argv[1]), sys.argv[2:]))
@@ -0,0 +1,14 @@
+# bash completion for openci
+#
+# add to ~/.bashrc:
+#   source /path/to/openci/completion/openci.bash
+
+_OPENCI_COMPLETION="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)/completion.py"
+
+_openci() {
+    local IFS=$'\n'
+    COMPREPLY=( $(python -S "$_OPENCI_COMPLETION" "$COMP_CWORD" \
+                  "${COMP_WORDS[@]}" 2>/dev/null) )
+}
+
+complete -F _openci openci ci openci.py
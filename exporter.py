@@ -0,0 +1,228 @@
+##############################################################################
+#
+# prometheus exporter of jenkins and gitlab health
+#
+# Metrics are read from servers by a background refresher on its own
+# schedule, with queries asking only for the fields counted, and the
+# exposition text is rendered once per refresh, so a scrape is served
+# from memory and never reaches jenkins or gitlab.
+#
+##############################################################################
+
+import threading
+import time
+import BaseHTTPServer
+
+from utils import run_concurrently
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# metric name -> (type, help)
+METRICS = {
+    "openci_jenkins_queue_length": (
+        "gauge", "Items in jenkins build queue"),
+    "openci_jenkins_jobs": (
+        "gauge", "Top level jenkins jobs by color"),
+    "openci_jenkins_running_builds": (
+        "gauge", "Builds running on jenkins executors"),
+    "openci_jenkins_plugins": (
+        "gauge", "Installed jenkins plugins"),
+    "openci_gitlab_users": (
+        "gauge", "Gitlab users"),
+    "openci_gitlab_projects": (
+        "gauge", "Gitlab projects"),
+    "openci_source_up": (
+        "gauge", "Whether last refresh of a source succeeded"),
+    "openci_source_refresh_seconds": (
+        "gauge", "Duration of last refresh of a source"),
+    "openci_source_last_success_timestamp_seconds": (
+        "gauge", "Time of last successful refresh of a source"),
+}
+
+
+def jenkins_sources(server, jenkinsci):
+    """
+    Function returns sources of metrics of a jenkins server, a python
+    list of (source name, labels, func), func returning a python list
+    of (metric name, labels, value) samples
+    """
+    labels = {"server": server}
+
+    def jobs():
+        colors = {}
+        for job in jenkinsci.iter_jobs():
+            color = job.get("color", "none")
+            colors[color] = colors.get(color, 0) + 1
+        return [("openci_jenkins_jobs", {"color": color}, count)
+                for color, count in sorted(colors.items())]
+
+    return [
+        ("jenkins_queue", labels, lambda: [
+            ("openci_jenkins_queue_length", {}, jenkinsci.queue_length())]),
+        ("jenkins_jobs", labels, jobs),
+        ("jenkins_running", labels, lambda: [
+            ("openci_jenkins_running_builds", {},
+             len(jenkinsci.get_executing_builds()))]),
+        ("jenkins_plugins", labels, lambda: [
+            ("openci_jenkins_plugins", {}, jenkinsci.plugins_count())]),
+    ]
+
+
+def gitlab_sources(server, gitlabci):
+    """
+    Function returns sources of metrics of a gitlab server, same as
+    jenkins_sources()
+    """
+    labels = {"server": server}
+    return [
+        ("gitlab_users", labels, lambda: [
+            ("openci_gitlab_users", {}, gitlabci.count_users())]),
+        ("gitlab_projects", labels, lambda: [
+            ("openci_gitlab_projects", {}, gitlabci.count_projects())]),
+    ]
+
+
+def escape(value):
+    """
+    Function escapes a label value for prometheus text format
+    """
+    return unicode(value).replace("\\", "\\\\").replace(
+        "\"", "\\\"").replace("\n", "\\n")
+
+
+def format_sample(name, labels, value):
+    """
+    Function returns a line of prometheus text format for a sample
+    """
+    if labels:
+        name += "{%s}" % ",".join('%s="%s"' % (key, escape(labels[key]))
+                                  for key in sorted(labels))
+    return "%s %s" % (name, repr(float(value)) if isinstance(value, float)
+                      else value)
+
+
+class MetricsCache:
+    """
+    Class for metrics of a set of sources, read by refresh() or by a
+    background thread every interval seconds
+
+    A failed source keeps its last samples, with its openci_source_up
+    set to 0, so a server being down doesn't empty the whole scrape
+    """
+
+    def __init__(self, sources, interval=30.0, workers=4, clock=time.time):
+        self.sources = sources
+        self.interval = interval
+        self.workers = workers
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        # (source name, labels) -> (samples, up, duration of refresh,
+        # time of last successful refresh)
+        self.results = {}
+        self.body = ""
+
+    def _read(self, source):
+        start = self.clock()
+        try:
+            samples = source[2]()
+        except Exception as e:
+            return None, self.clock() - start, e
+        return samples, self.clock() - start, None
+
+    def refresh(self):
+        """
+        Function reads all sources in parallel and renders exposition
+        text of their samples, returns a python list of
+        (source name, labels, error) of failed sources
+        """
+        failed = []
+        results = run_concurrently(self._read, self.sources, self.workers)
+        with self.lock:
+            for (name, labels, _), (samples, duration, error), _ in results:
+                key = (name, tuple(sorted(labels.items())))
+                old = self.results.get(key)
+                if error:
+                    failed.append((name, labels, error))
+                    samples = old[0] if old else []
+                    last = old[3] if old else None
+                else:
+                    last = self.clock()
+                self.results[key] = (samples, not error, duration, last)
+            self.body = self.render()
+        return failed
+
+    def render(self):
+        """
+        Function returns prometheus text format of cached samples,
+        grouped by metric
+        """
+        groups = {}
+        for (name, labels), (samples, up, duration, last) in \
+                self.results.items():
+            labels = dict(labels)
+            source = dict(labels, source=name)
+            meta = [("openci_source_up", source, int(up)),
+                    ("openci_source_refresh_seconds", source, duration)]
+            if last is not None:
+                meta.append(("openci_source_last_success_timestamp_seconds",
+                             source, last))
+            for metric, extra, value in list(samples) + meta:
+                groups.setdefault(metric, []).append(
+                    format_sample(metric, dict(labels, **extra), value))
+
+        lines = []
+        for metric in sorted(groups):
+            kind, text = METRICS.get(metric, ("untyped", metric))
+            lines.append("# HELP %s %s" % (metric, text))
+            lines.append("# TYPE %s %s" % (metric, kind))
+            lines.extend(sorted(groups[metric]))
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def start(self, on_failure=None):
+        """
+        Function starts refreshing sources every interval seconds in
+        a background thread, failed sources of a refresh are passed to
+        on_failure(failed)
+
+        First refresh is after interval, so refresh() is called before
+        for metrics to be there from first scrape
+        """
+        thread = threading.Thread(target=self._run, args=(on_failure,))
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _run(self, on_failure):
+        while True:
+            time.sleep(self.interval)
+            failed = self.refresh()
+            if failed and on_failure:
+                on_failure(failed)
+
+
+def make_handler(cache):
+    """
+    Function returns a request handler class serving cached metrics
+    at /metrics
+    """
+
+    class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                return self.reply(404, "text/plain", "not found")
+            self.reply(200, CONTENT_TYPE, cache.body.encode("utf-8"))
+
+        def reply(self, code, content_type, body):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # scrapes are too frequent to log
+            pass
+
+    return MetricsHandler
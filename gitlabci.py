@@ -1,8 +1,31 @@
 #!/usr/bin/python
-from utils import verbose_print
+from utils import verbose_print, run_concurrently
 
 import requests
 import json
+import urllib
+
+import transport
+from jsonstream import iter_array
+from records import Project, User
+
+
+# status codes of a successful delete, api v3 answers 200 with the
+# deleted item, v4 answers 204 or 202 (project deletes) with no content
+DELETED = (200, 202, 204)
+
+
+def api_version(value):
+    """
+    Function returns gitlab api version, 3 or 4, for value of [git]
+    version in config, eg '4' or 'v4'. Other values, like '1.0' of
+    configs written before api versions were supported, mean 3
+    """
+    value = str(value or "").strip().lower().lstrip("v")
+    try:
+        return 4 if int(float(value)) == 4 else 3
+    except ValueError:
+        return 3
 
 
 class GitlabCI:
@@ -14,17 +37,23 @@ class GitlabCI:
     http://doc.gitlab.com/ce/api/README.html
     """
 
-    PROJECTS_SUFFIX = "/api/v3/projects"
-    USERS_SUFFIX = "/api/v3/users"
-    KEYS_SUFFIX = "/api/v3/user/keys"
-    EMAILS_SUFFIX = "/api/v3/user/emails"
+    API_SUFFIX = "/api/v%d"
+    PROJECTS_SUFFIX = "/projects"
+    USERS_SUFFIX = "/users"
+    KEYS_SUFFIX = "/user/keys"
+    EMAILS_SUFFIX = "/user/emails"
 
-    def __init__(self, url, private_token):
+    # page size used when reading all pages of a list
+    PER_PAGE = 100
+
+    def __init__(self, url, private_token, version=3):
         self.url = url
-        self.projects_url = "%s%s" % (url, self.PROJECTS_SUFFIX)
-        self.users_url = "%s%s" % (url, self.USERS_SUFFIX)
-        self.keys_url = "%s%s" % (url, self.KEYS_SUFFIX)
-        self.emails_url = "%s%s" % (url, self.EMAILS_SUFFIX)
+        self.version = version
+        self.api_url = "%s%s" % (url, self.API_SUFFIX % version)
+        self.projects_url = "%s%s" % (self.api_url, self.PROJECTS_SUFFIX)
+        self.users_url = "%s%s" % (self.api_url, self.USERS_SUFFIX)
+        self.keys_url = "%s%s" % (self.api_url, self.KEYS_SUFFIX)
+        self.emails_url = "%s%s" % (self.api_url, self.EMAILS_SUFFIX)
         self.headers = {'PRIVATE-TOKEN': private_token}
 
     def create_project(self, params_dict):
@@ -85,7 +114,7 @@ class GitlabCI:
         """
         Function gets information for currently authenticated user
         """
-        url = "%s/api/v3/user" % self.url
+        url = "%s/user" % self.api_url
         return requests.get(url, headers=self.headers)
 
     def delete_user(self, uid):
@@ -95,34 +124,300 @@ class GitlabCI:
         url = "%s/%d" % (self.users_url, int(uid))
         return requests.delete(url, headers=self.headers)
 
-    def list_users(self):
+    def get_user(self, uid):
+        """
+        Function gets a user by its id
+        """
+        url = "%s/%d" % (self.users_url, int(uid))
+        return requests.get(url, headers=self.headers)
+
+    def list_users(self, params=None):
         """
         Function get list of all the gitlab user.
 
+        params is a dict of gitlab list filters like search, order_by,
+        sort and per_page, so server sends only matching users
+
         ** This operation needs admin rights for this **
         """
-        return requests.get(self.users_url, headers=self.headers)
+        return requests.get(self.users_url, params=params or {},
+                            headers=self.headers)
 
-    def list_usernames(self):
+    def find_users(self, username=None, search=None):
+        """
+        Function finds users with exact username, or users whose
+        username, name or email matches search
+        """
+        params = {}
+        if username:
+            params["username"] = username
+        if search:
+            params["search"] = search
+        return requests.get(self.users_url, params=params,
+                            headers=self.headers)
+
+    def iter_list(self, url, params=None):
+        """
+        Function yields items of a list url while its response is
+        downloading, so huge lists are never held in memory at once
+
+        Raises Exception if server doesn't return the list
+        """
+        resp = requests.get(url, params=params or {}, headers=self.headers,
+                            stream=True)
+        try:
+            if resp.status_code != 200:
+                raise Exception("Failed to get %s: %s" % (url, resp.content))
+            for item in iter_array(transport.iter_response(resp)):
+                yield item
+        finally:
+            resp.close()
+
+    def iter_users(self, params=None):
+        """
+        Function yields gitlab users while users list is downloading,
+        params are same as for list_users
+
+        ** This operation needs admin rights for this **
+        """
+        return User.view(self.iter_list(self.users_url, params))
+
+    def iter_projects(self, params=None):
+        """
+        Function yields projects while projects list is downloading,
+        params are same as for list_projects
+        """
+        return Project.view(self.iter_list(self.projects_url, params))
+
+    def list_usernames(self, params=None):
         """
         Function get list of all the gitlab usernames.
 
+        params is a dict of gitlab list filters, same as for list_users
+
         ** This operation needs admin rights for this **
         """
-        resp = requests.get(self.users_url, headers=self.headers)
-        verbose_print(resp.content)
-        if resp.status_code == 200:
-            return [u["username"] for u in json.loads(resp.content)]
-        return []
+        try:
+            return [u["username"] for u in self.iter_users(params)]
+        except Exception as e:
+            verbose_print(e)
+            return []
 
-    def list_projects(self):
+    def list_projects(self, params=None):
         """
         Function get list of all the projects
+
+        params is a dict of gitlab list filters like search, owned,
+        archived, order_by, sort, per_page and simple, so server sends
+        only matching projects, with minimal fields for simple
         """
-        resp = requests.get(self.projects_url, headers=self.headers)
+        resp = requests.get(self.projects_url, params=params or {},
+                            headers=self.headers)
+        transport.record_response(resp)
         verbose_print(resp.content)
         return resp
 
+    def list_all(self, url, params=None, workers=8, record=None):
+        """
+        Function returns a python list of all items of a paginated list url
+
+        First page tells total number of pages, rest of the pages are
+        fetched in parallel. When server doesn't send total pages (it can
+        skip it for huge lists) pages are followed one by one.
+
+        With a record class (see records module) items of each page are
+        turned into records as soon as the page is read
+        """
+        params = dict(params or {})
+        params.setdefault("per_page", self.PER_PAGE)
+
+        def get_page(page):
+            page_params = dict(params, page=page)
+            resp = requests.get(url, params=page_params, headers=self.headers)
+            if resp.status_code != 200:
+                raise Exception("Failed to get page %d of %s: %s" % (
+                    page, url, resp.content))
+            transport.record_response(resp)
+            items = json.loads(resp.content)
+            if record:
+                items = [record.from_dict(item) for item in items]
+            return items, resp.headers
+
+        items, headers = get_page(1)
+
+        total = headers.get("X-Total-Pages")
+        if total:
+            pages = range(2, int(total) + 1)
+            for page, result, error in run_concurrently(
+                    get_page, pages, workers):
+                if error:
+                    raise error
+                items.extend(result[0])
+            return items
+
+        while headers.get("X-Next-Page"):
+            page_items, headers = get_page(int(headers["X-Next-Page"]))
+            items.extend(page_items)
+        return items
+
+    def list_keyset(self, url, params=None, record=None):
+        """
+        Function returns a python list of all items of a list url of api
+        v4, read with keyset pagination
+
+        Each page is asked for items after the last id of previous page,
+        which stays fast on deep pages where offset pagination makes
+        server skip all the rows before the page. Server returns the
+        url of next page in Link header. Raises LookupError if server
+        refuses keyset pagination for this list
+        """
+        params = dict(params or {}, pagination="keyset", order_by="id",
+                      sort="asc")
+        params.setdefault("per_page", self.PER_PAGE)
+
+        items = []
+        while url:
+            resp = requests.get(url, params=params, headers=self.headers)
+            if resp.status_code in (400, 405) and not items:
+                raise LookupError("Keyset pagination not supported for %s: "
+                                  "%s" % (url, resp.content))
+            if resp.status_code != 200:
+                raise Exception("Failed to get %s: %s" % (url, resp.content))
+            transport.record_response(resp)
+
+            page = json.loads(resp.content)
+            if record:
+                items.extend(record.from_dict(item) for item in page)
+            else:
+                items.extend(page)
+
+            # next page url carries all the params
+            url = resp.links.get("next", {}).get("url") if page else None
+            params = None
+        return items
+
+    def _list_all_v4(self, url, workers, record):
+        try:
+            return self.list_keyset(url, record=record)
+        except LookupError:
+            return self.list_all(url, workers=workers, record=record)
+
+    def list_all_users(self, workers=8):
+        """
+        Function returns a python list of all the gitlab users,
+        reading all the pages of users list
+
+        ** This operation needs admin rights for this **
+        """
+        if self.version >= 4:
+            return self._list_all_v4(self.users_url, workers, User)
+        return self.list_all(self.users_url, workers=workers, record=User)
+
+    def list_all_projects(self, workers=8):
+        """
+        Function returns a python list of all the projects on gitlab server,
+        reading all the pages of projects list
+
+        ** This operation needs admin rights for this **
+        """
+        if self.version >= 4:
+            # api v4 lists all projects visible to an admin at /projects
+            return self._list_all_v4(self.projects_url, workers, Project)
+        url = "%s/all" % self.projects_url
+        return self.list_all(url, workers=workers, record=Project)
+
+    def statistics(self):
+        """
+        Function returns counts of gitlab instance (api v4), a dict of
+        names like users and projects to int
+
+        ** This operation needs admin rights for this **
+        """
+        url = "%s/application/statistics" % self.api_url
+        resp = requests.get(url, headers=self.headers)
+        if resp.status_code != 200:
+            raise Exception("Failed to read statistics: %s" % resp.content)
+        transport.record_response(resp)
+        # counts are sent as strings with thousands separators
+        return dict((name, int(str(value).replace(",", "")))
+                    for name, value in json.loads(resp.content).items()
+                    if str(value).replace(",", "").isdigit())
+
+    def count(self, url, params=None, statistic=None):
+        """
+        Function returns number of items of a paginated list url
+
+        Only one item is asked for and total is read from X-Total
+        header. Server skips it for huge lists, then count is taken
+        from given statistic of instance statistics (api v4), pages
+        are never all read
+
+        Raises Exception if server sent no count
+        """
+        params = dict(params or {})
+        resp = requests.get(url, params=dict(params, per_page=1),
+                            headers=self.headers)
+        if resp.status_code != 200:
+            raise Exception("Failed to count %s: %s" % (url, resp.content))
+        transport.record_response(resp)
+        total = resp.headers.get("X-Total")
+        if total:
+            return int(total)
+        if statistic and self.version >= 4:
+            counts = self.statistics()
+            if statistic in counts:
+                return counts[statistic]
+        raise Exception("Failed to count %s: server sent no total" % url)
+
+    def count_users(self):
+        """
+        Function returns number of gitlab users
+
+        ** This operation needs admin rights for this **
+        """
+        return self.count(self.users_url, statistic="users")
+
+    def count_projects(self):
+        """
+        Function returns number of projects on gitlab server
+
+        ** This operation needs admin rights for this **
+        """
+        if self.version >= 4:
+            return self.count(self.projects_url, {"simple": "true"},
+                              statistic="projects")
+        return self.count("%s/all" % self.projects_url)
+
+    def graphql(self, query, variables=None):
+        """
+        Function runs a graphql query on gitlab server (gitlab 12+)
+        and returns its data
+
+        Raises Exception if server has no graphql api or query failed
+        """
+        url = "%s/api/graphql" % self.url
+        resp = requests.post(url, data=json.dumps(
+            {"query": query, "variables": variables or {}}),
+            headers=dict(self.headers, **{"Content-Type": "application/json"}))
+        if resp.status_code != 200:
+            raise Exception("Graphql query failed: %s %s" % (
+                resp.status_code, resp.content))
+        transport.record_response(resp)
+        result = json.loads(resp.content)
+        if result.get("errors"):
+            raise Exception("Graphql query failed: %s" % "; ".join(
+                e.get("message", "") for e in result["errors"]))
+        return result["data"]
+
+    def get_project(self, proj_id):
+        """
+        Function gets a project by its id or its path with namespace,
+        eg 'group/project'
+        """
+        url = "%s/%s" % (self.projects_url,
+                         urllib.quote(str(proj_id), safe=""))
+        return requests.get(url, headers=self.headers)
+
     def list_ssh_keys_for_user(self, id):
         """
         Function lists ssh keys for given user id
@@ -157,7 +452,7 @@ class GitlabCI:
         data = {"id": id, "title": title, "key": key}
 
         # composing url for adding key for given user id
-        url = "%s/api/v3/users/%d/keys" % (self.url, int(id))
+        url = "%s/%d/keys" % (self.users_url, int(id))
 
         resp = requests.post(url, data=data, headers=self.headers)
         verbose_print(resp.content)
@@ -202,7 +497,7 @@ class GitlabCI:
         """
         Function adds given email to given user id
         """
-        url = "%s/api/v3/user/emails" % self.url
+        url = self.emails_url
 
         # composing params dict for POST
         data = {"email": email}
@@ -214,13 +509,22 @@ class GitlabCI:
 
         ** This operation needs admin rights for this **
         """
-        url = "%s/api/v3/users/%d/emails" % (self.url, int(id))
+        url = "%s/%d/emails" % (self.users_url, int(id))
 
         # composing params dict for POST
         data = {"id": id, "email": email}
 
         return requests.post(url, data=data, headers=self.headers)
 
+    def remove_email_for_user(self, uid, eid):
+        """
+        Function removes email with given email id of given user id
+
+        ** This operation needs admin rights for this **
+        """
+        url = "%s/%d/emails/%d" % (self.users_url, int(uid), int(eid))
+        return requests.delete(url, headers=self.headers)
+
     def list_emails(self):
         """
         Function lists emails for current authenticated user
@@ -231,5 +535,5 @@ class GitlabCI:
         """
         Function lists emails for current authenticated user
         """
-        url = "%s/api/v3/users/%d/emails" % (self.url, int(id))
+        url = "%s/%d/emails" % (self.users_url, int(id))
         return requests.get(url, headers=self.headers)
@@ -0,0 +1,251 @@
+##############################################################################
+#
+# local build history of jenkins jobs, kept as compact columnar files
+# (one array per field) and analytics over them
+#
+##############################################################################
+
+import hashlib
+import math
+import os
+import struct
+import sys
+import urllib
+from array import array
+
+from utils import get_data_path, load_json, save_json
+
+# build results are stored as small ints
+RESULTS = ["SUCCESS", "UNSTABLE", "FAILURE", "ABORTED", "NOT_BUILT"]
+RESULT_CODES = dict((r, i) for i, r in enumerate(RESULTS))
+UNKNOWN_RESULT = len(RESULTS)
+
+# file header: magic, byte order of arrays, number of builds
+MAGIC = "OCBH1"
+HEADER = struct.Struct("<5sBI")
+
+# durations are stored as 32 bit ints
+MAX_DURATION = 2 ** 31 - 1
+
+# (column name, array typecode) in order columns are stored in a file
+COLUMNS = (("number", "i"), ("result", "b"),
+           ("duration", "i"), ("timestamp", "d"))
+
+
+class BuildHistory:
+    """
+    Class for build history of a job, stored column wise in arrays,
+    one array per field, sorted by build number
+
+    Durations are in ms, timestamps in ms since epoch
+    """
+
+    def __init__(self):
+        for column, typecode in COLUMNS:
+            setattr(self, column, array(typecode))
+
+    def __len__(self):
+        return len(self.number)
+
+    @classmethod
+    def load(cls, fpath):
+        """
+        Function returns history loaded from given file,
+        an empty history if file doesn't exist
+        """
+        history = cls()
+        if not os.path.exists(fpath):
+            return history
+
+        with open(fpath, "rb") as f:
+            magic, little, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("'%s' is not a build history file" % fpath)
+            swap = bool(little) != (sys.byteorder == "little")
+            for column, _ in COLUMNS:
+                values = getattr(history, column)
+                values.fromfile(f, count)
+                if swap:
+                    values.byteswap()
+        return history
+
+    def save(self, fpath):
+        """
+        Function writes history to given file, a temp file is written
+        first and renamed over fpath
+        """
+        tmp = "%s.tmp" % fpath
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, sys.byteorder == "little", len(self)))
+            for column, _ in COLUMNS:
+                getattr(self, column).tofile(f)
+        os.rename(tmp, fpath)
+
+    def merge(self, builds):
+        """
+        Function adds given builds (dicts from jenkins api) to history,
+        builds already in history are replaced
+        """
+        rows = dict((n, (n, r, d, t)) for n, r, d, t in zip(
+            self.number, self.result, self.duration, self.timestamp))
+        for build in builds:
+            rows[build["number"]] = (
+                build["number"],
+                RESULT_CODES.get(build.get("result"), UNKNOWN_RESULT),
+                min(build.get("duration") or 0, MAX_DURATION),
+                build.get("timestamp") or 0)
+        self._set_rows([rows[n] for n in sorted(rows)])
+
+    def _set_rows(self, rows):
+        for i, (column, typecode) in enumerate(COLUMNS):
+            setattr(self, column, array(typecode, [row[i] for row in rows]))
+
+    def keep(self, predicate):
+        """
+        Function drops builds whose number doesn't satisfy predicate
+        """
+        self._set_rows([row for row in zip(
+            self.number, self.result, self.duration, self.timestamp)
+            if predicate(row[0])])
+
+    def since(self, timestamp):
+        """
+        Function returns a new history with builds started at or after
+        given timestamp (ms since epoch)
+        """
+        rows = [row for row in zip(
+            self.number, self.result, self.duration, self.timestamp)
+            if row[3] >= timestamp]
+        history = BuildHistory()
+        history._set_rows(rows)
+        return history
+
+
+def history_path(server_url, job):
+    """
+    Function returns path of history file of a job on given server
+    """
+    server = hashlib.sha1(server_url).hexdigest()[:12]
+    return get_data_path(
+        "history", server, "%s.bch" % urllib.quote(job, safe=""))
+
+
+class HistoryIndex:
+    """
+    Class for index of stored build histories of a server, keeping per
+    job the high water mark, the build number up to which all builds
+    are completed and stored, and the first build number on server
+    """
+
+    def __init__(self, server_url):
+        self.fpath = os.path.join(
+            os.path.dirname(history_path(server_url, "_")), "index.json")
+        self.jobs = load_json(self.fpath, {})
+
+    def get(self, job):
+        """
+        Function returns (high water mark, first build) of a job,
+        (0, None) for jobs never synced
+        """
+        mark = self.jobs.get(job) or {}
+        return mark.get("hwm", 0), mark.get("first")
+
+    def set(self, job, hwm, first):
+        self.jobs[job] = {"hwm": hwm, "first": first}
+
+    def save(self):
+        save_json(self.fpath, self.jobs)
+
+
+def sync_job(fetch, fpath, mark, hwm, stored_first, limit=100):
+    """
+    Function brings stored history of a job up to date with server,
+    fetching only builds newer than high water mark hwm
+
+    fetch(start, end) returns the job's builds in range, newest first,
+    mark is a dict with first and last build numbers on server and
+    builds are fetched limit at a time, until all builds newer than
+    hwm are fetched. Builds older than first build on
+    server (rotated or deleted) are dropped from history, a last build
+    older than hwm means job was recreated and history starts over.
+
+    Returns a tuple of (new hwm, number of builds fetched)
+    """
+    first, last = mark["first"], mark["last"]
+    if (last or 0) == hwm and first == stored_first:
+        return hwm, 0
+
+    if last is None or last < hwm:
+        history, hwm = BuildHistory(), 0
+    else:
+        history = BuildHistory.load(fpath)
+        if first is not None:
+            history.keep(lambda n: n >= first)
+
+    fetched = 0
+    if last is not None and last > hwm:
+        builds = []
+        start, end = 0, min(last - hwm, limit)
+        while True:
+            page = fetch(start, end)
+            builds.extend(b for b in page if b["number"] > hwm)
+            # numbers can have gaps, so pages go on until a build at
+            # or below hwm or the oldest build is reached
+            if len(page) < end - start or page[-1]["number"] <= hwm + 1:
+                break
+            start, end = end, end + limit
+        fetched = len(builds)
+
+        # running builds are fetched again next time
+        running = [b["number"] for b in builds if b["result"] is None]
+        history.merge([b for b in builds if b["result"] is not None])
+        hwm = min(running) - 1 if running else last
+
+    history.save(fpath)
+    return hwm, fetched
+
+
+def stored_jobs(server_url):
+    """
+    Function returns names of jobs having a stored history
+    for given server
+    """
+    path = os.path.dirname(history_path(server_url, "_"))
+    return sorted(urllib.unquote(f[:-len(".bch")])
+                  for f in os.listdir(path) if f.endswith(".bch"))
+
+
+def percentile(sorted_values, p):
+    """
+    Function returns p-th percentile (nearest rank) of sorted values
+    """
+    if not sorted_values:
+        return 0
+    rank = int(math.ceil(p / 100.0 * len(sorted_values))) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def analyze(history):
+    """
+    Function returns a dict of stats for a build history:-
+    builds count, failure rate, p50 and p95 durations (ms) and trend,
+    the change of median duration of newer half of builds against
+    older half, eg 0.1 means builds got 10% slower
+    """
+    count = len(history)
+    failures = history.result.count(RESULT_CODES["FAILURE"])
+    durations = sorted(history.duration)
+
+    half = count / 2
+    older = sorted(history.duration[:half])
+    newer = sorted(history.duration[half:])
+    older_p50 = percentile(older, 50)
+    trend = (float(percentile(newer, 50)) / older_p50 - 1) \
+        if older_p50 else 0.0
+
+    return {"builds": count,
+            "failure_rate": float(failures) / count if count else 0.0,
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "trend": trend}
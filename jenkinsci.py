@@ -1,5 +1,34 @@
 #!/usr/bin/python
 import jenkins
+import requests
+import urllib
+
+import batch
+import transport
+from jsonstream import iter_array
+from records import Build, Job
+from utils import run_concurrently
+
+
+def config_text(config_xml):
+    """
+    Function returns a config as unicode, python-jenkins encodes configs
+    to utf-8 itself, so utf-8 byte strings with non ascii text would
+    fail to encode
+    """
+    if isinstance(config_xml, str):
+        return config_xml.decode("utf-8")
+    return config_xml
+
+
+def name_bytes(name):
+    """
+    Function returns a job or view name as utf-8, python-jenkins quotes
+    names into urls and quoting fails on non ascii unicode
+    """
+    if isinstance(name, unicode):
+        return name.encode("utf-8")
+    return name
 
 
 class JenkinsCI:
@@ -12,10 +41,46 @@ class JenkinsCI:
      * https://python-jenkins.readthedocs.org/en/latest/index.html
      * http://python-jenkins.readthedocs.org/en/latest/api.html
     """
-    def __init__(self, url, username, password):
+
+    # fields of a build currently running on an executor
+    EXECUTABLE_TREE = ("currentExecutable[url,number,timestamp,"
+                       "estimatedDuration,fullDisplayName]")
+
+    # nodes with their executors' running builds in a single query
+    COMPUTER_TREE = ("displayName,executors[%s],oneOffExecutors[%s]" %
+                     (EXECUTABLE_TREE, EXECUTABLE_TREE))
+
+    # metadata of a build kept in build history
+    BUILD_FIELDS = "number,result,duration,timestamp"
+
+    # fields of jobs listed by get_jobs(), children of folders are
+    # asked only to tell folders from jobs
+    JOBS_TREE = "jobs[name,url,color,jobs[name]]"
+
+    # levels of folders listed by one query of get_all_items()
+    FOLDER_DEPTH = 4
+
+    # fields of queue items needed to follow them in a queue watch
+    QUEUE_TREE = ("items[id,inQueueSince,why,stuck,blocked,buildable,"
+                  "task[name]]")
+
+    def __init__(self, url, username, password, compress_requests=False):
         self.url = url
         self.username = username
         self.password = password
+        self.auth = (username, password) if username else None
+
+        # set to False once script console turns out not permitted
+        self.script_console = True
+
+        # csrf crumb header for posts, None until asked from server
+        self.crumb = None
+
+        # python-jenkins requests go through urllib2, so responses are
+        # compressed only with the handler of transport module
+        transport.install()
+        if compress_requests:
+            transport.compress_requests(url)
 
         self.server = jenkins.Jenkins(
                 self.url, username=self.username, password=self.password)
@@ -30,7 +95,7 @@ class JenkinsCI:
         """
         Function returns all the jobs of Jenkins server.
         """
-        return self.server.get_jobs()
+        return [Job.from_dict(job) for job in self.server.get_jobs()]
 
     def get_jobs_names(self):
         """
@@ -58,6 +123,163 @@ class JenkinsCI:
         """
         return self.server.get_queue_info()
 
+    def get_json(self, path, tree=None):
+        """
+        Function returns decoded json api response for given path
+        on jenkins server, eg 'queue/' or 'job/<name>/'
+
+        tree param limits the response to given fields,
+        eg 'jobs[name,color]', so server sends only what is needed
+        """
+        url = "%s/%sapi/json" % (self.url.rstrip("/"), path)
+        params = {"tree": tree} if tree else {}
+        resp = requests.get(url, params=params, auth=self.auth)
+        resp.raise_for_status()
+        transport.record_response(resp)
+        return resp.json()
+
+    def iter_jobs(self):
+        """
+        Function yields top level jobs, same as get_jobs() returns,
+        while jobs list is downloading, so first jobs of a huge list
+        are available before the transfer finishes
+        """
+        url = "%s/api/json" % self.url.rstrip("/")
+        resp = requests.get(url, params={"tree": self.JOBS_TREE},
+                            auth=self.auth, stream=True)
+        try:
+            resp.raise_for_status()
+            for job in iter_array(transport.iter_response(resp), "jobs"):
+                # folders are left out, as by get_jobs()
+                if "jobs" in job:
+                    continue
+                job.setdefault("fullname", job["name"])
+                yield Job.from_dict(job)
+        finally:
+            resp.close()
+
+    def get_all_items(self, depth=FOLDER_DEPTH):
+        """
+        Function returns a python list of dicts with name (full name,
+        like 'folder/job') and folder keys for all jobs and folders,
+        folders before their items
+
+        depth levels of folders are listed by one query, folders below
+        them are listed by a query per folder
+        """
+        tree = "jobs[name]"
+        for _ in range(depth):
+            tree = "jobs[name,%s]" % tree
+
+        items = []
+
+        def walk(prefix, jobs, level):
+            for job in jobs:
+                name = prefix + job["name"]
+                folder = "jobs" in job
+                items.append({"name": name, "folder": folder})
+                if not folder or not job["jobs"]:
+                    continue
+                # children of deepest folders are listed without
+                # their children, so they can't be told from jobs
+                if level < depth - 1:
+                    walk(name + "/", job["jobs"], level + 1)
+                else:
+                    walk(name + "/", self.get_json(
+                        self.job_path(name), tree)["jobs"], 0)
+
+        walk("", self.get_json("", tree)["jobs"], 0)
+        return items
+
+    def job_path(self, name):
+        """
+        Function returns api path of a job, jobs in folders are
+        named like 'folder/job'
+        """
+        return "".join("job/%s/" % urllib.quote(part, safe="")
+                       for part in name.split("/"))
+
+    def get_builds(self, name, start=0, end=100, fields=BUILD_FIELDS):
+        """
+        Function returns a python list of builds of a job, newest first,
+        in range [start, end) of all its builds, with only given fields
+        """
+        tree = "allBuilds[%s]{%d,%d}" % (fields, start, end)
+        return [Build.from_dict(build) for build in self.get_json(
+            self.job_path(name), tree)["allBuilds"]]
+
+    def get_build_artifacts(self, name, number):
+        """
+        Function returns a python dict with url of a build, its artifacts
+        and fingerprints (md5 hashes of fingerprinted files)
+        """
+        tree = ("url,number,artifacts[fileName,relativePath],"
+                "fingerprint[fileName,hash]")
+        return self.get_json("%s%d/" % (self.job_path(name), number), tree)
+
+    def open_console(self, name, number):
+        """
+        Function opens console text of a build as a streamed response
+        """
+        url = "%s/%s%d/consoleText" % (
+            self.url.rstrip("/"), self.job_path(name), number)
+        return self.open_url(url)
+
+    def open_url(self, url, headers=None, method="GET"):
+        """
+        Function opens given url of jenkins server as a streamed
+        response, body is read only when the caller reads it
+        """
+        return requests.request(method, url, headers=headers or {},
+                                auth=self.auth, stream=True)
+
+    def get_build_marks(self):
+        """
+        Function returns a python list of dicts with name, first and last
+        build numbers of all top level jobs, None when a job has no builds
+
+        It is a single small request even for thousands of jobs
+        """
+        jobs = self.get_json(
+            "", "jobs[name,firstBuild[number],lastBuild[number]]")["jobs"]
+        return [{"name": job["name"],
+                 "first": (job.get("firstBuild") or {}).get("number"),
+                 "last": (job.get("lastBuild") or {}).get("number")}
+                for job in jobs]
+
+    def get_build_mark(self, name):
+        """
+        Function returns a dict with name, first and last build numbers
+        of a job, same as get_build_marks(), for jobs in folders too
+        """
+        job = self.get_json(
+            self.job_path(name), "firstBuild[number],lastBuild[number]")
+        return {"name": name,
+                "first": (job.get("firstBuild") or {}).get("number"),
+                "last": (job.get("lastBuild") or {}).get("number")}
+
+    def get_queue_items(self, tree=QUEUE_TREE):
+        """
+        Function returns a python list of queue items with
+        only the fields in tree
+        """
+        return self.get_json("queue/", tree)["items"]
+
+    def queue_length(self):
+        """
+        Function returns number of items in build queue, asking
+        server only for their ids
+        """
+        return len(self.get_queue_items("items[id]"))
+
+    def plugins_count(self):
+        """
+        Function returns number of installed plugins, asking server
+        only for their names
+        """
+        return len(self.get_json(
+            "pluginManager/", "plugins[shortName]")["plugins"])
+
     def get_all_jobs(self, folder_depth=None):
         """
         Function gets a list of all jobs recursively to the given folder depth.
@@ -103,7 +325,19 @@ class JenkinsCI:
 
         config_xml is the python string containing config's xml
         """
-        self.server.create_job(name, config_xml)
+        self.server.create_job(name_bytes(name), config_text(config_xml))
+
+    def get_job_config(self, name):
+        """
+        Function returns config xml of a job of given name
+        """
+        return self.server.get_job_config(name_bytes(name))
+
+    def reconfig_job(self, name, config_xml):
+        """
+        Function updates config of an existing job with given config xml
+        """
+        self.server.reconfig_job(name_bytes(name), config_text(config_xml))
 
     def create_empty_view(self, name):
         """
@@ -117,6 +351,31 @@ class JenkinsCI:
         """
         self.server.delete_view(name)
 
+    def get_views_names(self):
+        """
+        Function returns names of all top level views on jenkins server
+        """
+        return [view["name"] for view in self.server.get_views()]
+
+    def get_view_config(self, name):
+        """
+        Function returns config xml of a view of given name
+        """
+        return self.server.get_view_config(name_bytes(name))
+
+    def create_view(self, name, config_xml):
+        """
+        Function creates a view on jenkins server with given config xml
+        """
+        self.server.create_view(name_bytes(name), config_text(config_xml))
+
+    def reconfig_view(self, name, config_xml):
+        """
+        Function updates config of an existing view with given config xml
+        """
+        self.server.reconfig_view(name_bytes(name),
+                                  config_text(config_xml))
+
     def enable_job(self, name):
         """
         Function enables a job of given name on jenkins server
@@ -139,7 +398,52 @@ class JenkinsCI:
         """
         function get list of all running builds on jenkins server
         """
-        self.server.get_running_builds()
+        return self.server.get_running_builds()
+
+    def get_executing_builds(self, workers=8):
+        """
+        Function returns a python list of dicts for builds running on
+        all executors of all nodes, with node, job, number, url,
+        started (ms) and estimated (ms) keys
+
+        All nodes are read with one projected query, if server rejects
+        it nodes are listed and read in parallel one by one
+        """
+        try:
+            nodes = self.get_json(
+                "computer/", "computer[%s]" % self.COMPUTER_TREE)["computer"]
+        except requests.exceptions.RequestException:
+            def get_node(name):
+                # master node has a special name in urls
+                if name == "master":
+                    name = "(master)"
+                return self.get_json(
+                    "computer/%s/" % name, self.COMPUTER_TREE)
+
+            names = [n["name"] for n in self.server.get_nodes()]
+            nodes = []
+            for name, node, error in run_concurrently(
+                    get_node, names, workers):
+                if error:
+                    raise error
+                nodes.append(node)
+
+        builds = []
+        for node in nodes:
+            executors = ((node.get("executors") or []) +
+                         (node.get("oneOffExecutors") or []))
+            for executor in executors:
+                build = executor.get("currentExecutable")
+                if not build:
+                    continue
+                builds.append({
+                    "node": node["displayName"],
+                    "job": build["fullDisplayName"].rsplit(" #", 1)[0],
+                    "number": build["number"],
+                    "url": build["url"],
+                    "started": build["timestamp"],
+                    "estimated": build["estimatedDuration"]})
+        return builds
 
     def rename_job(self, from_name, to_name):
         """
@@ -162,6 +466,93 @@ class JenkinsCI:
         """
         self.server.delete_job(name)
 
+    def get_crumb(self):
+        """
+        Function returns a dict with csrf crumb header for post requests,
+        empty when server doesn't issue crumbs
+        """
+        if self.crumb is None:
+            resp = requests.get(
+                "%s/crumbIssuer/api/json" % self.url.rstrip("/"),
+                auth=self.auth)
+            if resp.status_code == 404:
+                self.crumb = {}
+            else:
+                resp.raise_for_status()
+                data = resp.json()
+                self.crumb = {data["crumbRequestField"]: data["crumb"]}
+        return self.crumb
+
+    def run_script(self, script):
+        """
+        Function runs a groovy script with script console and returns
+        the response, script output is its content
+
+        Script is sent form encoded, python-jenkins posts it as it is,
+        so every '+' in it reaches server as a space
+        """
+        headers = dict(self.get_crumb())
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return requests.post(
+            "%s/scriptText" % self.url.rstrip("/"),
+            data=urllib.urlencode({"script": script}), headers=headers,
+            auth=self.auth)
+
+    def run_batch(self, operations, chunk_size=100, workers=8):
+        """
+        Function runs a batch of job operations (see batch module) and
+        returns a python list of dicts with action, job, to, status
+        ('ok', 'error' or 'unknown'), detail and via ('script' or 'rest')
+
+        Operations run server side with the script console, chunk_size
+        operations per request. When script console isn't permitted,
+        rest of the operations fall back to a rest request per
+        operation, in parallel if no job is touched twice. A chunk
+        failing otherwise may have run on server, in part or fully, so
+        its operations are reported 'unknown' and never run again
+        """
+        results = []
+        pending = list(operations)
+        while pending and self.script_console:
+            chunk = pending[:chunk_size]
+            try:
+                self.get_crumb()
+            except (requests.exceptions.RequestException, KeyError,
+                    ValueError):
+                # script console can't be used, nothing ran
+                self.script_console = False
+                break
+            try:
+                resp = self.run_script(batch.make_script(chunk))
+                if resp.status_code in (401, 403, 404):
+                    # script console rejected, script never started
+                    self.script_console = False
+                    break
+                if resp.status_code != 200:
+                    raise ValueError("Script console answered %d" %
+                                     resp.status_code)
+                outcomes = batch.parse_results(resp.content, len(chunk))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                outcomes = [("unknown", str(e))] * len(chunk)
+            for op, (status, detail) in zip(chunk, outcomes):
+                results.append(dict(op, status=status, detail=detail,
+                                    via="script"))
+            pending = pending[chunk_size:]
+
+        def run_rest(op):
+            action, name = op["action"], op["job"]
+            if action == "rename":
+                self.rename_job(name, op["to"])
+            else:
+                getattr(self, "%s_job" % action)(name)
+
+        workers = workers if batch.independent(pending) else 1
+        for op, _, error in run_concurrently(run_rest, pending, workers):
+            results.append(dict(
+                op, status="error" if error else "ok",
+                detail=str(error) if error else "", via="rest"))
+        return results
+
     def get_plugins(self, depth=2):
         """
         Function retrieves information about all the installed plugins
@@ -0,0 +1,84 @@
+##############################################################################
+#
+# syncing a directory of jenkins job config xml files with jenkins server,
+# configs are compared by hashes of their canonical xml
+#
+##############################################################################
+
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from utils import get_data_path, load_json, save_json
+
+XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def canonicalize_xml(text):
+    """
+    Function returns a canonical form of given config xml
+
+    xml declaration and whitespace only text (indentation) are dropped,
+    attributes are serialized in sorted order, so configs differing only
+    in formatting get the same canonical form
+    """
+    if isinstance(text, unicode):
+        text = text.encode("utf-8")
+
+    # expat can't parse xml 1.1 declarations jenkins writes
+    root = ET.fromstring(XML_DECLARATION.sub("", text, count=1))
+    for elem in root.iter():
+        if elem.text is not None and not elem.text.strip():
+            elem.text = None
+        if elem.tail is not None and not elem.tail.strip():
+            elem.tail = None
+    return ET.tostring(root, encoding="utf-8")
+
+
+def config_hash(text):
+    """
+    Function returns sha1 hex digest of canonical form of given config xml
+    """
+    return hashlib.sha1(canonicalize_xml(text)).hexdigest()
+
+
+def read_config_dir(path):
+    """
+    Function returns a dict of job name to config xml for all
+    <job name>.xml files in given directory
+    """
+    configs = {}
+    for fname in sorted(os.listdir(path)):
+        if fname.endswith(".xml"):
+            with open(os.path.join(path, fname)) as f:
+                configs[fname[:-len(".xml")]] = f.read()
+    return configs
+
+
+class ConfigHashCache:
+    """
+    Class for local cache of hashes of job configs known to be
+    on a jenkins server, stored as json under openci data dir
+
+    A job whose local config hash equals the cached hash is in sync
+    and its remote config doesn't need to be fetched
+    """
+
+    def __init__(self, server_url, fpath=None):
+        self.server_url = server_url
+        self.fpath = fpath or get_data_path("config_hashes.json")
+        self.data = load_json(self.fpath, {})
+        self.hashes = self.data.setdefault(server_url, {})
+
+    def get(self, job):
+        return self.hashes.get(job)
+
+    def set(self, job, digest):
+        self.hashes[job] = digest
+
+    def discard(self, job):
+        self.hashes.pop(job, None)
+
+    def save(self):
+        save_json(self.fpath, self.data)
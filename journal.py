@@ -0,0 +1,57 @@
+##############################################################################
+#
+# durable journal of completed steps of multi step commands like curb,
+# so a failed run can be resumed without repeating finished steps
+#
+##############################################################################
+
+import hashlib
+import os
+
+from utils import get_data_path, load_json, save_json
+
+
+class StepJournal:
+    """
+    Class for a journal of completed steps and their outputs
+
+    Journal is a json file under openci data dir, named after a hash of
+    the key identifying the run. It is rewritten atomically after every
+    step, so it survives a crash at any point.
+    """
+
+    def __init__(self, key, fpath=None):
+        self.key = key
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        self.fpath = fpath or get_data_path("journal", "%s.json" % digest)
+        self.data = load_json(self.fpath) or {"key": key, "steps": {}}
+
+    def done(self, step):
+        """
+        Function returns True if given step was completed
+        """
+        return step in self.data["steps"]
+
+    def output(self, step):
+        """
+        Function returns the recorded output of a completed step
+        """
+        return self.data["steps"][step]
+
+    def record(self, step, output=None):
+        """
+        Function records a step as completed with its output
+        """
+        self.data["steps"][step] = output
+        save_json(self.fpath, self.data)
+
+    def completed_steps(self):
+        return sorted(self.data["steps"])
+
+    def reset(self):
+        """
+        Function forgets all the completed steps
+        """
+        self.data["steps"] = {}
+        if os.path.exists(self.fpath):
+            os.remove(self.fpath)
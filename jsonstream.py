@@ -0,0 +1,116 @@
+##############################################################################
+#
+# incremental decoding of huge json lists, elements of an array are
+# yielded while the response body is still downloading, so memory use
+# stays flat however long the list is
+#
+##############################################################################
+
+import json
+
+_decoder = json.JSONDecoder()
+WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """
+    Class for a buffer over an iterable of chunks of a json document,
+    consumed data is dropped as the buffer is refilled
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.data = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Function reads next chunk into buffer, returns False at the end
+        """
+        for chunk in self.chunks:
+            if chunk:
+                self.data = self.data[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """
+        Function returns next non whitespace char, '' at the end
+        """
+        while True:
+            while self.pos < len(self.data) and \
+                    self.data[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.data):
+                return self.data[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise ValueError("Expected one of %r at offset %d, got %r" % (
+                chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Function decodes next json value, reading more chunks until
+        the value is complete
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.data, self.pos)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # a number or literal at the end of buffer may go on
+            # in next chunk
+            if end == len(self.data) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(chunks, key=None):
+    """
+    Function yields elements of a json array from an iterable of chunks
+    of the document, eg response.iter_content()
+
+    With key, the array is the value of that key of a top level object,
+    eg key 'jobs' for {"jobs": [...]} of jenkins api, other values of
+    the object are skipped
+    """
+    buf = _Buffer(chunks)
+
+    if key is not None:
+        buf.expect("{")
+        while True:
+            if buf.peek() == "}":
+                return
+            name = buf.value()
+            buf.expect(":")
+            if name == key:
+                break
+            buf.value()
+            if buf.expect(",}") == "}":
+                return
+
+    if buf.peek() == "n":
+        # null instead of a list
+        buf.value()
+        return
+
+    buf.expect("[")
+    if buf.peek() == "]":
+        return
+    while True:
+        yield buf.value()
+        if buf.expect(",]") == "]":
+            return
@@ -0,0 +1,154 @@
+##############################################################################
+#
+# migration of jobs between jenkins servers
+#
+# Configs are fetched from source server on one pool of threads and each
+# one is handed to another pool creating it on destination server as soon
+# as it arrives. An item waits only for the folder it is in, it is parked
+# until that folder exists on destination, so fetches and creates overlap.
+#
+##############################################################################
+
+import fnmatch
+import threading
+from multiprocessing.pool import ThreadPool
+
+
+def parent_folder(name):
+    """
+    Function returns full name of folder an item is in, None for
+    top level items
+    """
+    return name.rsplit("/", 1)[0] if "/" in name else None
+
+
+def select_items(items, pattern):
+    """
+    Function returns items whose full name matches a shell pattern,
+    eg 'team/*' or '*-deploy', with the folders they are in
+
+    items is a python list of dicts with name and folder keys, as
+    returned by JenkinsCI.get_all_items(). Folders added only because
+    a selected item is in them get an ancestor key set to True
+    """
+    selected = set(item["name"] for item in items
+                   if fnmatch.fnmatchcase(item["name"], pattern))
+    ancestors = set()
+    for name in selected:
+        parent = parent_folder(name)
+        while parent and parent not in selected:
+            ancestors.add(parent)
+            parent = parent_folder(parent)
+    return [dict(item, ancestor=item["name"] in ancestors) for item in items
+            if item["name"] in selected or item["name"] in ancestors]
+
+
+class Migration:
+    """
+    Class for copying configs of items with fetch(name) from a server
+    and push(item, config) to another one, returning the action taken
+    on destination, eg 'create', 'update' or 'none'
+
+    Results are (name, action, status, detail) tuples, status being
+    'done', 'failed' or 'skipped' for items of folders which failed
+    """
+
+    def __init__(self, fetch, push, workers=8):
+        self.fetch = fetch
+        self.push = push
+        self.workers = workers
+        self.cond = threading.Condition()
+
+    def run(self, items):
+        """
+        Function migrates items, folders listed before items in them,
+        returns a python list of results
+        """
+        self.results = []
+        self.bytes = 0
+        self.remaining = len(items)
+        self.folders = set(item["name"] for item in items if item["folder"])
+
+        # folders on destination, folders which failed, and fetched
+        # items waiting for their folder
+        self.ready = set()
+        self.broken = set()
+        self.parked = {}
+
+        if not items:
+            return self.results
+
+        fetch_pool = ThreadPool(max(1, min(self.workers, len(items))))
+        self.push_pool = ThreadPool(max(1, min(self.workers, len(items))))
+        try:
+            for item, config, error in fetch_pool.imap_unordered(
+                    self._fetch, items):
+                if error:
+                    self._finish(item, "fetch", "failed", str(error))
+                else:
+                    self._submit(item, config)
+
+            with self.cond:
+                while self.remaining:
+                    self.cond.wait(1)
+        finally:
+            fetch_pool.close()
+            self.push_pool.close()
+            fetch_pool.join()
+            self.push_pool.join()
+        return self.results
+
+    def _fetch(self, item):
+        try:
+            config = self.fetch(item["name"])
+            if isinstance(config, unicode):
+                config = config.encode("utf-8")
+            return item, config, None
+        except Exception as e:
+            return item, None, e
+
+    def _submit(self, item, config):
+        parent = parent_folder(item["name"])
+        with self.cond:
+            self.bytes += len(config)
+            if parent in self.broken:
+                skip = True
+            elif parent in self.folders and parent not in self.ready:
+                self.parked.setdefault(parent, []).append((item, config))
+                return
+            else:
+                skip = False
+        if skip:
+            self._finish(item, "none", "skipped",
+                         "folder '%s' wasn't migrated" % parent)
+        else:
+            self.push_pool.apply_async(self._push, (item, config))
+
+    def _push(self, item, config):
+        try:
+            action = self.push(item, config)
+        except Exception as e:
+            self._finish(item, "push", "failed", str(e))
+        else:
+            self._finish(item, action, "done", "")
+
+    def _finish(self, item, action, status, detail):
+        name = item["name"]
+        with self.cond:
+            self.results.append((name, action, status, detail))
+            self.remaining -= 1
+            children = []
+            if item["folder"]:
+                if status == "done":
+                    self.ready.add(name)
+                else:
+                    self.broken.add(name)
+                children = self.parked.pop(name, [])
+            self.cond.notify_all()
+
+        for child, config in children:
+            if status == "done":
+                self.push_pool.apply_async(self._push, (child, config))
+            else:
+                self._finish(child, "none", "skipped",
+                             "folder '%s' wasn't migrated" % name)
@@ -0,0 +1,167 @@
+##############################################################################
+#
+# local index of gitlab usernames/emails and project paths to their ids,
+# so commands can take names instead of numeric ids
+#
+##############################################################################
+
+import hashlib
+import json
+
+from records import Project, User
+from utils import get_data_path, load_json, save_json
+
+
+class GitlabIndex:
+    """
+    Class for a local index of gitlab user ids by username and email,
+    and project ids by path with namespace
+
+    Index is filled by sync() with full paginated lists, names missing
+    from the index are looked up with a single targeted request
+    """
+
+    def __init__(self, gitlabci, fpath=None):
+        self.gitlabci = gitlabci
+        server = hashlib.sha1(gitlabci.url).hexdigest()[:12]
+        self.fpath = fpath or get_data_path("gitlab_index", "%s.json" % server)
+        self.data = load_json(self.fpath) or {"users": {}, "projects": {}}
+
+    def save(self):
+        save_json(self.fpath, self.data)
+
+    def add_user(self, user):
+        self.data["users"][user["username"].lower()] = user["id"]
+        if user.get("email"):
+            self.data["users"][user["email"].lower()] = user["id"]
+
+    def add_project(self, project):
+        self.data["projects"][
+            project["path_with_namespace"].lower()] = project["id"]
+
+    def discard_user(self, uid):
+        users = self.data["users"]
+        for name in [name for name, i in users.items() if i == uid]:
+            del users[name]
+
+    def discard_project(self, proj_id):
+        projects = self.data["projects"]
+        for path in [path for path, i in projects.items() if i == proj_id]:
+            del projects[path]
+
+    def _user_matches(self, uid, name):
+        resp = self.gitlabci.get_user(uid)
+        if resp.status_code != 200:
+            return False
+        user = json.loads(resp.content)
+        return name.lower() in (user.get("username", "").lower(),
+                                (user.get("email") or "").lower())
+
+    def _project_matches(self, proj_id, name):
+        resp = self.gitlabci.get_project(proj_id)
+        if resp.status_code != 200:
+            return False
+        project = json.loads(resp.content)
+        return project.get("path_with_namespace", "").lower() == name.lower()
+
+    def sync(self, workers=8):
+        """
+        Function rebuilds the index from all pages of users and
+        projects lists
+        """
+        self.data = {"users": {}, "projects": {}}
+        for user in self.gitlabci.list_all_users(workers):
+            self.add_user(user)
+        for project in self.gitlabci.list_all_projects(workers):
+            self.add_project(project)
+        self.save()
+
+    def user_id(self, name):
+        """
+        Function returns id of user with given id, username or email
+
+        Raises LookupError if there is no such user
+        """
+        if str(name).isdigit():
+            return int(name)
+
+        uid = self.data["users"].get(name.lower())
+        if uid is not None:
+            return uid
+
+        if "@" in name:
+            resp = self.gitlabci.find_users(search=name)
+        else:
+            resp = self.gitlabci.find_users(username=name)
+        if resp.status_code == 200:
+            for user in User.view(json.loads(resp.content)):
+                self.add_user(user)
+            self.save()
+
+        uid = self.data["users"].get(name.lower())
+        if uid is None:
+            raise LookupError("User '%s' doesn't exist" % name)
+        return uid
+
+    def project_id(self, name):
+        """
+        Function returns id of project with given id or path with
+        namespace, eg 'group/project'
+
+        Raises LookupError if there is no such project
+        """
+        if str(name).isdigit():
+            return int(name)
+
+        proj_id = self.data["projects"].get(name.lower())
+        if proj_id is not None:
+            return proj_id
+
+        resp = self.gitlabci.get_project(name)
+        if resp.status_code != 200:
+            raise LookupError("Project '%s' doesn't exist" % name)
+
+        project = Project.from_dict(json.loads(resp.content))
+        self.add_project(project)
+        self.save()
+        return project["id"]
+
+    def checked_user_id(self, name):
+        """
+        Function returns id of user with given id, username or email,
+        same as user_id(), but an id taken from the index is first
+        checked on server to still belong to that user, as users are
+        renamed and deleted since last sync. A stale entry is dropped
+        and the name looked up again
+
+        Raises LookupError if there is no such user
+        """
+        if str(name).isdigit():
+            return int(name)
+
+        uid = self.data["users"].get(name.lower())
+        if uid is None or self._user_matches(uid, name):
+            return self.user_id(name)
+
+        del self.data["users"][name.lower()]
+        self.save()
+        return self.user_id(name)
+
+    def checked_project_id(self, name):
+        """
+        Function returns id of project with given id or path with
+        namespace, same as project_id(), checking an id taken from the
+        index on server like checked_user_id()
+
+        Raises LookupError if there is no such project
+        """
+        if str(name).isdigit():
+            return int(name)
+
+        proj_id = self.data["projects"].get(name.lower())
+        if proj_id is None or self._project_matches(proj_id, name):
+            return self.project_id(name)
+
+        del self.data["projects"][name.lower()]
+        self.save()
+        return self.project_id(name)
@@ -3,14 +3,41 @@
 import argparse
 import sys
 import json
+import time
 import yaml
+import os
 from os.path import expanduser, isfile
 import ConfigParser
 
 from jenkinsci import JenkinsCI
-from gitlabci import GitlabCI
-
+from gitlabci import DELETED, GitlabCI, api_version
+
+from artifacts import download_artifact, list_artifacts
+from backup import archive_name, depth_levels, latest_archive
+from backup import read_backup, read_manifest, write_backup
+from batch import load_operations, make_operation
+from exporter import MetricsCache, gitlab_sources, jenkins_sources
+from exporter import make_handler as make_metrics_handler
+from webhook import Coalescer, PooledHTTPServer, load_mapping, make_handler
+from history import BuildHistory, HistoryIndex, analyze, history_path
+from history import percentile, stored_jobs, sync_job
+from journal import StepJournal
+from migrate import Migration, select_items
+from nameindex import GitlabIndex
+from jobsync import ConfigHashCache, config_hash, read_config_dir
+from queuewatch import AdaptiveInterval, queue_snapshot, format_delta
+from queuewatch import wait_stats
+from reconcile import load_desired_state, snapshot, make_plan, apply_plan
+from records import Key
+from signatures import AnalysisCache, SignatureMatcher, group_failures
+from signatures import load_signatures
+from templating import JobTemplate, load_param_table
+from throttle import ThrottledTrigger, TokenBucket
+import transport
+from userreport import user_report
 from utils import get_file_data, confirm_yes_no, create_config
+from utils import run_concurrently, print_table, format_duration
+from utils import get_server_sections, get_data_path, save_json
 
 
 class OpenCI(object):
@@ -42,29 +69,41 @@ class OpenCI(object):
             self.config = config
 
         # gitlab ci wrapper
-        self.gitlabci = GitlabCI(self.config.get('git', 'server'),
-                                 self.config.get('git', 'api_key'))
+        self.gitlabci = self._make_gitlabci('git')
 
         # jenkins ci wrapper
-        self.jenkinsci = JenkinsCI(self.config.get('ci', 'server'),
-                                   self.config.get('ci', 'user'),
-                                   self.config.get('ci', 'password'))
+        self.jenkinsci = self._make_jenkinsci('ci')
+
+        # servers selected with --all or --servers a,b for commands
+        # which can query many servers, None for the default servers
+        self.servers = self._pop_server_args()
+
+        # with --transfer-stats, bytes on wire against decoded bytes of
+        # server responses are shown after the command
+        self.transfer_stats = '--transfer-stats' in sys.argv[1:]
+        if self.transfer_stats:
+            sys.argv.remove('--transfer-stats')
 
         # cli args parser
         parser = argparse.ArgumentParser(
             description='OpenCI commandline for continuous integration',
-            usage='''ci <command> [<args>]
+            usage='''ci [--all | --servers a,b] [--transfer-stats]
+          <command> [<args>]
 
 The most commonly used ci commands are:
    curb               Combo command to create a gitlab user, add ssh key
                       create specified project,
-                      and create a jenkins job and triggers the build
+                      and create a jenkins job and triggers the build,
+                      a failed run is resumed from the failed step
+   batch_curb         Run curb command for every entry of a yaml file
 
    create_user        Create a new user on gitlab server
    current_user       Get information about current authenticated user
    delete_user        Delete a user from gitlab server
    list_users         Get list of all users on gitlab server
-   list_usernames     Get list of all usernames on gitlab server
+   list_usernames     Get list of all usernames on gitlab server,
+                      list commands take server side filters like
+                      --search, --order_by, --sort and --per-page
    create_project     Create a new project on gitlab server
 
    create_project_for_user
@@ -101,27 +140,68 @@ The most commonly used ci commands are:
                       List SSH keys for given uid on gitlab server
                       This command is available only for admin
 
+   user_report        Get all users with their ssh keys and emails,
+                      read with graphql where server has it
    list_projects      Get list of all projects on gitlab server
+   sync_index         Refresh local index of gitlab user and project ids,
+                      commands taking a user or project id also take
+                      a username, email or project path
+
+   reconcile          Bring gitlab users, keys, emails and projects to
+                      the state described in a yaml file
 
    create_job         Create a new job on jenkins server
+   create_jobs        Create jobs from a config template and param table
+   apply              Create or update jobs from a directory of config xmls
+   backup             Back up job, folder and view configs into an archive
+   restore            Recreate jobs, folders and views from a backup
+   migrate_jobs       Copy jobs matching a pattern from a jenkins server
+                      to another one
    create_view        Create a new view on jenkins server
    delete_view        Delete a view from jenkins server
    get_job_info       Get detailed information about the job
    debug_job_info     Get debug info for a jenkins job
    get_queue_info     Get a queue of jobs to be done
+   watch_queue        Watch the queue, showing only items that changed
+   running_builds     Get builds running on all nodes of jenkins server
+   sync_history       Store build history of jobs locally for analytics
+   analytics          Get build durations and failure rates of jobs
+   analyze_build      Match console logs of builds against a library of
+                      failure signatures, grouping failures across jobs
    list_jobs          Get list of all jobs on jenkins server
    get_jobs_names     Get names of all jobs on jenkins server
    jobs_count         Gets count of jons on jenkins server
    enable_job         Enable a job on jenkins server
    disable_job        Disable a job on jenkins server
    build_job          Build a job on jenkins server
+   build_jobs         Build many jobs, throttled to keep the queue short
+   batch_jobs         Enable, disable, delete, rename or build many jobs
+                      in a few script console requests
    rename_job         Rename a job on jenkins server
    last_build_info    Get info for last build of a job on jenkins server
+   download_artifacts Download artifacts of builds of a job
    delete_job         Delete a job on jenkins server
    get_plugins        Get info about all installed plugins on jenkins server
    get_plugin_info    Get info about of a jenkins plugins with given name
    get_plugin_names   Get names of all installed plugins on jenkins server
    jenkins_version    Get version of jenkins server
+   webhook            Listen for gitlab push and merge request events
+                      and trigger builds of mapped jenkins jobs
+   exporter           Serve jenkins and gitlab health metrics for
+                      prometheus, refreshed in background
+   refresh_names      Refresh cached job and project names used by
+                      shell completion (see completion/ directory)
+
+Commands list_jobs, get_jobs_names, jobs_count, get_queue_info,
+list_projects, get_plugin_names and exporter query all servers defined
+in config with --all, or named ones with --servers a,b, in parallel.
+Servers are sections [git] and [ci] (named default) and [git:<name>],
+[ci:<name>]
+
+Responses are requested gzip/deflate compressed. With --transfer-stats,
+bytes on wire against decoded bytes are shown per server after command.
+Job config uploads are gzipped for jenkins servers accepting compressed
+requests, set compress_requests = yes in their config section
 ''')
         parser.add_argument('command', help='Subcommand to run')
 
@@ -136,16 +216,349 @@ The most commonly used ci commands are:
         # use dispatch pattern to invoke method with same name
         getattr(self, args.command)()
 
+        if self.transfer_stats:
+            self._print_transfer_stats()
+
+    def _print_transfer_stats(self):
+        """
+        Function prints requests, bytes on wire and decoded bytes
+        of server responses per host
+        """
+        rows = []
+        for host, count, wire, decoded in transport.stats.rows():
+            ratio = float(decoded) / wire if wire else 1.0
+            rows.append([host, count, wire, decoded, "%.1fx" % ratio])
+        print
+        print_table(["HOST", "REQUESTS", "ON WIRE", "DECODED", "RATIO"], rows)
+
+    def _make_gitlabci(self, section):
+        """
+        Function returns gitlab wrapper for server in given config section
+        """
+        version = self.config.get(section, 'version') \
+            if self.config.has_option(section, 'version') else None
+        return GitlabCI(self.config.get(section, 'server'),
+                        self.config.get(section, 'api_key'),
+                        api_version(version))
+
+    def _make_jenkinsci(self, section):
+        """
+        Function returns jenkins wrapper for server in given config section
+        """
+        # gzipped request bodies need server side support, eg a jetty
+        # gzip handler inflating requests, so they are opt in
+        compress = (self.config.has_option(section, 'compress_requests') and
+                    self.config.getboolean(section, 'compress_requests'))
+        return JenkinsCI(self.config.get(section, 'server'),
+                         self.config.get(section, 'user'),
+                         self.config.get(section, 'password'),
+                         compress)
+
+    def _pop_server_args(self):
+        """
+        Function removes global --all and --servers args from command
+        line args, so commands parse only their own args
+
+        Returns 'all', a python list of server names or None
+        """
+        servers = None
+        args = []
+        argv = iter(sys.argv[1:])
+        for arg in argv:
+            if arg == '--all':
+                servers = 'all'
+            elif arg == '--servers':
+                servers = next(argv, '').split(',')
+            elif arg.startswith('--servers='):
+                servers = arg[len('--servers='):].split(',')
+            else:
+                args.append(arg)
+        sys.argv[1:] = args
+
+        if isinstance(servers, list):
+            known = set(name for kind in ('git', 'ci')
+                        for name, _ in get_server_sections(self.config, kind))
+            unknown = [name for name in servers if name not in known]
+            if unknown:
+                print "Unknown servers:", ", ".join(unknown)
+                exit(1)
+        return servers
+
+    def _gitlab_index(self):
+        """
+        Function returns local index of gitlab user and project ids
+        """
+        if not hasattr(self, '_index'):
+            self._index = GitlabIndex(self.gitlabci)
+        return self._index
+
+    def _user_id(self, name, checked=False):
+        """
+        Function returns id of gitlab user with given id, username or
+        email, prints an error and returns None if user doesn't exist
+
+        With checked set, an id from local index is checked on server
+        first, for commands which delete
+        """
+        index = self._gitlab_index()
+        try:
+            if checked:
+                return index.checked_user_id(name)
+            return index.user_id(name)
+        except LookupError as e:
+            print "Error,", e
+            return None
+
+    def _project_id(self, name, checked=False):
+        """
+        Function returns id of gitlab project with given id or path,
+        prints an error and returns None if project doesn't exist
+
+        With checked set, an id from local index is checked on server
+        first, as for _user_id()
+        """
+        index = self._gitlab_index()
+        try:
+            if checked:
+                return index.checked_project_id(name)
+            return index.project_id(name)
+        except LookupError as e:
+            print "Error,", e
+            return None
+
+    def _servers(self, kind):
+        """
+        Function returns a python list of (server name, wrapper) of
+        selected servers of given kind, 'git' or 'ci'
+        """
+        make = self._make_gitlabci if kind == 'git' else self._make_jenkinsci
+        return [(name, make(section))
+                for name, section in get_server_sections(self.config, kind)
+                if self.servers == 'all' or name in self.servers]
+
+    def _fan_out(self, kind, func):
+        """
+        Function calls func with wrapper of every selected server of given
+        kind, all servers in parallel, and returns a python list of
+        (server name, result). Failed servers are reported and skipped
+        """
+        servers = self._servers(kind)
+        results = []
+        for server, result, error in run_concurrently(
+                lambda server: func(server[1]), servers, len(servers)):
+            if error:
+                print "Failed to query %s server '%s': %s" % (
+                        kind, server[0], error)
+            else:
+                results.append((server[0], result))
+        return results
+
+    def webhook(self):
+        """
+        Function parses/process command line args,
+        and runs a http listener for gitlab push and merge request
+        webhooks, which builds jenkins jobs mapped to the project
+
+        Events for a job within debounce window are coalesced into one
+        build. Secret token of webhooks can be set as [webhook] secret
+        in config
+        """
+        parser = argparse.ArgumentParser(
+            description='Trigger jenkins builds from gitlab webhooks')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'map', help='yaml map of gitlab project paths to job names')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-p', '--port', type=int, default=8081,
+                help='port to listen on')
+        parser.add_argument(
+                '-b', '--bind', default='', help='address to listen on')
+        parser.add_argument(
+                '-d', '--debounce', type=float, default=5.0,
+                help='seconds to coalesce events of same job')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=4,
+                help='number of threads handling requests and builds')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        secret = None
+        if self.config.has_option('webhook', 'secret'):
+            secret = self.config.get('webhook', 'secret')
+
+        def build(job, count):
+            try:
+                self.jenkinsci.build_job(job)
+                print "Build trigered for job '%s' (%d events)" % (job, count)
+            except Exception as e:
+                print "Failed to build job '%s': %s" % (job, e)
+            sys.stdout.flush()
+
+        coalescer = Coalescer(build, args.debounce, args.workers)
+        handler = make_handler(load_mapping(args.map), coalescer, secret)
+        server = PooledHTTPServer(
+                (args.bind, args.port), handler, args.workers)
+
+        print "Listening for gitlab webhooks on port %d" % args.port
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+    def exporter(self):
+        """
+        Function parses/process command line args,
+        and serves jenkins and gitlab health metrics for prometheus
+        at /metrics
+
+        Metrics are read from servers in background every interval
+        seconds and scrapes are served from memory, so scrapes don't
+        load the servers
+        """
+        parser = argparse.ArgumentParser(
+            description='Prometheus exporter of jenkins and gitlab health')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-p', '--port', type=int, default=9118,
+                help='port to listen on')
+        parser.add_argument(
+                '-b', '--bind', default='', help='address to listen on')
+        parser.add_argument(
+                '-i', '--interval', type=float, default=30.0,
+                help='seconds between refreshes of metrics')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=4,
+                help='number of threads reading metrics and serving scrapes')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        if self.servers:
+            ci_servers = self._servers('ci')
+            git_servers = self._servers('git')
+        else:
+            ci_servers = [('default', self.jenkinsci)]
+            git_servers = [('default', self.gitlabci)]
+        sources = []
+        for server, jenkinsci in ci_servers:
+            sources.extend(jenkins_sources(server, jenkinsci))
+        for server, gitlabci in git_servers:
+            sources.extend(gitlab_sources(server, gitlabci))
+
+        def report(failed):
+            for name, labels, error in failed:
+                print "Failed to refresh %s of server '%s': %s" % (
+                        name, labels['server'], error)
+            sys.stdout.flush()
+
+        cache = MetricsCache(sources, args.interval, args.workers)
+        report(cache.refresh())
+        cache.start(report)
+        server = PooledHTTPServer(
+                (args.bind, args.port), make_metrics_handler(cache),
+                args.workers)
+
+        print "Serving metrics on port %d, refreshed every %s" % (
+                args.port, format_duration(args.interval))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+    def refresh_names(self):
+        """
+        Function refreshes local cache of jenkins job names and gitlab
+        project paths read by shell completion
+
+        It is started in background by completion.py when cache is stale
+        """
+        reads = run_concurrently(
+                lambda read: read(),
+                [self.jenkinsci.get_jobs_names,
+                 self.gitlabci.list_all_projects], 2)
+
+        fpath = get_data_path('names.json')
+        names = {'updated': time.time(), 'jobs': [], 'projects': []}
+        if not reads[0][2]:
+            names['jobs'] = reads[0][1]
+        if not reads[1][2]:
+            names['projects'] = [p['path_with_namespace'] for p in reads[1][1]]
+        save_json(fpath, names)
+
+        if os.path.exists(fpath + '.lock'):
+            os.remove(fpath + '.lock')
+
     def jenkins_version(self):
         print "Jenkins:", self.jenkinsci.get_version()
 
+    def _list_filter_params(self, description, projects=False):
+        """
+        Function parses command line args of gitlab list commands and
+        returns a dict of gitlab query params for server side filtering
+        """
+        parser = argparse.ArgumentParser(description=description)
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-s', '--search', help='only items matching given text')
+        parser.add_argument(
+                '-o', '--order_by', help='field to order items by')
+        parser.add_argument(
+                '--sort', choices=['asc', 'desc'], help='sort direction')
+        parser.add_argument(
+                '-p', '--per-page', type=int,
+                help='number of items per page, max 100')
+        parser.add_argument(
+                '--page', type=int, help='page number to get')
+        if projects:
+            parser.add_argument(
+                    '--owned', action='store_true',
+                    help='only projects owned by current user')
+            parser.add_argument(
+                    '--archived', choices=['true', 'false'],
+                    help='only archived or not archived projects')
+            parser.add_argument(
+                    '--simple', action='store_true',
+                    help='only minimal fields of projects')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        params = {}
+        for name in ('search', 'order_by', 'sort', 'per_page', 'page',
+                     'archived'):
+            if getattr(args, name, None) is not None:
+                params[name] = getattr(args, name)
+        for name in ('owned', 'simple'):
+            if getattr(args, name, False):
+                params[name] = 'true'
+        return params
+
     def list_projects(self):
         """
         Function returns a list of all project on gitlab server
         """
-        resp = self.gitlabci.list_projects()
-        data = json.loads(resp.content)
-        print yaml.safe_dump(data)
+        params = self._list_filter_params(
+                'List projects on gitlab server', projects=True)
+
+        if self.servers:
+            projects = []
+            for server, result in self._fan_out(
+                    'git', lambda git: list(git.iter_projects(params))):
+                for project in result:
+                    projects.append(dict(project.to_dict(), server=server))
+            print yaml.safe_dump(projects)
+            return
+
+        try:
+            self._print_yaml_items(self.gitlabci.iter_projects(params))
+        except Exception as e:
+            print "Error getting projects:", e
 
     def curb(self):
         """
@@ -153,6 +566,9 @@ The most commonly used ci commands are:
 
         curb command creates a gitlab user with given name, add ssh key,
         then creates a specified project, a jenkins job and trigers its build
+
+        Completed steps are written to a local journal, rerunning a failed
+        curb resumes from the first incomplete step
         """
 
         parser = argparse.ArgumentParser(
@@ -175,42 +591,125 @@ The most commonly used ci commands are:
         parser.add_argument('job', help='name of the jenkins job')
         parser.add_argument('config', help='config xml file')
 
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-r', '--restart', action='store_true',
+                help='ignore the journal of a previous run and start over')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        journal = self._curb_journal(vars(args))
+        if args.restart:
+            journal.reset()
+
+        try:
+            self._curb(vars(args), journal)
+        except Exception as e:
+            print e
+            print "Rerun the command to resume from the failed step"
+
+    def batch_curb(self):
+        """
+        Function parses/process command line args and runs curb command
+        for every entry of a yaml file
+
+        The yaml file is a list of dicts with same fields as args of curb
+        command, entries are processed in parallel and each one keeps its
+        own journal, so a rerun resumes every failed entry
+        """
+        parser = argparse.ArgumentParser(
+            description='Run curb command for every entry of a yaml file')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('entries', help='yaml file with curb entries')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=4,
+                help='number of entries processed in parallel')
+        parser.add_argument(
+                '-r', '--restart', action='store_true',
+                help='ignore journals of previous runs and start over')
+
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        with open(args.entries) as f:
+            entries = yaml.safe_load(f) or []
+
+        fields = ("name", "username", "password", "email",
+                  "title", "key", "repo", "job", "config")
+        for i, entry in enumerate(entries):
+            missing = [field for field in fields if not entry.get(field)]
+            if missing:
+                print "Entry %d is missing: %s" % (i + 1, ", ".join(missing))
+                return
+
+        def run(entry):
+            journal = self._curb_journal(entry)
+            if args.restart:
+                journal.reset()
+            self._curb(entry, journal)
+
+        rows = []
+        for entry, _, error in run_concurrently(run, entries, args.workers):
+            if error:
+                rows.append((entry["username"], "failed", str(error)))
+            else:
+                rows.append((entry["username"], "done", ""))
+        print_table(["USERNAME", "STATUS", "DETAIL"], rows)
+
+    def _curb_journal(self, params):
+        """
+        Function returns the step journal of a curb run, a run is
+        identified by servers, username, repo and job
+        """
+        key = "curb|%s|%s|%s|%s|%s" % (
+                self.gitlabci.url, self.jenkinsci.url,
+                params["username"], params["repo"], params["job"])
+        return StepJournal(key)
+
+    def _curb(self, params, journal):
+        """
+        Function runs the steps of curb command for given params
+
+        Every completed step is recorded in journal with its output,
+        steps already in the journal are skipped. Raises an Exception
+        with the reason when a step fails.
+        """
+        username = params["username"]
+
         ##############################
         #                            #
         #    CREATING GITLAB USER    #
         #                            #
         ##############################
 
-        # ensure password is atleast 8 chars
-        if len(args.password) < 8:
-            print "Password must be atleast 8 chars"
-            return
-
-        # adding required params to create a user
-        params = {
-                "name": args.name,
-                "username": args.username,
-                "password": args.password,
-                "email": args.email
-                }
-
-        # no need for email confirmation for this new user
-        params["confirm"] = "false"
-
-        # creating new user on gitlab server
-        resp = self.gitlabci.create_user(params)
-        uid = 0
-        if resp.status_code == 201:
-            print "User '%s' created" % args.username
+        if not journal.done("create_user"):
+            # ensure password is atleast 8 chars
+            if len(params["password"]) < 8:
+                raise Exception("Password must be atleast 8 chars")
+
+            # adding required params to create a user,
+            # no need for email confirmation for this new user
+            user = {
+                    "name": params["name"],
+                    "username": username,
+                    "password": params["password"],
+                    "email": params["email"],
+                    "confirm": "false"
+                    }
+
+            # creating new user on gitlab server
+            resp = self.gitlabci.create_user(user)
             rdata = json.loads(resp.content)
-            uid = rdata["id"]
-        else:
-            data = json.loads(resp.content)
-            print data["message"]
-            return  # no need to continue, without creating user !!!
+            if resp.status_code != 201:
+                raise Exception(rdata["message"])
+            journal.record("create_user", {"uid": rdata["id"]})
+            print "User '%s' created" % username
+
+        uid = journal.output("create_user")["uid"]
 
         ##############################
         #                            #
@@ -218,7 +717,16 @@ The most commonly used ci commands are:
         #                            #
         ##############################
 
-        resp = self.gitlabci.add_ssh_key_user(uid, args.title, args.key)
+        if not journal.done("add_ssh_key"):
+            resp = self.gitlabci.add_ssh_key_user(
+                    uid, params["title"], params["key"])
+            if resp.status_code != 201:
+                raise Exception(
+                    "Failed to add SSH key, Server Response: %s" %
+                    resp.content)
+            journal.record("add_ssh_key", {"kid": json.loads(
+                resp.content).get("id")})
+            print "SSH key added for user '%s'" % username
 
         ##############################
         #                            #
@@ -226,14 +734,16 @@ The most commonly used ci commands are:
         #                            #
         ##############################
 
-        # creating repo/project with params
-        resp = self.gitlabci.create_project_for_user(uid, args.repo)
-        if resp.status_code == 201:
-            print "Project '%s' created" % args.repo
-        else:
-            print "Failed to create '%s' project" % args.repo
-            print "Server Response: %s" % resp.content
-            return  # no need to continue, without creating repo !!!
+        if not journal.done("create_project"):
+            # creating repo/project with params
+            resp = self.gitlabci.create_project_for_user(uid, params["repo"])
+            if resp.status_code != 201:
+                raise Exception(
+                    "Failed to create '%s' project, Server Response: %s" %
+                    (params["repo"], resp.content))
+            journal.record("create_project", {"pid": json.loads(
+                resp.content).get("id")})
+            print "Project '%s' created" % params["repo"]
 
         ##############################
         #                            #
@@ -241,15 +751,16 @@ The most commonly used ci commands are:
         #                            #
         ##############################
 
-        job = args.job
+        job = params["job"]
 
-        # ensure that job doesnt exist
-        if self.jenkinsci.job_exists(job):
-            print "Error, Job '%s' already exist" % job
-            return
+        if not journal.done("create_job"):
+            # ensure that job doesnt exist
+            if self.jenkinsci.job_exists(job):
+                raise Exception("Error, Job '%s' already exist" % job)
 
-        self.jenkinsci.create_job(job, get_file_data(args.config))
-        print "Job '%s' created successfully" % job
+            self.jenkinsci.create_job(job, get_file_data(params["config"]))
+            journal.record("create_job", {"job": job})
+            print "Job '%s' created successfully" % job
 
         ##############################
         #                            #
@@ -257,15 +768,18 @@ The most commonly used ci commands are:
         #                            #
         ##############################
 
-        # before building job, ensure it exists
-        if not self.jenkinsci.job_exists(job):
-            print "Error, Can't build job"
-            print "Job '%s' doesn't exist" % job
-            return  # no need to continue, without a job !!!
+        if not journal.done("build_job"):
+            # before building job, ensure it exists
+            if not self.jenkinsci.job_exists(job):
+                raise Exception(
+                    "Error, Can't build job, Job '%s' doesn't exist" % job)
 
-        # building job on jenkins server
-        self.jenkinsci.build_job(job)
-        print "Build trigered for job '%s'" % job
+            # building job on jenkins server
+            self.jenkinsci.build_job(job)
+            journal.record("build_job", {"job": job})
+            print "Build trigered for job '%s'" % job
+        else:
+            print "All steps of curb for '%s' were already done" % username
 
     def create_user(self):
         """
@@ -364,16 +878,21 @@ The most commonly used ci commands are:
             description='Delete a user from gitlab server')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the user')
+        parser.add_argument('id', help='id, username or email of the user')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        uid = self._user_id(args.id, checked=True)
+        if uid is None:
+            return
+
         # deleting a user from gitlab server
-        resp = self.gitlabci.delete_user(args.id)
+        resp = self.gitlabci.delete_user(uid)
 
-        if resp.status_code == 200:
-            rdata = json.loads(resp.content)
+        if resp.status_code in DELETED:
+            # api v3 answers with the deleted user, v4 with no content
+            rdata = json.loads(resp.content) if resp.content else {"id": uid}
 
             # null content in response implies that user does't exist
             if not rdata:
@@ -381,7 +900,9 @@ The most commonly used ci commands are:
                 return
 
             # double checking that user was deleted from gitlab server
-            if rdata["id"] == int(args.id):
+            if rdata["id"] == uid:
+                self._gitlab_index().discard_user(uid)
+                self._gitlab_index().save()
                 print "User deleted successfully"
         else:
             print "Failed to delete user from gitlab server"
@@ -392,7 +913,8 @@ The most commonly used ci commands are:
         Function parses/process command line args,
         and lists all the users on gitlab server
         """
-        resp = self.gitlabci.list_users()
+        params = self._list_filter_params('List users on gitlab server')
+        resp = self.gitlabci.list_users(params)
         if resp.status_code == 200:
             print resp.content
         else:
@@ -404,7 +926,8 @@ The most commonly used ci commands are:
         Function parses/process command line args,
         and lists all the usernames on gitlab server
         """
-        print '\n'.join(sorted(self.gitlabci.list_usernames()))
+        params = self._list_filter_params('List usernames on gitlab server')
+        print '\n'.join(sorted(self.gitlabci.list_usernames(params)))
 
     def create_project(self):
         """
@@ -497,15 +1020,18 @@ The most commonly used ci commands are:
             description='Create a new project owned by user on gitlab server')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the user')
+        parser.add_argument('id', help='id, username or email of the user')
         parser.add_argument('project_name', help='name of the new project')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        uid = self._user_id(args.id)
+        if uid is None:
+            return
+
         # creating repo/project with params
-        resp = self.gitlabci.create_project_for_user(
-                args.id, args.project_name)
+        resp = self.gitlabci.create_project_for_user(uid, args.project_name)
         if resp.status_code == 201:
             print "Project '%s' created" % args.project_name
         else:
@@ -521,11 +1047,16 @@ The most commonly used ci commands are:
             description='Remove a new project from gitlab server')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('proj_id', help='id of the project')
+        parser.add_argument(
+                'proj_id', help='id or path (namespace/name) of the project')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        proj_id = self._project_id(args.proj_id, checked=True)
+        if proj_id is None:
+            return
+
         # confirm deletion from user
         confirm = confirm_yes_no(
                 "Do you really want to delete project ?", "no")
@@ -533,8 +1064,10 @@ The most commonly used ci commands are:
             return
 
         # removing project
-        resp = self.gitlabci.remove_project(args.proj_id)
-        if resp.status_code == 200:
+        resp = self.gitlabci.remove_project(proj_id)
+        if resp.status_code in DELETED:
+            self._gitlab_index().discard_project(proj_id)
+            self._gitlab_index().save()
             print "Project removed successfully"
         else:
             print "Failed to remove project"
@@ -572,15 +1105,20 @@ The most commonly used ci commands are:
             description='Add SSH key to gitlab user account')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the specified user')
+        parser.add_argument(
+                'id', help='id, username or email of the specified user')
         parser.add_argument('title', help='title for SSH key')
         parser.add_argument('key', help='a valid ssh key')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        uid = self._user_id(args.id)
+        if uid is None:
+            return
+
         # adding SSH key
-        resp = self.gitlabci.add_ssh_key_user(args.id, args.title, args.key)
+        resp = self.gitlabci.add_ssh_key_user(uid, args.title, args.key)
         if resp.status_code == 201:
             print "SSH key added successfully"
         else:
@@ -605,7 +1143,12 @@ The most commonly used ci commands are:
         resp = self.gitlabci.remove_ssh_key(args.id)
 
         # ensuring server response for key removal
-        if resp.status_code == 200:
+        if resp.status_code in DELETED:
+            # api v3 answers with the deleted key, v4 with no content
+            if not resp.content:
+                print "SSH key %s removed successfully" % args.id
+                return
+
             rdata = json.loads(resp.content)
             # null content in response implies that key does't exist
             if not rdata:
@@ -631,17 +1174,27 @@ The most commonly used ci commands are:
             description='Remove a SSH key from gitlab user account and key id')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('uid', help='id of a gitlab user')
+        parser.add_argument(
+                'uid', help='id, username or email of a gitlab user')
         parser.add_argument('kid', help='id of a SSH key')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        uid = self._user_id(args.uid)
+        if uid is None:
+            return
+
         # removing SSH key
-        resp = self.gitlabci.remove_ssh_key_for_user(args.uid, args.kid)
+        resp = self.gitlabci.remove_ssh_key_for_user(uid, args.kid)
 
         # ensuring server response for key removal
-        if resp.status_code == 200:
+        if resp.status_code in DELETED:
+            # api v3 answers with the deleted key, v4 with no content
+            if not resp.content:
+                print "SSH key %s removed successfully" % args.kid
+                return
+
             rdata = json.loads(resp.content)
             # null content in response implies that key does't exist
             if not rdata:
@@ -682,13 +1235,17 @@ The most commonly used ci commands are:
             description='Add email for given user id')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the user')
+        parser.add_argument('id', help='id, username or email of the user')
         parser.add_argument('email', help='email to add')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
-        resp = self.gitlabci.add_email_for_user(args.id, args.email)
+        uid = self._user_id(args.id)
+        if uid is None:
+            return
+
+        resp = self.gitlabci.add_email_for_user(uid, args.email)
         print resp.content
 
     def list_emails(self):
@@ -710,11 +1267,16 @@ The most commonly used ci commands are:
             description='List emails for given user id')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the user')
+        parser.add_argument('id', help='id, username or email of the user')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
-        resp = self.gitlabci.list_emails_for_user(args.id)
+
+        uid = self._user_id(args.id)
+        if uid is None:
+            return
+
+        resp = self.gitlabci.list_emails_for_user(uid)
         print resp.content
 
     def list_ssh_keys(self):
@@ -725,8 +1287,7 @@ The most commonly used ci commands are:
         # getting SSH keys
         resp = self.gitlabci.list_ssh_keys()
         if resp.status_code == 200:
-            rdata = json.loads(resp.content)
-            for item in rdata:
+            for item in Key.view(json.loads(resp.content)):
                 print "ID:", item["id"]
                 print "Title:", item["title"]
                 print "Key:", item["key"]
@@ -746,16 +1307,19 @@ The most commonly used ci commands are:
             description='List SSH keys for given user id')
 
         # for not optional arguments, dont use -- prefix
-        parser.add_argument('id', help='id of the user')
+        parser.add_argument('id', help='id, username or email of the user')
 
         # parse args for this command
         args = parser.parse_args(sys.argv[2:])
 
+        uid = self._user_id(args.id)
+        if uid is None:
+            return
+
         # getting SSH keys
-        resp = self.gitlabci.list_ssh_keys_for_user(args.id)
+        resp = self.gitlabci.list_ssh_keys_for_user(uid)
         if resp.status_code == 200:
-            rdata = json.loads(resp.content)
-            for item in rdata:
+            for item in Key.view(json.loads(resp.content)):
                 print "ID:", item["id"]
                 print "Title:", item["title"]
                 print "Key:", item["key"]
@@ -764,6 +1328,128 @@ The most commonly used ci commands are:
             print "Failed to get SSH keys"
             print "Server Response:", resp.content
 
+    def user_report(self):
+        """
+        Function parses/process command line args,
+        and reports all gitlab users with their ssh keys and emails
+
+        Servers with graphql send users with nested keys and emails in
+        batched queries, a page of users at a time, other servers are
+        read with concurrent rest requests, with same report either way
+
+        ** This command needs admin credentials **
+        """
+        parser = argparse.ArgumentParser(
+            description='Report gitlab users with their ssh keys and emails')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-f', '--format', choices=['table', 'yaml'],
+                default='table', help='output format')
+        parser.add_argument(
+                '-r', '--rest', action='store_true',
+                help='use rest api only, not graphql')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel rest requests')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        started = time.time()
+        try:
+            report, source = user_report(
+                self.gitlabci, not args.rest and self.gitlabci.version >= 4,
+                args.workers)
+        except Exception as e:
+            print "Error getting user report:", e
+            return
+        elapsed = time.time() - started
+
+        if args.format == 'yaml':
+            print yaml.safe_dump(report)
+        else:
+            print_table(
+                ["ID", "USERNAME", "NAME", "STATE", "KEYS", "EMAILS"],
+                [(u["id"], u["username"], (u["name"] or "").encode("utf-8"),
+                  u["state"], len(u["keys"]),
+                  ", ".join(u["emails"]).encode("utf-8"))
+                 for u in report])
+        sys.stderr.write("%d users read with %s in %s\n" % (
+            len(report), source, format_duration(elapsed)))
+
+    def sync_index(self):
+        """
+        Function parses/process command line args,
+        and refreshes local index of gitlab user and project ids
+
+        ** This command needs admin credentials **
+        """
+        parser = argparse.ArgumentParser(
+            description='Refresh local index of gitlab user and project ids')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of pages fetched in parallel')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        index = self._gitlab_index()
+        index.sync(args.workers)
+        print "Indexed %d user names and %d projects" % (
+                len(index.data["users"]), len(index.data["projects"]))
+
+    def reconcile(self):
+        """
+        Function parses/process command line args,
+        and brings gitlab users, ssh keys, emails and projects to the
+        state described in a yaml file, only missing things are created
+
+        ** This command needs admin credentials **
+        """
+        parser = argparse.ArgumentParser(
+            description='Reconcile gitlab server with a desired state')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('state', help='yaml file with desired state')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-n', '--dry-run', action='store_true',
+                help='only show the plan, dont change anything')
+        parser.add_argument(
+                '-p', '--prune', action='store_true',
+                help='remove ssh keys and emails not in desired state')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel requests to gitlab server')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        try:
+            desired = load_desired_state(args.state)
+        except (EnvironmentError, ValueError) as e:
+            print "Failed to load desired state:", e
+            return
+
+        state = snapshot(
+                self.gitlabci, [u["username"] for u in desired], args.workers)
+        changes = make_plan(desired, state, args.prune)
+        if not changes:
+            print "Gitlab server is in desired state"
+            return
+
+        if not args.dry_run:
+            apply_plan(self.gitlabci, changes, state, args.workers)
+
+        print_table(
+            ["ACTION", "USER", "TARGET", "STATUS", "DETAIL"],
+            [(c["action"], c["user"], c["target"], c["status"], c["detail"])
+             for c in changes])
+
     def create_job(self):
         """
         Function parses/process command line args,
@@ -801,6 +1487,391 @@ The most commonly used ci commands are:
         except:
             print "Failed to create job '%s'" % args.name
 
+    def create_jobs(self):
+        """
+        Function parses/process command line args,
+        and creates jobs on jenkins server from a config xml template,
+        one job for each row of a parameter table
+        """
+        parser = argparse.ArgumentParser(
+            description='Create jobs from a config template on jenkins server')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'template', help='config xml with ${placeholders}')
+        parser.add_argument(
+                'params', help='csv or yaml table of params, one row per job')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of jobs created in parallel')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        # template is parsed once and rendered for every row
+        template = JobTemplate(get_file_data(args.template))
+        try:
+            rows = load_param_table(args.params)
+        except (EnvironmentError, ValueError) as e:
+            print "Failed to load params:", e
+            return
+
+        # jobs that already exist are decided from a single job list fetch
+        existing = set(self.jenkinsci.get_jobs_names())
+
+        # one result row per param row, jobs to create are rendered up front
+        results = []
+        todo = []
+        for row in rows:
+            if row["name"] in existing:
+                results.append([row["name"], "skipped", "already exists"])
+                continue
+            try:
+                todo.append((len(results), row["name"], template.render(row)))
+                results.append([row["name"], "", ""])
+            except KeyError as e:
+                results.append([row["name"], "failed", e.args[0]])
+            existing.add(row["name"])
+
+        def create(job):
+            self.jenkinsci.create_job(job[1], job[2])
+
+        for job, _, error in run_concurrently(create, todo, args.workers):
+            if error:
+                results[job[0]][1:] = ["failed", str(error) or "create failed"]
+            else:
+                results[job[0]][1] = "created"
+
+        print_table(["JOB", "STATUS", "DETAIL"], results)
+
+    def apply(self):
+        """
+        Function parses/process command line args,
+        and syncs a directory of <job name>.xml configs to jenkins server
+
+        Only jobs whose config differs from the server are created or
+        reconfigured. Hashes of configs known to be on the server are
+        cached locally, so unchanged jobs are not even fetched next time
+        """
+        parser = argparse.ArgumentParser(
+            description='Create or update jobs from a directory of configs')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('path', help='directory with <job name>.xml files')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel requests to jenkins server')
+        parser.add_argument(
+                '-r', '--refresh', action='store_true',
+                help='ignore cached hashes and fetch all remote configs')
+        parser.add_argument(
+                '-n', '--dry-run', action='store_true',
+                help='only show what would be changed')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        results = {}
+        local = {}
+        for job, xml in read_config_dir(args.path).items():
+            try:
+                local[job] = (xml, config_hash(xml))
+            except Exception as e:
+                results[job] = ["invalid", "failed", str(e)]
+
+        cache = ConfigHashCache(self.jenkinsci.url)
+        pending = [job for job in sorted(local)
+                   if args.refresh or cache.get(job) != local[job][1]]
+
+        # fetching remote configs only for jobs not known to be in sync
+        existing = set(self.jenkinsci.get_jobs_names()) if pending else set()
+
+        def remote_hash(job):
+            return config_hash(self.jenkinsci.get_job_config(job))
+
+        changes = []
+        for job in pending:
+            if job not in existing:
+                changes.append((job, "create"))
+        fetched = run_concurrently(
+                remote_hash, [j for j in pending if j in existing],
+                args.workers)
+        for job, digest, error in fetched:
+            if error:
+                results[job] = ["fetch", "failed", str(error)]
+            elif digest == local[job][1]:
+                cache.set(job, digest)
+            else:
+                changes.append((job, "update"))
+
+        for job in local:
+            if job not in results:
+                results[job] = ["none", "in sync", ""]
+
+        def push(change):
+            job, action = change
+            if action == "create":
+                self.jenkinsci.create_job(job, local[job][0])
+            else:
+                self.jenkinsci.reconfig_job(job, local[job][0])
+
+        if args.dry_run:
+            for job, action in changes:
+                results[job] = [action, "pending", ""]
+        else:
+            for change, _, error in run_concurrently(
+                    push, changes, args.workers):
+                job, action = change
+                if error:
+                    cache.discard(job)
+                    results[job] = [action, "failed", str(error)]
+                else:
+                    cache.set(job, local[job][1])
+                    results[job] = [action, "done", ""]
+        cache.save()
+
+        print_table(["JOB", "ACTION", "STATUS", "DETAIL"],
+                    [[job] + results[job] for job in sorted(results)])
+
+    def backup(self):
+        """
+        Function parses/process command line args,
+        and backs up configs of all jobs, folders and views of jenkins
+        server into a new archive in given directory
+
+        Configs are fetched in parallel. An incremental backup stores
+        only configs changed since the newest archive in the directory
+        """
+        parser = argparse.ArgumentParser(
+            description='Back up job and view configs of jenkins server')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('path', help='directory of backup archives')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-i', '--incremental', action='store_true',
+                help='store only configs changed since last backup')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel requests to jenkins server')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        base = None
+        if args.incremental:
+            last = latest_archive(args.path)
+            if not last:
+                print "No backup in %s, making a full backup" % args.path
+            else:
+                try:
+                    base = read_manifest(last)
+                except (ValueError, EnvironmentError) as e:
+                    print "Error,", e
+                    return
+
+        if not os.path.isdir(args.path):
+            os.makedirs(args.path)
+        fpath = os.path.join(args.path, archive_name())
+
+        def fetch(kind, name):
+            if kind == 'views':
+                return self.jenkinsci.get_view_config(name)
+            return self.jenkinsci.get_job_config(name)
+
+        start = time.time()
+        items = self.jenkinsci.get_all_items()
+        views = self.jenkinsci.get_views_names()
+        manifest, failed = write_backup(
+                fpath, items, views, fetch, base, args.workers)
+
+        for kind, name, error in failed:
+            print "Failed to back up %s '%s': %s" % (kind[:-1], name, error)
+        stored = sum(1 for kind in ('jobs', 'views')
+                     for entry in manifest[kind].values()
+                     if entry['archive'] == manifest['archive'])
+        print "Backed up %d jobs and %d views to %s in %s, %d configs " \
+              "stored, %d failed" % (
+                len(manifest['jobs']), len(manifest['views']), fpath,
+                format_duration(time.time() - start), stored, len(failed))
+
+    def restore(self):
+        """
+        Function parses/process command line args,
+        and recreates jobs, folders and views of a backup archive on
+        jenkins server
+
+        Jobs are restored level by level of folders, items of a level
+        in parallel, so folders exist before the items in them. Items
+        already on server are reconfigured
+        """
+        parser = argparse.ArgumentParser(
+            description='Restore jobs and views from a backup archive')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('archive', help='backup archive to restore')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel requests to jenkins server')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        try:
+            manifest, configs = read_backup(args.archive)
+        except (ValueError, EnvironmentError) as e:
+            print "Error,", e
+            return
+
+        start = time.time()
+        jobs = set(i['name'] for i in self.jenkinsci.get_all_items())
+        views = set(self.jenkinsci.get_views_names())
+
+        def put_job(name):
+            config = configs[('jobs', name)]
+            if name in jobs:
+                self.jenkinsci.reconfig_job(name, config)
+            else:
+                self.jenkinsci.create_job(name, config)
+
+        def put_view(name):
+            config = configs[('views', name)]
+            if name in views:
+                self.jenkinsci.reconfig_view(name, config)
+            else:
+                self.jenkinsci.create_view(name, config)
+
+        # items of folders which failed to restore are skipped
+        failed = set()
+        for level in depth_levels(manifest['jobs']):
+            pending = []
+            for name in level:
+                if name.rsplit('/', 1)[0] in failed:
+                    print "Skipped job '%s', its folder wasn't restored" % (
+                            name)
+                    failed.add(name)
+                else:
+                    pending.append(name)
+            for name, _, error in run_concurrently(
+                    put_job, pending, args.workers):
+                if error:
+                    print "Failed to restore job '%s': %s" % (name, error)
+                    failed.add(name)
+
+        failed_views = 0
+        for name, _, error in run_concurrently(
+                put_view, sorted(manifest['views']), args.workers):
+            if error:
+                print "Failed to restore view '%s': %s" % (name, error)
+                failed_views += 1
+
+        print "Restored %d of %d jobs and %d of %d views in %s" % (
+                len(manifest['jobs']) - len(failed), len(manifest['jobs']),
+                len(manifest['views']) - failed_views, len(manifest['views']),
+                format_duration(time.time() - start))
+
+    def migrate_jobs(self):
+        """
+        Function parses/process command line args,
+        and copies jobs matching a pattern, with the folders they are
+        in, from a jenkins server to another one
+
+        Servers are named as in --servers, configs are fetched from
+        source while fetched ones are being created on destination.
+        Jobs already on destination with same config are left as they
+        are, like with apply
+        """
+        parser = argparse.ArgumentParser(
+            description='Copy jobs from a jenkins server to another one')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('source', help='name of server to copy from')
+        parser.add_argument('destination', help='name of server to copy to')
+        parser.add_argument(
+                'pattern', help="shell pattern of full job names, "
+                "eg 'team/*' or '*-deploy'")
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of parallel requests to each server')
+        parser.add_argument(
+                '-n', '--dry-run', action='store_true',
+                help='only show what would be changed')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        sections = dict(get_server_sections(self.config, 'ci'))
+        for name in (args.source, args.destination):
+            if name not in sections:
+                print "Error, unknown jenkins server '%s'" % name
+                return
+        if args.source == args.destination:
+            print "Error, source and destination are same server"
+            return
+        source = self._make_jenkinsci(sections[args.source])
+        destination = self._make_jenkinsci(sections[args.destination])
+
+        start = time.time()
+        items = select_items(source.get_all_items(), args.pattern)
+        if not items:
+            print "No jobs matching '%s' on '%s'" % (
+                    args.pattern, args.source)
+            return
+        existing = set(i['name'] for i in destination.get_all_items())
+        cache = ConfigHashCache(destination.url)
+
+        def push(item, config):
+            name = item['name']
+            digest = config_hash(config)
+            if name not in existing:
+                action = 'create'
+            elif item['ancestor'] or cache.get(name) == digest:
+                # folders copied only to hold selected jobs are kept
+                action = 'none'
+            elif config_hash(destination.get_job_config(name)) == digest:
+                action = 'none'
+            else:
+                action = 'update'
+
+            if args.dry_run or action == 'none':
+                return action
+            if action == 'create':
+                destination.create_job(name, config)
+            else:
+                destination.reconfig_job(name, config)
+            cache.set(name, digest)
+            return action
+
+        migration = Migration(source.get_job_config, push, args.workers)
+        results = migration.run(items)
+        elapsed = max(time.time() - start, 0.001)
+        if not args.dry_run:
+            cache.save()
+
+        print_table(["JOB", "ACTION", "STATUS", "DETAIL"],
+                    [list(result) for result in sorted(results)])
+        print
+        done = [r for r in results if r[2] == 'done']
+        print "%d jobs in %s: %d created, %d updated, %d unchanged, " \
+              "%d failed, %d skipped" % (
+                len(results), format_duration(elapsed),
+                sum(1 for r in done if r[1] == 'create'),
+                sum(1 for r in done if r[1] == 'update'),
+                sum(1 for r in done if r[1] == 'none'),
+                sum(1 for r in results if r[2] == 'failed'),
+                sum(1 for r in results if r[2] == 'skipped'))
+        print "Throughput: %.1f jobs/s, %.1f KB/s of configs" % (
+                len(results) / elapsed, migration.bytes / 1024.0 / elapsed)
+
     def create_view(self):
         """
         Function parses/process command line args,
@@ -903,15 +1974,420 @@ The most commonly used ci commands are:
         Function parses/process command line args,
         and gets a queue of jenkins jobs to be done
         """
+        if self.servers:
+            rows = []
+            for server, items in self._fan_out(
+                    'ci', lambda ci: ci.get_queue_items()):
+                for item in items:
+                    rows.append((server, item["id"],
+                                 (item.get("task") or {}).get("name"),
+                                 item.get("why")))
+            print_table(["SERVER", "ID", "JOB", "WHY"], rows)
+            return
+
         # getting jobs' queue
         print self.jenkinsci.get_queue_info()
 
+    def watch_queue(self):
+        """
+        Function parses/process command line args,
+        and watches the queue of jenkins jobs
+
+        Only queue items which entered, left or changed since previous
+        poll are printed, with stats of time items are waiting. Polling
+        gets faster while queue changes and slower while it is idle
+        """
+        parser = argparse.ArgumentParser(
+            description='Watch the queue of jobs on jenkins server')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-i', '--interval', type=float, default=1.0,
+                help='shortest polling interval in seconds')
+        parser.add_argument(
+                '-m', '--max-interval', type=float, default=30.0,
+                help='longest polling interval in seconds')
+        parser.add_argument(
+                '-c', '--count', type=int,
+                help='stop after given number of polls')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        interval = AdaptiveInterval(args.interval, args.max_interval)
+        previous = {}
+        polls = 0
+        try:
+            while True:
+                current = queue_snapshot(self.jenkinsci.get_queue_items())
+                now = int(time.time() * 1000)
+
+                lines = format_delta(previous, current, now)
+                if lines or not polls:
+                    print time.strftime("%H:%M:%S"), \
+                        "queue: %d items, waiting min %.1fs " \
+                        "avg %.1fs max %.1fs" % wait_stats(current, now)
+                    for line in lines:
+                        print "  ", line
+                    sys.stdout.flush()
+
+                previous = current
+                polls += 1
+                if args.count and polls >= args.count:
+                    return
+                time.sleep(interval.next(bool(lines)))
+        except KeyboardInterrupt:
+            pass
+
+    def running_builds(self):
+        """
+        Function parses/process command line args,
+        and shows builds running on all executors of jenkins server
+        with their elapsed time against estimated time
+        """
+        parser = argparse.ArgumentParser(
+            description='Get running builds on jenkins server')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-s', '--sort', choices=['elapsed', 'progress', 'node'],
+                default='elapsed', help='sort order of builds')
+        parser.add_argument(
+                '-w', '--watch', action='store_true',
+                help='refresh the list like top until interrupted')
+        parser.add_argument(
+                '-i', '--interval', type=float, default=2.0,
+                help='refresh interval in seconds for --watch')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        def progress(build):
+            if build["estimated"] <= 0:
+                return -1
+            return 100.0 * build["elapsed"] / build["estimated"]
+
+        try:
+            while True:
+                now = time.time()
+                builds = self.jenkinsci.get_executing_builds()
+                for build in builds:
+                    build["elapsed"] = max(0, now - build["started"] / 1000.0)
+                    build["estimated"] = build["estimated"] / 1000.0
+
+                if args.sort == "node":
+                    builds.sort(key=lambda b: (b["node"], -b["elapsed"]))
+                elif args.sort == "progress":
+                    builds.sort(key=progress, reverse=True)
+                else:
+                    builds.sort(key=lambda b: b["elapsed"], reverse=True)
+
+                if args.watch:
+                    # clear screen and move cursor to top left
+                    sys.stdout.write("\033[H\033[2J")
+                    print time.strftime("%H:%M:%S"), \
+                        "%d running builds" % len(builds)
+
+                print_table(
+                    ["NODE", "JOB", "BUILD", "ELAPSED", "ESTIMATED", "%"],
+                    [(b["node"], b["job"], b["number"],
+                      format_duration(b["elapsed"]),
+                      format_duration(b["estimated"])
+                      if b["estimated"] > 0 else "?",
+                      "%d" % progress(b) if progress(b) >= 0 else "?")
+                     for b in builds])
+                sys.stdout.flush()
+
+                if not args.watch:
+                    return
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+
+    def sync_history(self):
+        """
+        Function parses/process command line args,
+        and fetches build history of jobs into local history store
+
+        Sync is incremental, first and last build numbers of all jobs
+        come in one request and only builds newer than the last synced
+        one are fetched for jobs that have new builds
+        """
+        parser = argparse.ArgumentParser(
+            description='Store build history of jenkins jobs locally')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'jobs', nargs='*', help='names of jobs, default all jobs')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-b', '--builds', type=int, default=100,
+                help='number of builds fetched per request')
+        parser.add_argument(
+                '-f', '--full', action='store_true',
+                help='forget stored history and sync from scratch')
+        parser.add_argument(
+                '-v', '--verify', action='store_true',
+                help='also drop stored builds deleted on server')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=8,
+                help='number of jobs fetched in parallel')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        if args.jobs:
+            # jobs named, maybe in folders, are asked one by one
+            marks = []
+            for job, mark, error in run_concurrently(
+                    self.jenkinsci.get_build_mark, args.jobs, args.workers):
+                if error:
+                    print "Failed to get builds of job '%s': %s" % (
+                            job, error)
+                else:
+                    marks.append(mark)
+        else:
+            marks = self.jenkinsci.get_build_marks()
+
+        index = HistoryIndex(self.jenkinsci.url)
+
+        def sync(mark):
+            job = mark["name"]
+            fpath = history_path(self.jenkinsci.url, job)
+            hwm, first = (0, None) if args.full else index.get(job)
+            if args.full and os.path.exists(fpath):
+                os.remove(fpath)
+
+            def fetch(start, end):
+                return self.jenkinsci.get_builds(job, start, end)
+
+            hwm, fetched = sync_job(
+                    fetch, fpath, mark, hwm, first, args.builds)
+
+            if args.verify and mark["last"] is not None:
+                numbers = set(b["number"] for b in self.jenkinsci.get_builds(
+                    job, 0, mark["last"] + 1, "number"))
+                history = BuildHistory.load(fpath)
+                history.keep(lambda n: n in numbers)
+                history.save(fpath)
+            return hwm, fetched
+
+        synced = updated = failed = 0
+        for mark, result, error in run_concurrently(
+                sync, marks, args.workers):
+            if error:
+                print "Failed to sync history of job '%s': %s" % (
+                        mark["name"], error)
+                failed += 1
+                continue
+            index.set(mark["name"], result[0], mark["first"])
+            synced += result[1]
+            updated += bool(result[1])
+        index.save()
+
+        print "Synced %d new builds of %d jobs, %d jobs had no new builds" % (
+                synced, updated, len(marks) - updated - failed)
+
+    def analytics(self):
+        """
+        Function parses/process command line args,
+        and shows duration percentiles, failure rates and duration
+        trends of jobs from local history store
+        """
+        parser = argparse.ArgumentParser(
+            description='Get build analytics of jenkins jobs')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'jobs', nargs='*',
+                help='names of jobs, default all jobs with stored history')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-d', '--days', type=int,
+                help='only use builds of last given days')
+        parser.add_argument(
+                '-s', '--sort',
+                choices=['p50', 'p95', 'failure_rate', 'trend', 'builds'],
+                default='p95', help='column to sort jobs by')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        stats = []
+        for job in args.jobs or stored_jobs(self.jenkinsci.url):
+            history = BuildHistory.load(
+                    history_path(self.jenkinsci.url, job))
+            if args.days:
+                history = history.since(
+                        (time.time() - args.days * 86400) * 1000)
+            if len(history):
+                stats.append((job, analyze(history)))
+
+        stats.sort(key=lambda s: s[1][args.sort], reverse=True)
+        print_table(
+            ["JOB", "BUILDS", "FAILURES", "P50", "P95", "TREND"],
+            [(job, s["builds"], "%.1f%%" % (100 * s["failure_rate"]),
+              format_duration(s["p50"] / 1000),
+              format_duration(s["p95"] / 1000),
+              "%+.0f%%" % (100 * s["trend"]))
+             for job, s in stats])
+
+    def analyze_build(self):
+        """
+        Function parses/process command line args,
+        and matches console logs of builds, or saved log files, against
+        a library of failure signatures
+
+        Console text is streamed and all signatures are matched in a
+        single pass. Matches of completed builds are cached, saved logs
+        are scanned through mmap. Builds are grouped by signature
+        """
+        parser = argparse.ArgumentParser(
+            description='Find failure signatures in build console logs')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'builds', nargs='*',
+                help='builds as <job>#<number>, or job names for their '
+                     'latest completed builds')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-l', '--last', type=int, default=1,
+                help='number of latest completed builds of named jobs')
+        parser.add_argument(
+                '-x', '--failed', action='store_true',
+                help='only analyze builds which did not succeed')
+        parser.add_argument(
+                '-f', '--file', action='append', default=[],
+                help='saved console log to analyze, can be repeated')
+        parser.add_argument(
+                '-s', '--signatures',
+                help='yaml file with library of failure signatures')
+        parser.add_argument(
+                '-n', '--no-cache', action='store_true',
+                help='analyze builds again even if cached')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=4,
+                help='number of logs analyzed in parallel')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        if not args.builds and not args.file:
+            print "Error, no builds or log files to analyze"
+            return
+
+        try:
+            matcher = SignatureMatcher(load_signatures(args.signatures))
+        except (EnvironmentError, ValueError) as e:
+            print "Error, Can't load signatures:", e
+            return
+        categories = dict((s["name"], s.get("category", ""))
+                          for s in matcher.signatures)
+
+        def resolve(spec):
+            # returns python list of (job, number, completed)
+            if "#" in spec:
+                job, number = spec.rsplit("#", 1)
+                build = self.jenkinsci.get_json(
+                    "%s%s/" % (self.jenkinsci.job_path(job), number),
+                    "number,result,building")
+                return [(job, build["number"], not build["building"])]
+            builds = [b for b in self.jenkinsci.get_builds(
+                spec, 0, args.last + 1, "number,result")
+                if b["result"] is not None]
+            if args.failed:
+                builds = [b for b in builds if b["result"] != "SUCCESS"]
+            return [(spec, b["number"], True) for b in builds[:args.last]]
+
+        targets = []
+        for spec, builds, error in run_concurrently(
+                resolve, args.builds, args.workers):
+            if error:
+                print "Failed to get builds of '%s': %s" % (spec, error)
+            else:
+                targets.extend(builds)
+
+        cache = AnalysisCache(self.jenkinsci.url)
+
+        def scan(target):
+            if isinstance(target, basestring):
+                return matcher.scan_file(target)
+            job, number, completed = target
+            if completed and not args.no_cache:
+                matches = cache.get(job, number, matcher.digest)
+                if matches is not None:
+                    return matches
+            resp = self.jenkinsci.open_console(job, number)
+            try:
+                resp.raise_for_status()
+                return matcher.scan(transport.iter_response(resp))
+            finally:
+                resp.close()
+
+        results = []
+        for target, matches, error in run_concurrently(
+                scan, targets + args.file, args.workers):
+            if isinstance(target, basestring):
+                name = target
+            else:
+                name = "%s#%d" % target[:2]
+            if error:
+                print "Failed to analyze %s: %s" % (name, error)
+                continue
+            if not isinstance(target, basestring) and target[2]:
+                cache.set(target[0], target[1], matcher.digest, matches)
+            results.append((name, matches))
+        cache.save()
+
+        rows = []
+        for name, matches in results:
+            if not matches:
+                rows.append((name, "-", "", "no known signature"))
+            for signature, match in sorted(
+                    matches.items(), key=lambda m: m[1]["line"]):
+                rows.append((name, signature, match["line"],
+                             match["text"][:80].encode("utf-8")))
+        print_table(["BUILD", "SIGNATURE", "LINE", "FIRST MATCH"], rows)
+
+        groups = group_failures(results)
+        if groups:
+            print
+            print_table(
+                ["SIGNATURE", "CATEGORY", "BUILDS", "JOBS"],
+                [(signature, categories.get(signature, ""), len(builds),
+                  ", ".join(jobs)) for signature, builds, jobs in groups])
+
     def list_jobs(self):
         """
         Function returns a list of all jobs on jenkins server
         """
-        jobs = self.jenkinsci.get_jobs()
-        print yaml.safe_dump(jobs)
+        if self.servers:
+            jobs = []
+            for server, result in self._fan_out(
+                    'ci', lambda ci: ci.get_jobs()):
+                for job in result:
+                    jobs.append(dict(job.to_dict(), server=server))
+            print yaml.safe_dump(jobs)
+            return
+
+        self._print_yaml_items(self.jenkinsci.iter_jobs())
+
+    def _print_yaml_items(self, items):
+        """
+        Function prints items as a yaml list, each one as soon as it is
+        received, so huge lists start printing while they download
+        """
+        empty = True
+        for item in items:
+            sys.stdout.write(yaml.safe_dump([item.to_dict()]))
+            sys.stdout.flush()
+            empty = False
+        if empty:
+            print "[]"
 
     def get_jobs_names(self):
         """
@@ -920,12 +2396,25 @@ The most commonly used ci commands are:
         Sometimes useful when you want to look for a job name,
         and pass it to some other command/operation
         """
+        if self.servers:
+            print_table(
+                ["SERVER", "JOB"],
+                [(server, name) for server, names in self._fan_out(
+                    'ci', lambda ci: ci.get_jobs_names()) for name in names])
+            return
+
         print '\n'.join(self.jenkinsci.get_jobs_names())
 
     def jobs_count(self):
         """
         Function returns a count of jobs on jenkins server
         """
+        if self.servers:
+            counts = self._fan_out('ci', lambda ci: ci.jobs_count())
+            print_table(["SERVER", "JOBS"],
+                        counts + [("total", sum(c for _, c in counts))])
+            return
+
         print "Jobs count:", self.jenkinsci.jobs_count()
 
     def enable_job(self):
@@ -1000,6 +2489,158 @@ The most commonly used ci commands are:
         self.jenkinsci.build_job(args.name)
         print "Build trigered for job '%s'" % args.name
 
+    def build_jobs(self):
+        """
+        Function parses/process command line args,
+        and builds many jobs on jenkins server without flooding its queue
+
+        Builds are submitted at a token bucket rate, and only while the
+        queue has fewer items than the high water mark. Achieved submit
+        rate and queue wait times of submitted builds are reported
+        """
+        parser = argparse.ArgumentParser(
+            description='Builds many jobs on jenkins server, throttled')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('names', nargs='*', help='names of jobs to build')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-f', '--file',
+                help='file with names of jobs to build, one per line')
+        parser.add_argument(
+                '-r', '--rate', type=float, default=1.0,
+                help='builds submitted per second')
+        parser.add_argument(
+                '-b', '--burst', type=int, default=5,
+                help='builds that can be submitted at once')
+        parser.add_argument(
+                '-q', '--high-water', type=int, default=20,
+                help='submit only while queue has fewer items than this')
+        parser.add_argument(
+                '-i', '--interval', type=float, default=2.0,
+                help='queue polling interval in seconds')
+        parser.add_argument(
+                '-d', '--drain', type=float, default=0,
+                help='seconds to wait for submitted builds to leave queue')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        names = list(args.names)
+        if args.file:
+            with open(args.file) as f:
+                names.extend(line.strip() for line in f if line.strip())
+        if not names:
+            print "Error, no jobs to build"
+            return
+        if args.rate <= 0 or args.high_water <= 0:
+            print "Error, rate and high water mark must be positive"
+            return
+
+        trigger = ThrottledTrigger(
+            self.jenkinsci.build_job, self.jenkinsci.get_queue_items,
+            TokenBucket(args.rate, args.burst), args.high_water,
+            args.interval)
+
+        started = time.time()
+        try:
+            for i, name in enumerate(names):
+                if trigger.submit(name):
+                    print "[%d/%d] Build trigered for job '%s', " \
+                        "queue %d" % (i + 1, len(names), name,
+                                      trigger.queue_length())
+                else:
+                    print "[%d/%d] Error, Can't build job '%s': %s" % (
+                        i + 1, len(names), name, trigger.failed[-1][1])
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            print "Interrupted"
+        elapsed = time.time() - started
+
+        still_queued = 0
+        if args.drain > 0 and trigger.submitted:
+            still_queued = trigger.drain(args.drain)
+
+        print
+        print "Submitted %d builds in %s, %.2f builds/s" % (
+            trigger.submitted, format_duration(elapsed),
+            trigger.submitted / elapsed if elapsed > 0 else 0.0)
+        if trigger.failed:
+            print "Failed to trigger %d builds" % len(trigger.failed)
+        waits = sorted(trigger.waits)
+        if waits:
+            print "Queue wait of %d builds: min %.1fs, p50 %.1fs, " \
+                "p95 %.1fs, max %.1fs" % (
+                    len(waits), waits[0], percentile(waits, 50),
+                    percentile(waits, 95), waits[-1])
+        if still_queued:
+            print "%d builds still queued" % still_queued
+
+    def batch_jobs(self):
+        """
+        Function parses/process command line args,
+        and runs enable/disable/delete/rename/build operations on many
+        jobs as a batch
+
+        Batch runs server side through script console in chunks of
+        operations, falling back to rest api per job when script console
+        isn't permitted
+        """
+        parser = argparse.ArgumentParser(
+            description='Run operations on many jobs on jenkins server')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument(
+                'action', nargs='?',
+                choices=['enable', 'disable', 'delete', 'build'],
+                help='action for all named jobs')
+        parser.add_argument('names', nargs='*', help='names of jobs')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-f', '--file',
+                help='file of operations, one per line like '
+                     '"disable <job>" or "rename <job> <new name>"')
+        parser.add_argument(
+                '-c', '--chunk', type=int, default=100,
+                help='operations per script console request')
+        parser.add_argument(
+                '-r', '--rest', action='store_true',
+                help='use rest api only, not script console')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        operations = [make_operation(args.action, name)
+                      for name in args.names] if args.action else []
+        if args.file:
+            try:
+                operations.extend(load_operations(args.file))
+            except (EnvironmentError, ValueError) as e:
+                print "Error, Can't load operations:", e
+                return
+        if not operations:
+            print "Error, no operations to run"
+            return
+
+        if args.rest:
+            self.jenkinsci.script_console = False
+        started = time.time()
+        results = self.jenkinsci.run_batch(operations, args.chunk)
+        elapsed = time.time() - started
+
+        print_table(
+            ["ACTION", "JOB", "STATUS", "VIA", "DETAIL"],
+            [(r["action"], r["job"] if not r["to"] else "%s -> %s" % (
+                r["job"], r["to"]), r["status"], r["via"], r["detail"])
+             for r in results])
+        failed = len([r for r in results if r["status"] == "error"])
+        unknown = len([r for r in results if r["status"] == "unknown"])
+        print
+        print "%d operations in %s, %d failed, %d unknown" % (
+            len(results), format_duration(elapsed), failed, unknown)
+
     def rename_job(self):
         """
         Function parses/process command line args,
@@ -1055,6 +2696,69 @@ The most commonly used ci commands are:
         # getting last build info
         print self.jenkinsci.get_last_build_info(args.name)
 
+    def download_artifacts(self):
+        """
+        Function parses/process command line args,
+        and downloads artifacts of a build, or of latest builds, of a job
+
+        Artifacts are downloaded in parallel and streamed to disk,
+        partial files are resumed and files already downloaded skipped
+        """
+        parser = argparse.ArgumentParser(
+            description='Download artifacts of builds of a job')
+
+        # for not optional arguments, dont use -- prefix
+        parser.add_argument('name', help='name of the job')
+        parser.add_argument(
+                'build', nargs='?', type=int,
+                help='build number, default last completed build')
+
+        # use -- prefix for an optional argument
+        parser.add_argument(
+                '-l', '--latest', type=int,
+                help='download artifacts of latest given number of builds')
+        parser.add_argument(
+                '-d', '--dest', default='.',
+                help='directory to download into, as <job>/<build>/<path>')
+        parser.add_argument(
+                '-w', '--workers', type=int, default=4,
+                help='number of parallel downloads')
+
+        # parse args for this command
+        args = parser.parse_args(sys.argv[2:])
+
+        # before downloading, ensure the job exists
+        if not self.jenkinsci.job_exists(args.name):
+            print "Error, Can't download artifacts"
+            print "Job '%s' doesn't exist" % args.name
+            return
+
+        if args.build:
+            numbers = [args.build]
+        elif args.latest:
+            numbers = [b["number"] for b in self.jenkinsci.get_builds(
+                args.name, 0, args.latest, "number")]
+        else:
+            info = self.jenkinsci.get_job_info(args.name)
+            numbers = [info["lastCompletedBuild"]["number"]]
+
+        downloads = []
+        for number in numbers:
+            build = self.jenkinsci.get_build_artifacts(args.name, number)
+            for artifact in list_artifacts(build):
+                dest = os.path.join(
+                    args.dest, args.name, str(number), artifact["path"])
+                downloads.append((artifact, dest))
+
+        def download(item):
+            return download_artifact(self.jenkinsci, item[0], item[1])
+
+        print_table(
+            ["ARTIFACT", "STATUS"],
+            [(item[1], status or "failed: %s" % error)
+             for item, status, error in run_concurrently(
+                download, downloads, args.workers)])
+
     def delete_job(self):
         """
         Function parses/process command line args,
@@ -1145,6 +2849,14 @@ The most commonly used ci commands are:
         Function parses/process command line args and
         shows names all installed plugins on jenkins server
         """
+        if self.servers:
+            print_table(
+                ["SERVER", "PLUGIN"],
+                [(server, name) for server, names in self._fan_out(
+                    'ci', lambda ci: ci.get_plugin_names())
+                 for name in sorted(names)])
+            return
+
         print '\n'.join(sorted(self.jenkinsci.get_plugin_names()))
 
 
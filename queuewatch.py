@@ -0,0 +1,98 @@
+##############################################################################
+#
+# watching jenkins build queue, consecutive queue snapshots are diffed
+# by queue item id so only changes need to be shown
+#
+##############################################################################
+
+
+def item_state(item):
+    """
+    Function returns a short state of a queue item
+    """
+    for state in ("stuck", "blocked", "buildable"):
+        if item.get(state):
+            return state
+    return "waiting"
+
+
+def queue_snapshot(items):
+    """
+    Function returns a dict of queue item id to a compact tuple of
+    (job name, state, why, in queue since in ms) for given queue items
+    """
+    snapshot = {}
+    for item in items:
+        task = item.get("task") or {}
+        snapshot[item["id"]] = (task.get("name", "?"), item_state(item),
+                                item.get("why") or "",
+                                item.get("inQueueSince") or 0)
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    """
+    Function compares two queue snapshots
+
+    Returns a tuple of sorted lists of queue item ids which
+    (entered, left, changed) the queue
+    """
+    entered = sorted(i for i in new if i not in old)
+    left = sorted(i for i in old if i not in new)
+    changed = sorted(i for i in new if i in old and new[i] != old[i])
+    return entered, left, changed
+
+
+def wait_stats(snapshot, now_ms):
+    """
+    Function returns (count, min, mean, max) of seconds items of
+    given snapshot have been waiting in queue
+    """
+    waits = [max(0, now_ms - item[3]) / 1000.0
+             for item in snapshot.values()]
+    if not waits:
+        return 0, 0, 0, 0
+    return len(waits), min(waits), sum(waits) / len(waits), max(waits)
+
+
+def format_delta(old, new, now_ms):
+    """
+    Function returns a python list of lines describing changes
+    from old to new queue snapshot
+    """
+    lines = []
+    entered, left, changed = diff_snapshots(old, new)
+
+    for i in entered:
+        name, state, why, _ = new[i]
+        lines.append("+ %-8s %-30s %-9s %s" % (i, name, state, why))
+    for i in changed:
+        name, state, why, _ = new[i]
+        lines.append("~ %-8s %-30s %-9s %s" % (i, name, state, why))
+    for i in left:
+        name, _, _, since = old[i]
+        waited = max(0, now_ms - since) / 1000.0
+        lines.append("- %-8s %-30s left after %.1fs" % (i, name, waited))
+    return lines
+
+
+class AdaptiveInterval:
+    """
+    Class for a polling interval which shrinks while the polled data
+    keeps changing and grows back while it stays the same
+    """
+
+    def __init__(self, minimum=1.0, maximum=30.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = minimum
+
+    def next(self, changed):
+        """
+        Function returns the interval to wait before next poll
+        """
+        if changed:
+            self.value = max(self.minimum, self.value / 2)
+        else:
+            self.value = min(self.maximum, self.value * 1.5)
+        return self.value
@@ -0,0 +1,247 @@
+##############################################################################
+#
+# reconciling gitlab users, ssh keys, emails and projects with a
+# desired state described in a yaml file
+#
+##############################################################################
+
+import json
+import yaml
+
+from records import Key
+from utils import run_concurrently
+
+# response codes of successful gitlab mutations
+OK_CODES = (200, 201, 204)
+
+
+def normalize_key(key):
+    """
+    Function returns ssh key without its comment, keys are compared
+    by type and key data only
+    """
+    return " ".join(key.split()[:2])
+
+
+def load_desired_state(fpath):
+    """
+    Function loads desired gitlab state from a yaml file like:-
+
+        users:
+          - username: jdoe
+            name: John Doe
+            email: jdoe@example.com
+            password: secret123     # used only if user gets created
+            emails: [john@example.com]
+            keys:
+              - title: laptop
+                key: ssh-rsa AAAA...
+            projects: [website]
+
+    Returns a python list of user dicts
+    """
+    with open(fpath) as f:
+        data = yaml.safe_load(f) or {}
+
+    users = data.get("users") or []
+    for i, user in enumerate(users):
+        for field in ("username", "name", "email"):
+            if not user.get(field):
+                raise ValueError("user %d has no %s" % (i + 1, field))
+        user.setdefault("emails", [])
+        user.setdefault("keys", [])
+        user.setdefault("projects", [])
+        for key in user["keys"]:
+            if not key.get("title") or not key.get("key"):
+                raise ValueError(
+                    "ssh key of user '%s' needs title and key" %
+                    user["username"])
+    return users
+
+
+class GitlabState:
+    """
+    Class for an in memory snapshot of gitlab server state,
+    indexed for lookups by username, ssh key, email and project path
+    """
+
+    def __init__(self):
+        # username -> user dict
+        self.users = {}
+
+        # username -> {normalized key: key dict}
+        self.keys = {}
+
+        # username -> {email: email dict}
+        self.emails = {}
+
+        # set of (namespace, project name) and (namespace, project path)
+        self.projects = set()
+
+    def add_project(self, project):
+        namespace = project["path_with_namespace"].rsplit("/", 1)[0]
+        self.projects.add((namespace, project["name"]))
+        self.projects.add((namespace, project["path"]))
+
+    def has_project(self, username, name):
+        return (username, name) in self.projects
+
+
+def snapshot(gitlabci, usernames, workers=8):
+    """
+    Function reads current state of gitlab server into a GitlabState
+
+    Users and projects lists are read in parallel with all their pages,
+    ssh keys and emails are then read in parallel only for the users
+    in given usernames
+    """
+    state = GitlabState()
+
+    lists = run_concurrently(
+            lambda read: read(workers),
+            [gitlabci.list_all_users, gitlabci.list_all_projects], 2)
+    for _, _, error in lists:
+        if error:
+            raise error
+
+    for user in lists[0][1]:
+        state.users[user["username"]] = user
+    for project in lists[1][1]:
+        state.add_project(project)
+
+    def read_user_data(task):
+        username, kind = task
+        uid = state.users[username]["id"]
+        if kind == "keys":
+            resp = gitlabci.list_ssh_keys_for_user(uid)
+        else:
+            resp = gitlabci.list_emails_for_user(uid)
+        if resp.status_code != 200:
+            raise Exception("Failed to get %s of user '%s': %s" % (
+                kind, username, resp.content))
+        items = json.loads(resp.content)
+        return [Key.from_dict(k) for k in items] if kind == "keys" else items
+
+    tasks = [(username, kind)
+             for username in usernames if username in state.users
+             for kind in ("keys", "emails")]
+    for task, items, error in run_concurrently(read_user_data, tasks, workers):
+        if error:
+            raise error
+        username, kind = task
+        if kind == "keys":
+            state.keys[username] = dict(
+                (normalize_key(k["key"]), k) for k in items)
+        else:
+            state.emails[username] = dict((e["email"], e) for e in items)
+    return state
+
+
+def make_plan(desired, state, prune=False):
+    """
+    Function returns a python list of changes needed to bring the
+    gitlab state to desired state
+
+    Each change is a dict with action, user, target and data keys.
+    With prune, ssh keys and emails of desired users which are not
+    in desired state get removed
+    """
+    changes = []
+
+    def change(action, user, target, data=None):
+        changes.append({"action": action, "user": user["username"],
+                        "target": target, "data": data,
+                        "status": "pending", "detail": ""})
+
+    for user in desired:
+        username = user["username"]
+        if username not in state.users:
+            change("create_user", user, username, user)
+
+        keys = state.keys.get(username, {})
+        wanted_keys = set()
+        for key in user["keys"]:
+            norm = normalize_key(key["key"])
+            wanted_keys.add(norm)
+            if norm not in keys:
+                change("add_ssh_key", user, key["title"], key)
+
+        emails = state.emails.get(username, {})
+        for email in user["emails"]:
+            # primary email is never listed with secondary emails
+            if email not in emails and email != user["email"]:
+                change("add_email", user, email)
+
+        for name in user["projects"]:
+            if not state.has_project(username, name):
+                change("create_project", user, name)
+
+        if prune:
+            for norm, key in sorted(keys.items()):
+                if norm not in wanted_keys:
+                    change("remove_ssh_key", user, key["title"], key)
+            for email, data in sorted(emails.items()):
+                if email not in user["emails"]:
+                    change("remove_email", user, email, data)
+    return changes
+
+
+def apply_plan(gitlabci, changes, state, workers=8):
+    """
+    Function applies changes of a plan on gitlab server
+
+    Missing users are created first, in parallel, then rest of the
+    changes are applied in parallel. Status and detail of each change
+    dict are updated with the outcome
+    """
+    def apply_change(change):
+        action = change["action"]
+        data = change["data"]
+
+        if action == "create_user":
+            if not data.get("password"):
+                raise Exception("password is needed to create user")
+            params = {"name": data["name"], "username": data["username"],
+                      "password": data["password"], "email": data["email"],
+                      "confirm": "false"}
+            resp = gitlabci.create_user(params)
+            if resp.status_code in OK_CODES:
+                state.users[data["username"]] = json.loads(resp.content)
+            return resp
+
+        uid = state.users[change["user"]]["id"]
+        if action == "add_ssh_key":
+            return gitlabci.add_ssh_key_user(uid, data["title"], data["key"])
+        if action == "add_email":
+            return gitlabci.add_email_for_user(uid, change["target"])
+        if action == "create_project":
+            return gitlabci.create_project_for_user(uid, change["target"])
+        if action == "remove_ssh_key":
+            return gitlabci.remove_ssh_key_for_user(uid, data["id"])
+        if action == "remove_email":
+            return gitlabci.remove_email_for_user(uid, data["id"])
+        raise Exception("unknown action '%s'" % action)
+
+    def run(batch):
+        for change, resp, error in run_concurrently(
+                apply_change, batch, workers):
+            if error:
+                change["status"], change["detail"] = "failed", str(error)
+            elif resp.status_code in OK_CODES:
+                change["status"] = "done"
+            else:
+                change["status"] = "failed"
+                change["detail"] = "%s %s" % (resp.status_code, resp.content)
+
+    run([c for c in changes if c["action"] == "create_user"])
+
+    rest = []
+    for change in changes:
+        if change["action"] == "create_user":
+            continue
+        if change["user"] not in state.users:
+            change["status"], change["detail"] = "skipped", "user not created"
+        else:
+            rest.append(change)
+    run(rest)
+    return changes
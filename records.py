@@ -0,0 +1,132 @@
+##############################################################################
+#
+# compact records for jobs, builds, users, projects and ssh keys
+#
+# Records keep only their fields, in slots instead of a per object dict,
+# and each field is decoded once when the record is made: ascii text is
+# kept as byte strings (a quarter of the size of unicode) and values of
+# few distinct strings, like job colors, are interned. Records can still
+# be read like dicts, record["name"] or record.get("email"), so code
+# written for decoded json keeps working.
+#
+##############################################################################
+
+
+def _compact(value):
+    """
+    Function returns ascii unicode text as a byte string, other values
+    as they are
+    """
+    if isinstance(value, unicode):
+        try:
+            return value.encode("ascii")
+        except UnicodeEncodeError:
+            return value
+    return value
+
+
+class Record(object):
+    """
+    Class for a record with a fixed set of fields, subclasses list their
+    fields in __slots__ and fields of few distinct values in INTERNED
+    """
+
+    __slots__ = ()
+    INTERNED = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Function returns a record of fields of given dict, eg an item
+        of a json api response, other keys are dropped
+        """
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = _compact(data.get(name))
+            if name in cls.INTERNED and isinstance(value, str):
+                value = intern(value)
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def view(cls, items):
+        """
+        Function lazily yields records of given dicts, so a streamed
+        list is turned into records one item at a time and fields not
+        in the record are never kept
+        """
+        for item in items:
+            yield cls.from_dict(item)
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in self.__slots__ else None
+        return default if value is None else value
+
+    def __contains__(self, name):
+        return name in self.__slots__ and getattr(self, name) is not None
+
+    def to_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join(
+            "%s=%r" % (n, getattr(self, n)) for n in self.__slots__))
+
+
+class Job(Record):
+    """
+    Class for a jenkins job, as listed by JenkinsCI.get_jobs()
+    """
+    __slots__ = ("name", "url", "color", "fullname")
+    INTERNED = ("color",)
+
+
+class Build(Record):
+    """
+    Class for a jenkins build, fields not asked from server are None
+    """
+    __slots__ = ("number", "result", "duration", "timestamp")
+    INTERNED = ("result",)
+
+
+class User(Record):
+    """
+    Class for a gitlab user
+    """
+    __slots__ = ("id", "username", "name", "email", "state", "is_admin",
+                 "created_at")
+    INTERNED = ("state",)
+
+
+class Project(Record):
+    """
+    Class for a gitlab project
+    """
+    __slots__ = ("id", "name", "path", "path_with_namespace", "description",
+                 "default_branch", "visibility_level", "visibility",
+                 "archived", "web_url", "ssh_url_to_repo",
+                 "http_url_to_repo", "created_at", "last_activity_at")
+    INTERNED = ("default_branch", "visibility")
+
+
+class Key(Record):
+    """
+    Class for a ssh key of a gitlab user
+    """
+    __slots__ = ("id", "title", "key", "created_at")
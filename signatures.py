@@ -0,0 +1,250 @@
+##############################################################################
+#
+# failure signatures of build console logs, all patterns of a library
+# are matched in a single pass over a log with one compiled regex
+#
+##############################################################################
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import urllib
+import yaml
+
+from utils import get_data_path, load_json, save_json
+
+# size of chunks a log is scanned in
+CHUNK_SIZE = 1024 * 1024
+
+# longest part of a matched line kept in results
+MAX_LINE = 200
+
+# used when no signature library is given, a library is a yaml list
+# of signatures in same format
+DEFAULT_SIGNATURES = [
+    {"name": "out-of-memory", "category": "infra",
+     "patterns": ["java.lang.OutOfMemoryError", "Cannot allocate memory",
+                  "Killed signal terminated program"]},
+    {"name": "disk-full", "category": "infra",
+     "patterns": ["No space left on device"]},
+    {"name": "agent-lost", "category": "infra",
+     "patterns": ["hudson.remoting.ChannelClosedException",
+                  "java.nio.channels.ClosedChannelException",
+                  "Agent went offline during the build"]},
+    {"name": "timeout", "category": "infra",
+     "patterns": ["Build timed out", "Timeout has been exceeded"]},
+    {"name": "aborted", "category": "user",
+     "patterns": ["Aborted by ", "Build was aborted"]},
+    {"name": "scm-checkout", "category": "infra",
+     "patterns": ["ERROR: Error cloning remote repo",
+                  "ERROR: Error fetching remote repo",
+                  "Could not read from remote repository"]},
+    {"name": "network", "category": "infra",
+     "patterns": ["Connection refused", "Connection timed out",
+                  "Could not resolve host", "Temporary failure in name "
+                  "resolution"]},
+    {"name": "dependency-resolution", "category": "build",
+     "patterns": ["Could not resolve dependencies",
+                  "Could not find artifact",
+                  "No matching distribution found",
+                  "npm ERR! 404"]},
+    {"name": "compilation", "category": "build",
+     "patterns": ["COMPILATION ERROR", "error: ", "SyntaxError: "]},
+    {"name": "test-failures", "category": "tests",
+     "patterns": ["There are test failures", "Tests in error:",
+                  "FAILED (failures=", "FAILED (errors=",
+                  "Some tests failed"]},
+    {"name": "segfault", "category": "build",
+     "patterns": ["Segmentation fault", "core dumped"]},
+]
+
+
+def load_signatures(fpath=None):
+    """
+    Function returns a python list of signatures, dicts with name,
+    category and patterns, from a yaml file or the default library
+    """
+    if not fpath:
+        return DEFAULT_SIGNATURES
+    with open(fpath) as f:
+        signatures = yaml.safe_load(f) or []
+    for signature in signatures:
+        if not signature.get("name") or not signature.get("patterns"):
+            raise ValueError("Signature needs a name and patterns: %r" %
+                             signature)
+    return signatures
+
+
+class SignatureMatcher:
+    """
+    Class for matching all patterns of a signature library in one pass
+    over a log, with a compiled regex of all the patterns
+
+    The regex finds lines matching any pattern, only those lines are
+    checked for which signatures they match. Logs are fed in chunks,
+    lines split between chunks are scanned once they are complete
+    """
+
+    def __init__(self, signatures):
+        self.signatures = signatures
+        self.digest = hashlib.sha1(json.dumps(
+            signatures, sort_keys=True)).hexdigest()
+
+        # logs are byte strings, so patterns are matched as utf-8
+        indexes = {}
+        for index, signature in enumerate(signatures):
+            for pattern in signature["patterns"]:
+                if isinstance(pattern, unicode):
+                    pattern = pattern.encode("utf-8")
+                indexes.setdefault(pattern, set()).add(index)
+        self.patterns = sorted(indexes.items())
+
+        # longest first, so a pattern isn't hidden by its own prefix,
+        # a library without patterns matches nothing
+        self.regex = re.compile("|".join(
+            re.escape(p) for p in sorted(indexes, key=len, reverse=True)
+            if p) or "(?!)")
+        # part of a very long line kept when it is scanned in parts
+        self.overlap = max([len(p) for p in indexes] or [1]) - 1
+
+    def _scan_lines(self, block, line, found, counted):
+        """
+        Function matches patterns in lines of block, first one being
+        line number line, into found and counted (see scan())
+        """
+        number = line
+        counted_to = 0
+        pos = 0
+        while True:
+            match = self.regex.search(block, pos)
+            if not match:
+                break
+            start = block.rfind("\n", 0, match.start()) + 1
+            end = block.find("\n", match.end())
+            if end < 0:
+                end = len(block)
+            number += block.count("\n", counted_to, start)
+            counted_to = start
+            text = block[start:end]
+
+            indexes = set()
+            for pattern, pattern_indexes in self.patterns:
+                if pattern in text:
+                    indexes.update(pattern_indexes)
+            for index in sorted(indexes):
+                name = self.signatures[index]["name"]
+                # a line matching many patterns of a signature
+                # is counted once
+                if counted.get(name) == number:
+                    continue
+                counted[name] = number
+                if name in found:
+                    found[name]["count"] += 1
+                else:
+                    found[name] = {"count": 1, "line": number,
+                                   "text": text[:MAX_LINE * 4]}
+            pos = end + 1
+
+    def scan(self, chunks):
+        """
+        Function matches patterns in a log given as an iterable of
+        chunks, eg response.iter_content() or slices of a mmap
+
+        Returns a dict of signature name to a dict with count of lines
+        matched, first matched line number and text of that line
+        """
+        found = {}
+        counted = {}
+        line = 1
+        # start of a line going on in next chunk
+        tail = ""
+
+        for chunk in chunks:
+            data = tail + chunk
+            end = data.rfind("\n") + 1
+            if end:
+                self._scan_lines(data[:end], line, found, counted)
+                line += data.count("\n", 0, end)
+                tail = data[end:]
+            elif len(data) > CHUNK_SIZE:
+                # a huge line is scanned in parts, overlapping so
+                # patterns split between parts are found
+                self._scan_lines(data, line, found, counted)
+                tail = data[len(data) - self.overlap:]
+            else:
+                tail = data
+        if tail:
+            self._scan_lines(tail, line, found, counted)
+
+        for match in found.values():
+            match["text"] = match["text"].strip()[:MAX_LINE].decode(
+                "utf-8", "replace")
+        return found
+
+    def scan_file(self, fpath):
+        """
+        Function matches patterns in a saved log file, the file is
+        mapped into memory and scanned in chunks instead of read
+        """
+        if not os.path.getsize(fpath):
+            return {}
+        with open(fpath, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return self.scan(data[i:i + CHUNK_SIZE]
+                                 for i in xrange(0, len(data), CHUNK_SIZE))
+            finally:
+                data.close()
+
+
+class AnalysisCache:
+    """
+    Class for cached matches of completed builds of a server, results
+    are kept only for the signature library they were made with
+    """
+
+    def __init__(self, server_url):
+        server = hashlib.sha1(server_url).hexdigest()[:12]
+        self.fpath = get_data_path("analysis", "%s.json" % server)
+        self.builds = load_json(self.fpath, {})
+
+    def key(self, job, number):
+        return "%s#%d" % (urllib.quote(job, safe="/"), number)
+
+    def get(self, job, number, digest):
+        """
+        Function returns cached matches of a build, None if build
+        wasn't analyzed with library of given digest
+        """
+        entry = self.builds.get(self.key(job, number))
+        if entry and entry["digest"] == digest:
+            return entry["matches"]
+        return None
+
+    def set(self, job, number, digest, matches):
+        self.builds[self.key(job, number)] = {
+            "digest": digest, "matches": matches}
+
+    def save(self):
+        save_json(self.fpath, self.builds)
+
+
+def group_failures(results):
+    """
+    Function groups matches of many builds by signature
+
+    results is a python list of (build, matches), build being a name
+    like 'job#12' and matches as returned by SignatureMatcher.scan().
+    Returns a python list of (signature name, builds, jobs) with most
+    frequent signatures first
+    """
+    groups = {}
+    for build, matches in results:
+        for name in matches:
+            groups.setdefault(name, []).append(build)
+    return sorted(((name, sorted(builds),
+                    sorted(set(b.rsplit("#", 1)[0] for b in builds)))
+                   for name, builds in groups.items()),
+                  key=lambda group: (-len(group[1]), group[0]))
@@ -0,0 +1,82 @@
+##############################################################################
+#
+# job config templates, a config xml with ${placeholders} rendered
+# once per row of a parameter table
+#
+##############################################################################
+
+import csv
+import re
+import yaml
+from xml.sax.saxutils import escape
+
+PLACEHOLDER = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+class JobTemplate:
+    """
+    Class for a jenkins job config xml template
+
+    The template text is split once into literal chunks and placeholder
+    names, so rendering a job config is only a join over those chunks.
+    Placeholders look like ${name}, use $${name} for a literal ${name}
+    """
+
+    def __init__(self, text):
+        self.chunks = []
+        self.placeholders = set()
+
+        pos = 0
+        for match in PLACEHOLDER.finditer(text):
+            start = match.start()
+
+            # $${name} escapes a placeholder
+            if start > 0 and text[start - 1] == "$":
+                self.chunks.append(text[pos:start - 1] + match.group(0))
+                pos = match.end()
+                continue
+
+            self.chunks.append(text[pos:start])
+            self.chunks.append((match.group(1),))
+            self.placeholders.add(match.group(1))
+            pos = match.end()
+        self.chunks.append(text[pos:])
+
+    def render(self, params):
+        """
+        Function returns config xml with placeholders replaced by
+        xml escaped values from params dict
+        """
+        missing = self.placeholders - set(params)
+        if missing:
+            raise KeyError(
+                "missing template params: %s" % ", ".join(sorted(missing)))
+
+        out = []
+        for chunk in self.chunks:
+            if isinstance(chunk, tuple):
+                out.append(escape(str(params[chunk[0]])))
+            else:
+                out.append(chunk)
+        return "".join(out)
+
+
+def load_param_table(fpath):
+    """
+    Function loads a parameter table for job templates
+
+    A .yml/.yaml file holds a list of dicts, any other file is read as
+    csv with a header row. Every row must have a 'name' column, it is
+    used as the name of the jenkins job
+    """
+    if fpath.endswith((".yml", ".yaml")):
+        with open(fpath) as f:
+            rows = yaml.safe_load(f) or []
+    else:
+        with open(fpath) as f:
+            rows = list(csv.DictReader(f))
+
+    for i, row in enumerate(rows):
+        if not row.get("name"):
+            raise ValueError("row %d of '%s' has no job name" % (i + 1, fpath))
+    return rows
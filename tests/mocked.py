@@ -7,7 +7,36 @@ import json
 
 
 class Response:
-    pass
+    status_code = 200
+    headers = {}
+    links = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception("HTTP %d" % self.status_code)
+
+
+def json_response(data, status_code=200):
+    """
+    Function returns a mocked response with given data as json content
+    """
+    resp = Response()
+    resp.status_code = status_code
+    resp.content = json.dumps(data)
+    return resp
+
+
+def text_response(text, status_code=200):
+    """
+    Function returns a mocked response with given text as content
+    """
+    resp = Response()
+    resp.status_code = status_code
+    resp.content = text
+    return resp
 
 
 ##########################################################
@@ -27,7 +56,7 @@ def post(url, data, headers):
     return resp
 
 
-def get(url, headers):
+def get(url, headers, params=None):
     """
     patching a general requests' get() with a given url
     """
@@ -129,6 +158,26 @@ def mocked_get_job_info(job_name, depth=0):
 def mocked_get_jobs():
     return mocked_test_jobs
 
+def mocked_get_computers(url, params=None, auth=None):
+    """
+    Function to patch requests' get() for jenkins computer api,
+    one node runs a build, other one is idle
+    """
+    print "[MOCK] mocked_get_computers() getting", url
+    build = {"url": "http://ci/job/app/12/", "number": 12,
+             "timestamp": 1000, "estimatedDuration": 60000,
+             "fullDisplayName": "app #12"}
+    return json_response({"computer": [
+        {"displayName": "master",
+         "executors": [{"currentExecutable": build},
+                       {"currentExecutable": None}],
+         "oneOffExecutors": []},
+        {"displayName": "slave1",
+         "executors": [{"currentExecutable": None}],
+         "oneOffExecutors": []},
+        ]})
+
+
 def mocked_get_plugins(depth=2):
     """
     FIXME dont use dummy values in future !!!
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from openci.artifacts import download_artifact, list_artifacts
+
+
+class FakeResponse:
+    def __init__(self, status_code, body="", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception("HTTP %d" % self.status_code)
+
+    def close(self):
+        pass
+
+
+class FakeJenkinsCI:
+    """
+    serves a single artifact, honoring Range headers
+    """
+    def __init__(self, body):
+        self.body = body
+        self.requests = []
+
+    def open_url(self, url, headers=None, method="GET"):
+        headers = headers or {}
+        self.requests.append((method, headers))
+        if method == "HEAD":
+            return FakeResponse(
+                    200, headers={"Content-Length": str(len(self.body))})
+        if "Range" in headers:
+            offset = int(headers["Range"][len("bytes="):-1])
+            return FakeResponse(206, self.body[offset:])
+        return FakeResponse(200, self.body)
+
+
+class ArtifactsTestCase(unittest.TestCase):
+    """
+    Unit tests for downloading build artifacts
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.tmpdir, "app", "12", "out", "app.apk")
+        self.body = "apk-data" * 20000
+        self.jenkinsci = FakeJenkinsCI(self.body)
+        self.artifact = {"url": "http://ci/job/app/12/artifact/out/app.apk",
+                         "path": "out/app.apk",
+                         "md5": hashlib.md5(self.body).hexdigest()}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_list_artifacts(self):
+        build = {"url": "http://ci/job/app/12/",
+                 "artifacts": [{"fileName": "app.apk",
+                                "relativePath": "out/app.apk"}],
+                 "fingerprint": [{"fileName": "app.apk", "hash": "abc"}]}
+        self.assertEqual(list_artifacts(build), [{
+                "url": "http://ci/job/app/12/artifact/out/app.apk",
+                "path": "out/app.apk", "md5": "abc"}])
+
+    def test_download_and_skip(self):
+        """
+        a downloaded artifact should be skipped on next download
+        """
+        self.assertEqual(
+                download_artifact(self.jenkinsci, self.artifact, self.dest),
+                "downloaded")
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.body)
+        self.assertEqual(
+                download_artifact(self.jenkinsci, self.artifact, self.dest),
+                "skipped")
+        self.assertEqual(len(self.jenkinsci.requests), 1)
+
+    def test_skip_by_size(self):
+        """
+        not fingerprinted artifacts should be compared by size
+        """
+        self.artifact["md5"] = None
+        download_artifact(self.jenkinsci, self.artifact, self.dest)
+        self.assertEqual(
+                download_artifact(self.jenkinsci, self.artifact, self.dest),
+                "skipped")
+        self.assertEqual(self.jenkinsci.requests[-1][0], "HEAD")
+
+    def test_resume(self):
+        """
+        a partial download should be resumed with a Range request
+        """
+        os.makedirs(os.path.dirname(self.dest))
+        with open(self.dest + ".part", "wb") as f:
+            f.write(self.body[:1000])
+
+        self.assertEqual(
+                download_artifact(self.jenkinsci, self.artifact, self.dest),
+                "resumed")
+        self.assertEqual(
+                self.jenkinsci.requests[0][1], {"Range": "bytes=1000-"})
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.body)
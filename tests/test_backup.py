@@ -0,0 +1,120 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from openci.backup import MANIFEST, depth_levels, latest_archive
+from openci.backup import read_backup, read_manifest, write_backup
+
+ITEMS = [{"name": "app", "folder": False},
+         {"name": "team", "folder": True},
+         {"name": "team/web", "folder": False}]
+
+
+class BackupTestCase(unittest.TestCase):
+    """
+    Unit tests for backups of job and view configs
+    """
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.configs = {
+            ("jobs", "app"): "<project>app</project>",
+            ("jobs", "team"): "<folder>team</folder>",
+            ("jobs", "team/web"): u"<project>web \u2713</project>",
+            ("views", "All"): "<view>all</view>",
+        }
+        self.fetched = []
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def fetch(self, kind, name):
+        self.fetched.append((kind, name))
+        if name == "broken":
+            raise Exception("not found")
+        return self.configs[(kind, name)]
+
+    def backup(self, name, base=None, items=ITEMS):
+        fpath = os.path.join(self.path, name)
+        return write_backup(fpath, items, ["All"], self.fetch, base, 2)
+
+    def members(self, name):
+        with tarfile.open(os.path.join(self.path, name)) as tar:
+            return sorted(tar.getnames())
+
+    def test_full_backup(self):
+        manifest, failed = self.backup(
+            "jenkins-1.tar.gz",
+            items=ITEMS + [{"name": "broken", "folder": False}])
+        self.assertEqual([(k, n) for k, n, _ in failed], [("jobs", "broken")])
+        self.assertEqual(len(self.fetched), 5)
+        self.assertEqual(self.members("jenkins-1.tar.gz"), [
+            "jobs/app.xml", "jobs/team.xml", "jobs/team/web.xml", MANIFEST,
+            "views/All.xml"])
+        self.assertTrue(manifest["jobs"]["team"]["folder"])
+
+        fpath = os.path.join(self.path, "jenkins-1.tar.gz")
+        self.assertEqual(read_manifest(fpath), manifest)
+        restored = read_backup(fpath)[1]
+        self.assertEqual(restored[("jobs", "team/web")],
+                         self.configs[("jobs", "team/web")].encode("utf-8"))
+
+    def test_incremental_backup(self):
+        """
+        incremental backup should store only changed configs and read
+        unchanged ones from its base
+        """
+        base = self.backup("jenkins-1.tar.gz")[0]
+        self.configs[("jobs", "app")] = "<project>app v2</project>"
+        manifest = self.backup("jenkins-2.tar.gz", base)[0]
+
+        self.assertEqual(self.members("jenkins-2.tar.gz"),
+                         ["jobs/app.xml", MANIFEST])
+        self.assertEqual(manifest["base"], "jenkins-1.tar.gz")
+        self.assertEqual(manifest["jobs"]["team"]["archive"],
+                         "jenkins-1.tar.gz")
+        self.assertEqual(latest_archive(self.path),
+                         os.path.join(self.path, "jenkins-2.tar.gz"))
+
+        restored = read_backup(os.path.join(self.path, "jenkins-2.tar.gz"))[1]
+        self.assertEqual(len(restored), 4)
+        self.assertEqual(restored[("jobs", "app")],
+                         "<project>app v2</project>")
+
+        os.remove(os.path.join(self.path, "jenkins-1.tar.gz"))
+        self.assertRaises(ValueError, read_backup,
+                          os.path.join(self.path, "jenkins-2.tar.gz"))
+
+    def test_incremental_backup_failed_fetch(self):
+        """
+        a config failing in an incremental backup should be kept from
+        its base
+        """
+        base = self.backup("jenkins-1.tar.gz")[0]
+        del self.configs[("jobs", "app")]
+        manifest, failed = self.backup("jenkins-2.tar.gz", base)
+
+        self.assertEqual([(k, n) for k, n, _ in failed], [("jobs", "app")])
+        self.assertEqual(manifest["jobs"]["app"], base["jobs"]["app"])
+        restored = read_backup(os.path.join(self.path, "jenkins-2.tar.gz"))[1]
+        self.assertEqual(restored[("jobs", "app")], "<project>app</project>")
+
+    def test_interrupted_backup(self):
+        """
+        a backup failing while written should leave no archive behind
+        """
+        def fetch(kind, name):
+            # not a config, fails when hashed while archive is written
+            return None
+
+        fpath = os.path.join(self.path, "jenkins-1.tar.gz")
+        self.assertRaises(TypeError, write_backup,
+                          fpath, ITEMS, [], fetch)
+        self.assertEqual(os.listdir(self.path), [])
+        self.assertEqual(latest_archive(self.path), None)
+
+    def test_depth_levels(self):
+        self.assertEqual(depth_levels(["b/c/d", "a", "b", "b/c", "b/e"]),
+                         [["a", "b"], ["b/c", "b/e"], ["b/c/d"]])
@@ -0,0 +1,66 @@
+import base64
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from openci.batch import MARKER, independent, load_operations
+from openci.batch import make_operation, make_script, parse_results
+
+
+class BatchTestCase(unittest.TestCase):
+    """
+    Unit tests for script console batches of job operations
+    """
+
+    def test_make_script(self):
+        """
+        operations should be passed to script as encoded data
+        """
+        operations = [make_operation("disable", 'evil"job'),
+                      make_operation("rename", "folder/a", "folder/b")]
+        script = make_script(operations)
+        self.assertFalse('evil"job' in script)
+
+        payload = re.search(r'new String\("([^"]*)"', script).group(1)
+        self.assertEqual(json.loads(base64.b64decode(payload)), [
+            {"action": "disable", "job": 'evil"job', "to": None},
+            {"action": "rename", "job": "folder/a", "to": "b"}])
+
+    def test_parse_results(self):
+        output = "some log line\n%s%s\n" % (MARKER, json.dumps(
+            [{"status": "ok", "detail": ""},
+             {"status": "error", "detail": "boom"}]))
+        self.assertEqual(parse_results(output, 2),
+                         [("ok", ""), ("error", "boom")])
+        self.assertRaises(ValueError, parse_results, output, 3)
+        self.assertRaises(ValueError, parse_results, "<html>", 1)
+
+    def test_make_operation(self):
+        self.assertRaises(ValueError, make_operation, "explode", "a")
+        self.assertRaises(ValueError, make_operation, "rename", "a")
+
+    def test_load_operations(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fpath = os.path.join(tmpdir, "ops.txt")
+            with open(fpath, "w") as f:
+                f.write("# cleanup\n\ndisable a\nrename a b\nbuild c\n")
+            self.assertEqual(load_operations(fpath), [
+                make_operation("disable", "a"),
+                make_operation("rename", "a", "b"),
+                make_operation("build", "c")])
+
+            with open(fpath, "w") as f:
+                f.write("build c\nrename a\n")
+            self.assertRaises(ValueError, load_operations, fpath)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_independent(self):
+        self.assertTrue(independent([make_operation("build", "a"),
+                                     make_operation("build", "b")]))
+        self.assertFalse(independent([make_operation("rename", "a", "b"),
+                                      make_operation("build", "b")]))
@@ -0,0 +1,68 @@
+import sys
+import unittest
+import ConfigParser
+from StringIO import StringIO
+
+from mock import patch
+
+from openci.openci import OpenCI
+from openci.tests.mocked import text_response
+
+
+def make_config(version="4"):
+    """
+    Function returns config of a gitlab server with given api version
+    """
+    config = ConfigParser.ConfigParser()
+    config.add_section("git")
+    config.set("git", "server", "http://gitlab")
+    config.set("git", "api_key", "token")
+    config.set("git", "version", version)
+    config.add_section("ci")
+    config.set("ci", "server", "http://127.0.0.1:8080")
+    config.set("ci", "user", "admin")
+    config.set("ci", "password", "")
+    return config
+
+
+class GitlabV4CommandsTestCase(unittest.TestCase):
+    """
+    Unit tests for delete commands against gitlab api v4, which answers
+    deletes with no content
+    """
+
+    def run_command(self, *argv):
+        out = StringIO()
+        with patch.object(sys, "argv", ["openci"] + list(argv)), \
+                patch.object(sys, "stdout", out):
+            OpenCI(make_config())
+        return out.getvalue()
+
+    @patch('requests.delete', return_value=text_response("", 204))
+    def test_delete_user(self, mock_delete):
+        out = self.run_command("delete_user", "7")
+        self.assertEqual(mock_delete.call_args[0][0],
+                         "http://gitlab/api/v4/users/7")
+        self.assertIn("User deleted successfully", out)
+
+    @patch('openci.openci.confirm_yes_no', return_value=True)
+    @patch('requests.delete', return_value=text_response("", 202))
+    def test_remove_project(self, mock_delete, mock_confirm):
+        out = self.run_command("remove_project", "12")
+        self.assertEqual(mock_delete.call_args[0][0],
+                         "http://gitlab/api/v4/projects/12")
+        self.assertIn("Project removed successfully", out)
+
+    @patch('requests.delete', return_value=text_response("", 204))
+    def test_remove_ssh_key(self, mock_delete):
+        out = self.run_command("remove_ssh_key", "3")
+        self.assertEqual(mock_delete.call_args[0][0],
+                         "http://gitlab/api/v4/user/keys/3")
+        self.assertIn("SSH key 3 removed successfully", out)
+
+    @patch('requests.delete', return_value=text_response("", 204))
+    def test_remove_ssh_key_for_user(self, mock_delete):
+        out = self.run_command("remove_ssh_key_for_user", "7", "3")
+        self.assertEqual(mock_delete.call_args[0][0],
+                         "http://gitlab/api/v4/users/7/keys/3")
+        self.assertIn("SSH key 3 removed successfully", out)
@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from openci import completion
+
+
+class CompletionTestCase(unittest.TestCase):
+    """
+    Unit tests for shell completion entry point
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = completion.NAMES_CACHE
+        completion.NAMES_CACHE = os.path.join(self.tmpdir, "names.json")
+        with open(completion.NAMES_CACHE, "w") as f:
+            json.dump({"updated": time.time(),
+                       "jobs": ["app-build", "app-release", "docs"],
+                       "projects": ["jdoe/website"]}, f)
+
+    def tearDown(self):
+        completion.NAMES_CACHE = self.cache
+        shutil.rmtree(self.tmpdir)
+
+    def test_complete_commands(self):
+        self.assertEqual(
+                completion.complete(1, ["openci", "get_jobs"]),
+                ["get_jobs_names"])
+        self.assertEqual(
+                completion.complete(3, ["openci", "--servers", "a", "jobs_"]),
+                ["jobs_count"])
+
+    def test_complete_job_names(self):
+        self.assertEqual(
+                completion.complete(2, ["openci", "build_job", "app"]),
+                ["app-build", "app-release"])
+        self.assertEqual(
+                completion.complete(2, ["openci", "remove_project", ""]),
+                ["jdoe/website"])
+
+    def test_completion_is_offline(self):
+        """
+        completion must not import modules talking to servers
+        """
+        script = ("import sys, completion; "
+                  "completion.NAMES_CACHE = %r; "
+                  "completion.complete(2, ['openci', 'build_job', '']); "
+                  "print 'requests' in sys.modules or "
+                  "'jenkins' in sys.modules" % completion.NAMES_CACHE)
+        output = subprocess.check_output(
+                [sys.executable, "-S", "-c", script],
+                cwd=os.path.dirname(os.path.abspath(completion.__file__)))
+        self.assertEqual(output.strip(), "False")
@@ -0,0 +1,87 @@
+import threading
+import unittest
+import urllib2
+
+from openci.exporter import MetricsCache, gitlab_sources, make_handler
+from openci.webhook import PooledHTTPServer
+
+
+class FakeGitlabCI:
+
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+
+    def count_users(self):
+        self.calls += 1
+        if self.down:
+            raise Exception("connection refused")
+        return 42
+
+    def count_projects(self):
+        self.calls += 1
+        return 7
+
+
+class ExporterTestCase(unittest.TestCase):
+    """
+    Unit tests for prometheus exporter
+    """
+
+    def setUp(self):
+        self.gitlab = FakeGitlabCI()
+        self.cache = MetricsCache(gitlab_sources("main", self.gitlab),
+                                  clock=lambda: 100.0)
+
+    def test_render(self):
+        self.assertEqual(self.cache.refresh(), [])
+        lines = self.cache.body.splitlines()
+        self.assertIn("# TYPE openci_gitlab_users gauge", lines)
+        self.assertIn('openci_gitlab_users{server="main"} 42', lines)
+        self.assertIn('openci_gitlab_projects{server="main"} 7', lines)
+        self.assertIn('openci_source_up{server="main",source="gitlab_users"}'
+                      ' 1', lines)
+        self.assertIn('openci_source_last_success_timestamp_seconds'
+                      '{server="main",source="gitlab_users"} 100.0', lines)
+
+    def test_failed_source(self):
+        """
+        a failed source should keep its last samples, marked down
+        """
+        self.cache.refresh()
+        self.gitlab.down = True
+        failed = self.cache.refresh()
+        self.assertEqual([name for name, _, _ in failed], ["gitlab_users"])
+        lines = self.cache.body.splitlines()
+        self.assertIn('openci_gitlab_users{server="main"} 42', lines)
+        self.assertIn('openci_source_up{server="main",source="gitlab_users"}'
+                      ' 0', lines)
+        self.assertIn('openci_source_up{server="main",'
+                      'source="gitlab_projects"} 1', lines)
+
+    def test_scrape_from_memory(self):
+        """
+        scrapes should be served from cache without querying servers
+        """
+        self.cache.refresh()
+        calls = self.gitlab.calls
+        server = PooledHTTPServer(
+                ("127.0.0.1", 0), make_handler(self.cache), 2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        url = "http://127.0.0.1:%d" % server.server_address[1]
+        try:
+            for _ in range(3):
+                resp = urllib2.urlopen(url + "/metrics")
+                self.assertEqual(resp.read(), self.cache.body)
+            try:
+                urllib2.urlopen(url + "/")
+                self.fail("only /metrics should be served")
+            except urllib2.HTTPError as e:
+                self.assertEqual(e.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(self.gitlab.calls, calls)
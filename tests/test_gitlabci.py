@@ -3,7 +3,7 @@ import json
 import ConfigParser
 from mock import patch
 
-from openci.gitlabci import GitlabCI
+from openci.gitlabci import GitlabCI, api_version
 from openci.utils import get_random_string
 
 from openci.tests import mocked
@@ -79,6 +79,17 @@ class GitlabCITestCase(unittest.TestCase):
         resp = self.gitlab.list_projects()
         self.assertEqual(resp.status_code, 200)
 
+    @patch('requests.get', side_effect=mocked.get)
+    def test_gitlab_list_projects_with_filters(self, mock_get):
+        """
+        test case to list projects with server side filters,
+        filters should be sent as query params
+        """
+        params = {"search": "web", "simple": "true", "per_page": 5}
+        resp = self.gitlab.list_projects(params)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_get.call_args[1]["params"], params)
+
     @patch('requests.post', side_effect=mocked.post)
     def test_gitlab_fail_create_project_no_dict_params(self, mock_post):
         """
@@ -128,3 +139,108 @@ class GitlabCITestCase(unittest.TestCase):
 
         # 3. assert we get response 201
         self.assertTrue(resp.status_code == 201)
+
+
+def keyset_pages(url, params=None, headers=None):
+    """
+    mocked get for a users list of 250 users with keyset pagination,
+    next page url is sent in Link header
+    """
+    after = 0
+    if params is None:
+        after = int(url.rsplit("id_after=", 1)[1])
+    elif params.get("pagination") != "keyset":
+        return mocked.json_response({"message": "offset not wanted"}, 500)
+    ids = range(after + 1, min(after + 100, 250) + 1)
+    resp = mocked.json_response([{"id": i, "username": "user%d" % i}
+                                 for i in ids])
+    if ids and ids[-1] < 250:
+        resp.links = {"next": {"url": "%s?id_after=%d" % (
+            url.split("?")[0], ids[-1])}}
+    return resp
+
+
+class GitlabV4TestCase(unittest.TestCase):
+    """
+    Unit tests for gitlab api v4 with keyset pagination
+    """
+
+    def setUp(self):
+        self.gitlab = GitlabCI("http://gitlab", "token", 4)
+
+    def test_api_version(self):
+        self.assertEqual(api_version("4"), 4)
+        self.assertEqual(api_version("v4"), 4)
+        self.assertEqual(api_version("3"), 3)
+        self.assertEqual(api_version("1.0"), 3)
+        self.assertEqual(api_version(None), 3)
+        self.assertEqual(self.gitlab.users_url, "http://gitlab/api/v4/users")
+
+    @patch('requests.get', side_effect=keyset_pages)
+    def test_keyset_pagination(self, mock_get):
+        """
+        all users should be read by following keyset pages
+        """
+        users = self.gitlab.list_all_users()
+        self.assertEqual([u.id for u in users], range(1, 251))
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_get.call_args_list[0][1]["params"]["order_by"],
+                         "id")
+
+    @patch('requests.get')
+    def test_keyset_not_supported(self, mock_get):
+        """
+        lists should be read with offset pages when keyset is refused
+        """
+        def get(url, params=None, headers=None):
+            if params.get("pagination") == "keyset":
+                return mocked.json_response({"error": "not supported"}, 400)
+            resp = mocked.json_response(
+                [{"id": params["page"], "path_with_namespace": "g/p"}])
+            resp.headers = {"X-Total-Pages": "3"}
+            return resp
+
+        mock_get.side_effect = get
+        projects = self.gitlab.list_all_projects()
+        self.assertEqual(sorted(p.id for p in projects), [1, 2, 3])
+        self.assertEqual(mock_get.call_args_list[0][0][0],
+                         "http://gitlab/api/v4/projects")
+
+    @patch('requests.get')
+    def test_count_from_total_header(self, mock_get):
+        """
+        counts should be read from X-Total header of a one item page
+        """
+        resp = mocked.json_response([{"id": 1}])
+        resp.headers = {"X-Total": "1234"}
+        mock_get.return_value = resp
+        self.assertEqual(self.gitlab.count_projects(), 1234)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args[1]["params"],
+                         {"simple": "true", "per_page": 1})
+
+    @patch('requests.get')
+    def test_count_from_statistics(self, mock_get):
+        """
+        counts missing X-Total should be read from instance statistics
+        """
+        def get(url, params=None, headers=None):
+            if url.endswith("/application/statistics"):
+                return mocked.json_response(
+                    {"users": "12,345", "projects": "1,002"})
+            return mocked.json_response([{"id": 1}])
+
+        mock_get.side_effect = get
+        self.assertEqual(self.gitlab.count_users(), 12345)
+        self.assertEqual(self.gitlab.count_projects(), 1002)
+        self.assertEqual(mock_get.call_count, 4)
+
+    @patch('requests.get')
+    def test_count_without_total(self, mock_get):
+        """
+        count should fail rather than read all pages
+        """
+        mock_get.return_value = mocked.json_response([{"id": 1}])
+        self.assertRaises(Exception, self.gitlab.count,
+                          self.gitlab.projects_url)
+        self.assertEqual(mock_get.call_count, 1)
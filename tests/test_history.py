@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openci.history import BuildHistory, analyze, percentile, sync_job
+
+
+class BuildHistoryTestCase(unittest.TestCase):
+    """
+    Unit tests for columnar build history store
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmpdir, "job.bch")
+
+        # builds 1..10 taking 10..100 seconds, every third one failed
+        self.builds = [{"number": n, "duration": n * 10000,
+                        "timestamp": 1450000000000 + n * 60000,
+                        "result": "FAILURE" if n % 3 == 0 else "SUCCESS"}
+                       for n in range(1, 11)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_save_load(self):
+        """
+        history read back from file should have same columns
+        """
+        history = BuildHistory()
+        history.merge(self.builds)
+        history.save(self.fpath)
+
+        loaded = BuildHistory.load(self.fpath)
+        self.assertEqual(len(loaded), 10)
+        self.assertEqual(list(loaded.number), range(1, 11))
+        self.assertEqual(list(loaded.duration), list(history.duration))
+        self.assertEqual(list(loaded.timestamp), list(history.timestamp))
+        self.assertEqual(list(loaded.result), list(history.result))
+
+    def test_merge_keeps_builds_sorted_and_unique(self):
+        """
+        merging overlapping builds should not duplicate them
+        """
+        history = BuildHistory()
+        history.merge(self.builds[5:])
+        history.merge(self.builds[:7])
+        self.assertEqual(list(history.number), range(1, 11))
+
+    def test_analyze(self):
+        """
+        stats should have percentiles, failure rate and trend
+        """
+        history = BuildHistory()
+        history.merge(self.builds)
+        stats = analyze(history)
+        self.assertEqual(stats["builds"], 10)
+        self.assertEqual(stats["failure_rate"], 0.3)
+        self.assertEqual(stats["p50"], 50000)
+        self.assertEqual(stats["p95"], 100000)
+        self.assertEqual(stats["trend"], 80000 / 30000.0 - 1)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 100), 4)
+        self.assertEqual(percentile([], 50), 0)
+
+
+class SyncJobTestCase(unittest.TestCase):
+    """
+    Unit tests for incremental sync of a job's build history
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmpdir, "job.bch")
+        self.fetched = []
+
+        # builds 1..10 on server, build 10 is still running
+        self.server = [{"number": n, "duration": 1000, "timestamp": n,
+                        "result": None if n == 10 else "SUCCESS"}
+                       for n in range(10, 0, -1)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def fetch(self, start, end):
+        self.fetched.append((start, end))
+        return self.server[start:end]
+
+    def test_incremental_sync(self):
+        """
+        only builds newer than high water mark should be fetched,
+        running builds should be fetched again on next sync
+        """
+        hwm, count = sync_job(
+                self.fetch, self.fpath, {"first": 1, "last": 10}, 0, None)
+        self.assertEqual((hwm, count), (9, 10))
+        self.assertEqual(len(BuildHistory.load(self.fpath)), 9)
+
+        # build 10 completed and build 11 started
+        self.server[0]["result"] = "FAILURE"
+        self.server.insert(0, {"number": 11, "duration": 0,
+                               "timestamp": 11, "result": None})
+        hwm, count = sync_job(
+                self.fetch, self.fpath, {"first": 1, "last": 11}, hwm, 1)
+        self.assertEqual((hwm, count), (10, 2))
+        self.assertEqual(self.fetched[-1], (0, 2))
+        self.assertEqual(len(BuildHistory.load(self.fpath)), 10)
+
+    def test_paged_sync(self):
+        """
+        more new builds than limit should be fetched in pages, none of
+        them skipped
+        """
+        self.server[0]["result"] = "SUCCESS"
+        hwm, count = sync_job(
+                self.fetch, self.fpath, {"first": 1, "last": 10}, 2, 1,
+                limit=3)
+        self.assertEqual((hwm, count), (10, 8))
+        self.assertEqual(self.fetched, [(0, 3), (3, 6), (6, 9)])
+        self.assertEqual(list(BuildHistory.load(self.fpath).number),
+                         range(3, 11))
+
+    def test_nothing_new(self):
+        """
+        no request should be made when server has no new builds
+        """
+        sync_job(self.fetch, self.fpath, {"first": 1, "last": 9}, 9, 1)
+        self.assertEqual(self.fetched, [])
+
+    def test_rotated_builds(self):
+        """
+        builds rotated away on server should be dropped from history
+        """
+        sync_job(self.fetch, self.fpath, {"first": 1, "last": 10}, 0, None)
+        sync_job(self.fetch, self.fpath, {"first": 5, "last": 9}, 9, 1)
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(
+                list(BuildHistory.load(self.fpath).number), range(5, 10))
@@ -1,6 +1,13 @@
+import base64
+import json
+import re
+import urlparse
 import unittest
 import ConfigParser
 
+import jenkins
+
+from openci.batch import MARKER, make_operation
 from openci.jenkinsci import JenkinsCI
 from openci.utils import get_random_string, get_file_data
 
@@ -154,3 +161,150 @@ class JenkinsCITestCase(unittest.TestCase):
 
         # FIXME later !!!!
         self.assertFalse(self.jenkinsci.is_job_disabled(job_name))
+
+    @patch('requests.get', side_effect=mocked_get_computers)
+    def test_get_executing_builds(self, mock_get):
+        """
+        running builds of all nodes should come from one projected query
+        """
+        builds = self.jenkinsci.get_executing_builds()
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(builds[0]["node"], "master")
+        self.assertEqual(builds[0]["job"], "app")
+        self.assertEqual(builds[0]["number"], 12)
+        self.assertEqual(builds[0]["estimated"], 60000)
+
+    def test_push_non_ascii_config(self):
+        """
+        utf-8 configs, eg read from a backup, should go through
+        python-jenkins' own encoding
+        """
+        config = u"<project><description>d\xe9ploiement \u2713" \
+            u"</description></project>".encode("utf-8")
+        jenkinsci = JenkinsCI("http://127.0.0.1:8080", "admin", "secret")
+        sent = []
+        with patch.object(jenkins.Jenkins, 'jenkins_open') as mock_open, \
+                patch.object(jenkins.Jenkins, 'job_exists',
+                             return_value=False), \
+                patch.object(jenkins.Jenkins, 'view_exists',
+                             return_value=False), \
+                patch.object(jenkins.Jenkins, 'assert_job_exists'), \
+                patch.object(jenkins.Jenkins, 'assert_view_exists'):
+            mock_open.side_effect = lambda req, *args: sent.append(
+                req.get_data())
+            jenkinsci.create_job(u"d\xe9ploiement", config)
+            jenkinsci.reconfig_job(u"d\xe9ploiement", config)
+            jenkinsci.create_view("tous", config)
+            jenkinsci.reconfig_view("tous", config)
+        self.assertEqual(sent, [config] * 4)
+
+    @patch('requests.get')
+    def test_get_build_mark(self, mock_get):
+        """
+        marks of a job in a folder should be asked at the job's path
+        """
+        mock_get.return_value = json_response(
+            {"firstBuild": {"number": 3}, "lastBuild": {"number": 9}})
+        self.assertEqual(self.jenkinsci.get_build_mark("team/app"),
+                         {"name": "team/app", "first": 3, "last": 9})
+        self.assertEqual(mock_get.call_args[0][0],
+                         "http://127.0.0.1:8080/job/team/job/app/api/json")
+
+    @patch('requests.get')
+    def test_get_all_items(self, mock_get):
+        """
+        folders below listed depth should be listed with a query each
+        """
+        pages = {
+            "http://127.0.0.1:8080/api/json": [
+                {"name": "app"},
+                {"name": "team", "jobs": [{"name": "sub"}, {"name": "web"}]}],
+            "http://127.0.0.1:8080/job/team/api/json": [
+                {"name": "sub", "jobs": [{"name": "lib"}]}, {"name": "web"}],
+            "http://127.0.0.1:8080/job/team/job/sub/api/json": [
+                {"name": "lib"}],
+        }
+        mock_get.side_effect = lambda url, params=None, auth=None: \
+            json_response({"jobs": pages[url]})
+
+        items = self.jenkinsci.get_all_items(depth=1)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_get.call_args_list[0][1]["params"]["tree"],
+                         "jobs[name,jobs[name]]")
+        self.assertEqual([(i["name"], i["folder"]) for i in items],
+                         [("app", False), ("team", True), ("team/sub", True),
+                          ("team/sub/lib", False), ("team/web", False)])
+
+    @patch('requests.get')
+    @patch('requests.post')
+    def test_run_batch_script(self, mock_post, mock_get):
+        """
+        a batch should run as chunked, form encoded script console
+        requests with csrf crumb
+        """
+        mock_get.return_value = json_response(
+            {"crumbRequestField": "Jenkins-Crumb", "crumb": "abc"})
+        scripts = []
+
+        def post(url, data=None, headers=None, auth=None):
+            self.assertEqual(url, "http://127.0.0.1:8080/scriptText")
+            self.assertEqual(headers["Jenkins-Crumb"], "abc")
+            # a '+' of script has to be encoded, or it becomes a space
+            self.assertIn("%22+%2B+JsonOutput", data)
+            script = urlparse.parse_qs(data)["script"][0]
+            scripts.append(script)
+            count = len(json.loads(base64.b64decode(re.search(
+                r'new String\("([^"]*)"', script).group(1))))
+            return text_response("%s%s\n" % (MARKER, json.dumps(
+                [{"status": "ok", "detail": ""}] * (count - 1) +
+                [{"status": "error", "detail": "job doesn't exist"}])))
+
+        mock_post.side_effect = post
+        names = ["dummy+%d" % i for i in range(5)]
+        operations = [make_operation("disable", name) for name in names]
+
+        results = self.jenkinsci.run_batch(operations, chunk_size=2)
+        self.assertEqual(len(scripts), 3)
+        self.assertIn('"%s" + JsonOutput' % MARKER, scripts[0])
+        self.assertIn('"dummy+0"', base64.b64decode(re.search(
+            r'new String\("([^"]*)"', scripts[0]).group(1)))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual([r["job"] for r in results], names)
+        self.assertEqual([r["status"] for r in results],
+                         ["ok", "error", "ok", "error", "error"])
+        self.assertTrue(all(r["via"] == "script" for r in results))
+
+    @patch('requests.post')
+    def test_run_batch_rest_fallback(self, mock_post):
+        """
+        a batch should fall back to rest when script console is denied
+        """
+        self.jenkinsci.crumb = {}
+        mock_post.return_value = text_response("Forbidden", 403)
+        mocked_disabled_jobs[:] = ["batch1"]
+        results = self.jenkinsci.run_batch([
+            make_operation("enable", "batch1"),
+            make_operation("disable", "batch2")])
+
+        self.assertFalse(self.jenkinsci.script_console)
+        self.assertEqual([(r["job"], r["status"], r["via"])
+                          for r in results],
+                         [("batch1", "ok", "rest"), ("batch2", "ok", "rest")])
+        self.assertEqual(mocked_disabled_jobs, ["batch2"])
+
+    @patch('requests.post')
+    def test_run_batch_unknown(self, mock_post):
+        """
+        a chunk which may have run should not be run again with rest
+        """
+        self.jenkinsci.crumb = {}
+        mock_post.return_value = text_response("Internal error", 500)
+        mocked_disabled_jobs[:] = ["batch1"]
+        results = self.jenkinsci.run_batch(
+            [make_operation("enable", "batch1")])
+
+        self.assertTrue(self.jenkinsci.script_console)
+        self.assertEqual([(r["status"], r["via"]) for r in results],
+                         [("unknown", "script")])
+        self.assertEqual(mocked_disabled_jobs, ["batch1"])
@@ -0,0 +1,37 @@
+import unittest
+
+from openci.jobsync import canonicalize_xml, config_hash
+from openci.utils import get_file_data
+
+
+class JobSyncTestCase(unittest.TestCase):
+    """
+    Unit tests for hashing of jenkins job configs
+    """
+
+    def setUp(self):
+        self.config = get_file_data("openci/config_samples/config.xml")
+
+    def test_hash_ignores_formatting(self):
+        """
+        configs differing only in indentation and xml declaration
+        should have the same hash
+        """
+        reformatted = self.config.replace(
+                "version='1.0'", "version='1.1'").replace("\n  ", "\n    ")
+        self.assertEqual(config_hash(self.config), config_hash(reformatted))
+
+    def test_hash_ignores_attribute_order(self):
+        """
+        attributes order should not change the canonical form
+        """
+        self.assertEqual(
+                canonicalize_xml('<p b="2" a="1"> <x/></p>'),
+                canonicalize_xml('<p a="1" b="2"><x/>\n</p>'))
+
+    def test_hash_detects_changes(self):
+        """
+        a changed config should get a different hash
+        """
+        other = get_file_data("openci/config_samples/config1.xml")
+        self.assertNotEqual(config_hash(self.config), config_hash(other))
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openci.journal import StepJournal
+
+
+class StepJournalTestCase(unittest.TestCase):
+    """
+    Unit tests for journal of completed steps
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmpdir, "journal.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_record_survives_reload(self):
+        """
+        recorded steps and outputs should be read back by a new journal
+        """
+        journal = StepJournal("curb|test", self.fpath)
+        self.assertFalse(journal.done("create_user"))
+        journal.record("create_user", {"uid": 42})
+
+        journal = StepJournal("curb|test", self.fpath)
+        self.assertTrue(journal.done("create_user"))
+        self.assertEqual(journal.output("create_user"), {"uid": 42})
+        self.assertFalse(journal.done("add_ssh_key"))
+
+    def test_reset(self):
+        """
+        reset should forget all steps and remove the journal file
+        """
+        journal = StepJournal("curb|test", self.fpath)
+        journal.record("create_user", {"uid": 42})
+        journal.reset()
+        self.assertFalse(journal.done("create_user"))
+        self.assertFalse(os.path.exists(self.fpath))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from openci.jsonstream import iter_array
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class JsonStreamTestCase(unittest.TestCase):
+    """
+    Unit tests for incremental decoding of json lists
+    """
+
+    def setUp(self):
+        self.items = [{"id": i, "name": u"project-\xe9-%d" % i,
+                       "tags": [i, 1.5, None, True]} for i in range(50)]
+        self.items.append(12345)
+
+    def test_any_chunk_size(self):
+        """
+        elements should decode the same however body is split
+        """
+        data = json.dumps(self.items, indent=1)
+        for size in (1, 2, 3, 7, 64, len(data)):
+            self.assertEqual(list(iter_array(chunked(data, size))),
+                             self.items)
+
+    def test_key(self):
+        data = json.dumps({"_class": "hudson.model.Hudson",
+                           "views": [{"name": "all"}],
+                           "jobs": self.items, "url": "http://ci/"})
+        for size in (1, 5, len(data)):
+            self.assertEqual(list(iter_array(chunked(data, size), "jobs")),
+                             self.items)
+        self.assertEqual(list(iter_array(['{"url": "x"}'], "jobs")), [])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_array([" [ ] "])), [])
+        self.assertEqual(list(iter_array(["null"])), [])
+
+    def test_incremental(self):
+        """
+        first element should be yielded before rest of body is read
+        """
+        read = []
+
+        def chunks():
+            for chunk in chunked(json.dumps(self.items), 16):
+                read.append(chunk)
+                yield chunk
+
+        items = iter_array(chunks())
+        self.assertEqual(next(items), self.items[0])
+        self.assertTrue(len(read) < 10)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, list, iter_array(['{"a": 1}']))
+        self.assertRaises(ValueError, list, iter_array(['[{"a": 1}, {"b"']))
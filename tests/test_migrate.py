@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+
+from openci.migrate import Migration, select_items
+
+ITEMS = [{"name": "app", "folder": False},
+         {"name": "team", "folder": True},
+         {"name": "team/sub", "folder": True},
+         {"name": "team/sub/lib-deploy", "folder": False},
+         {"name": "team/web-deploy", "folder": False},
+         {"name": "team/web-tests", "folder": False}]
+
+
+class MigrateTestCase(unittest.TestCase):
+    """
+    Unit tests for migration of jobs between jenkins servers
+    """
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.pushed = []
+        self.broken = set()
+
+    def fetch(self, name):
+        # folders arrive last, so their items have to wait for them
+        if name in ("team", "team/sub"):
+            time.sleep(0.05)
+        if name == "missing":
+            raise Exception("not found")
+        return "<config>%s</config>" % name
+
+    def push(self, item, config):
+        if item["name"] in self.broken:
+            raise Exception("bad config")
+        with self.lock:
+            self.pushed.append(item["name"])
+        return "create"
+
+    def test_select_items(self):
+        items = select_items(ITEMS, "*-deploy")
+        self.assertEqual([(i["name"], i["ancestor"]) for i in items], [
+            ("team", True), ("team/sub", True),
+            ("team/sub/lib-deploy", False), ("team/web-deploy", False)])
+        self.assertEqual(len(select_items(ITEMS, "team*")), 5)
+
+    def test_folders_first(self):
+        """
+        items should be created only after the folder they are in
+        """
+        migration = Migration(self.fetch, self.push, 4)
+        results = migration.run(ITEMS)
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(r[1:3] == ("create", "done") for r in results))
+        for name in self.pushed:
+            if "/" in name:
+                self.assertTrue(self.pushed.index(name.rsplit("/", 1)[0]) <
+                                self.pushed.index(name))
+        self.assertEqual(migration.bytes, sum(
+            len("<config>%s</config>" % i["name"]) for i in ITEMS))
+
+    def test_failed_folder(self):
+        """
+        items of a folder which failed should be skipped
+        """
+        self.broken.add("team/sub")
+        items = ITEMS + [{"name": "missing", "folder": False}]
+        results = dict((r[0], r[1:3])
+                       for r in Migration(self.fetch, self.push, 4).run(items))
+        self.assertEqual(results["team/sub"], ("push", "failed"))
+        self.assertEqual(results["team/sub/lib-deploy"], ("none", "skipped"))
+        self.assertEqual(results["team/web-deploy"], ("create", "done"))
+        self.assertEqual(results["missing"], ("fetch", "failed"))
+        self.assertNotIn("team/sub/lib-deploy", self.pushed)
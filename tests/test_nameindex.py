@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openci.nameindex import GitlabIndex
+from openci.tests import mocked
+
+
+class FakeGitlabCI:
+    """
+    gitlab wrapper counting targeted lookups
+    """
+    url = "http://gitlab.example.com"
+
+    def __init__(self):
+        self.lookups = []
+
+    def list_all_users(self, workers=8):
+        return [{"id": 1, "username": "root", "email": "admin@example.com"}]
+
+    def list_all_projects(self, workers=8):
+        return [{"id": 10, "path_with_namespace": "root/website"}]
+
+    def find_users(self, username=None, search=None):
+        self.lookups.append(username or search)
+        users = [{"id": 2, "username": "jdoe", "email": "jdoe@example.com"}]
+        return mocked.json_response(
+                [u for u in users if username in (None, u["username"])])
+
+    def get_user(self, uid):
+        self.lookups.append(uid)
+        if uid == 1:
+            return mocked.json_response({"id": 1, "username": "root",
+                                         "email": "admin@example.com"})
+        return mocked.json_response({"message": "404 Not found"}, 404)
+
+    def get_project(self, proj_id):
+        self.lookups.append(proj_id)
+        if proj_id == "jdoe/blog":
+            return mocked.json_response(
+                    {"id": 11, "path_with_namespace": "jdoe/blog"})
+        return mocked.json_response({"message": "404 Not found"}, 404)
+
+
+class GitlabIndexTestCase(unittest.TestCase):
+    """
+    Unit tests for local index of gitlab user and project ids
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.gitlab = FakeGitlabCI()
+        self.index = GitlabIndex(
+                self.gitlab, os.path.join(self.tmpdir, "index.json"))
+        self.index.sync()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_resolve_from_index(self):
+        """
+        synced names should resolve without any request
+        """
+        self.assertEqual(self.index.user_id("root"), 1)
+        self.assertEqual(self.index.user_id("Admin@example.com"), 1)
+        self.assertEqual(self.index.user_id("42"), 42)
+        self.assertEqual(self.index.project_id("root/website"), 10)
+        self.assertEqual(self.gitlab.lookups, [])
+
+    def test_resolve_miss_once(self):
+        """
+        a missing name should be looked up once and then be indexed
+        """
+        self.assertEqual(self.index.user_id("jdoe"), 2)
+        self.assertEqual(self.index.user_id("jdoe@example.com"), 2)
+        self.assertEqual(self.index.project_id("jdoe/blog"), 11)
+        self.assertEqual(self.index.project_id("jdoe/blog"), 11)
+        self.assertEqual(self.gitlab.lookups, ["jdoe", "jdoe/blog"])
+
+        # index should be persisted
+        index = GitlabIndex(self.gitlab, self.index.fpath)
+        self.assertEqual(index.user_id("jdoe"), 2)
+
+    def test_resolve_unknown(self):
+        self.assertRaises(LookupError, self.index.user_id, "nobody")
+        self.assertRaises(LookupError, self.index.project_id, "no/project")
+
+    def test_checked_ids(self):
+        """
+        an indexed id should be checked on server before it is used
+        """
+        self.assertEqual(self.index.checked_user_id("root"), 1)
+        self.assertEqual(self.index.checked_user_id("7"), 7)
+        self.assertEqual(self.gitlab.lookups, [1])
+
+    def test_checked_ids_stale(self):
+        """
+        an indexed id now belonging to another user or project should
+        be dropped and the name looked up again
+        """
+        self.index.data["users"]["jdoe"] = 1
+        self.index.data["projects"]["jdoe/blog"] = 10
+        self.assertEqual(self.index.checked_user_id("jdoe"), 2)
+        self.assertEqual(self.index.checked_project_id("jdoe/blog"), 11)
+        self.assertEqual(self.gitlab.lookups, [1, "jdoe", 10, "jdoe/blog"])
+        self.assertEqual(self.index.data["users"]["jdoe"], 2)
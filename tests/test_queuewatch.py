@@ -0,0 +1,59 @@
+import unittest
+
+from openci.queuewatch import AdaptiveInterval, diff_snapshots
+from openci.queuewatch import format_delta, queue_snapshot, wait_stats
+
+
+class QueueWatchTestCase(unittest.TestCase):
+    """
+    Unit tests for diffing jenkins queue snapshots
+    """
+
+    def setUp(self):
+        self.old = queue_snapshot([
+                {"id": 1, "task": {"name": "a"}, "inQueueSince": 1000,
+                 "why": "Waiting for next available executor"},
+                {"id": 2, "task": {"name": "b"}, "inQueueSince": 2000,
+                 "blocked": True, "why": "Build #3 is already in progress"},
+                ])
+        self.new = queue_snapshot([
+                {"id": 2, "task": {"name": "b"}, "inQueueSince": 2000,
+                 "buildable": True, "why": "Waiting for executor"},
+                {"id": 3, "task": {"name": "c"}, "inQueueSince": 5000},
+                ])
+
+    def test_diff_snapshots(self):
+        """
+        items should be reported as entered, left or changed by id
+        """
+        self.assertEqual(
+                diff_snapshots(self.old, self.new), ([3], [1], [2]))
+        self.assertEqual(
+                diff_snapshots(self.new, self.new), ([], [], []))
+
+    def test_format_delta(self):
+        """
+        only changed items should be printed
+        """
+        lines = format_delta(self.old, self.new, 11000)
+        self.assertEqual([l[0] for l in lines], ["+", "~", "-"])
+        self.assertTrue("left after 10.0s" in lines[2])
+        self.assertEqual(format_delta(self.new, self.new, 11000), [])
+
+    def test_wait_stats(self):
+        """
+        stats should be count, min, mean and max of waiting seconds
+        """
+        self.assertEqual(wait_stats(self.new, 11000), (2, 6.0, 7.5, 9.0))
+        self.assertEqual(wait_stats({}, 11000), (0, 0, 0, 0))
+
+    def test_adaptive_interval(self):
+        """
+        interval should grow while idle and shrink on changes
+        """
+        interval = AdaptiveInterval(1.0, 4.0)
+        self.assertEqual(interval.next(False), 1.5)
+        self.assertEqual(interval.next(False), 2.25)
+        self.assertEqual(interval.next(False), 3.375)
+        self.assertEqual(interval.next(False), 4.0)
+        self.assertEqual(interval.next(True), 2.0)
@@ -0,0 +1,59 @@
+import unittest
+
+from openci.reconcile import GitlabState, make_plan, normalize_key
+
+
+class ReconcileTestCase(unittest.TestCase):
+    """
+    Unit tests for planning gitlab state reconciliation
+    """
+
+    def setUp(self):
+        # current state with one user having a key, an email and a project
+        self.state = GitlabState()
+        self.state.users["jdoe"] = {"id": 7, "username": "jdoe"}
+        self.state.keys["jdoe"] = {
+                normalize_key("ssh-rsa AAAA jdoe@laptop"):
+                {"id": 1, "title": "laptop", "key": "ssh-rsa AAAA"}}
+        self.state.emails["jdoe"] = {
+                "old@example.com": {"id": 3, "email": "old@example.com"}}
+        self.state.add_project({"name": "Website", "path": "website",
+                                "path_with_namespace": "jdoe/website"})
+
+        self.desired = [{
+                "username": "jdoe", "name": "John Doe",
+                "email": "jdoe@example.com",
+                "emails": ["new@example.com"],
+                "keys": [{"title": "laptop", "key": "ssh-rsa AAAA other"}],
+                "projects": ["website", "blog"],
+                }]
+
+    def test_plan_only_missing(self):
+        """
+        only missing email and project should be planned
+        """
+        changes = make_plan(self.desired, self.state)
+        self.assertEqual(
+                [(c["action"], c["target"]) for c in changes],
+                [("add_email", "new@example.com"),
+                 ("create_project", "blog")])
+
+    def test_plan_prune(self):
+        """
+        with prune, emails not in desired state should be removed
+        """
+        changes = make_plan(self.desired, self.state, prune=True)
+        self.assertTrue(
+                ("remove_email", "old@example.com") in
+                [(c["action"], c["target"]) for c in changes])
+
+    def test_plan_new_user(self):
+        """
+        a new user should be created with all its keys and projects
+        """
+        self.desired[0]["username"] = "newbie"
+        actions = [c["action"] for c in make_plan(self.desired, self.state)]
+        self.assertEqual(
+                actions,
+                ["create_user", "add_ssh_key", "add_email",
+                 "create_project", "create_project"])
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from openci.records import Build, Job, Project, User
+
+
+class RecordsTestCase(unittest.TestCase):
+    """
+    Unit tests for compact records
+    """
+
+    def test_from_dict(self):
+        """
+        record should keep only its fields, decoded compactly
+        """
+        job = Job.from_dict(json.loads(
+            '{"_class": "hudson.model.FreeStyleProject", "name": "app",'
+            ' "url": "http://ci/job/app/", "color": "blue"}'))
+        self.assertEqual(job.name, "app")
+        self.assertTrue(type(job.name) is str)
+        self.assertEqual(job.fullname, None)
+        self.assertFalse(hasattr(job, "__dict__"))
+        self.assertEqual(job.to_dict(), {"name": "app", "color": "blue",
+                                         "url": "http://ci/job/app/",
+                                         "fullname": None})
+
+        other = Job.from_dict({"name": "lib", "color": u"blue"})
+        self.assertTrue(job.color is other.color)
+
+        user = User.from_dict({"id": 1, "username": u"j\xf6rg"})
+        self.assertEqual(user.username, u"j\xf6rg")
+
+    def test_dict_access(self):
+        build = Build.from_dict({"number": 7, "result": "FAILURE"})
+        self.assertEqual(build["number"], 7)
+        self.assertEqual(build.get("duration"), None)
+        self.assertEqual(build.get("duration", 0), 0)
+        self.assertEqual(build.get("unknown", 1), 1)
+        self.assertTrue("result" in build)
+        self.assertFalse("duration" in build)
+        self.assertRaises(KeyError, lambda: build["unknown"])
+
+    def test_view(self):
+        """
+        view should make records one item at a time
+        """
+        made = []
+
+        def items():
+            for i in range(3):
+                made.append(i)
+                yield {"id": i, "path_with_namespace": "group/p%d" % i}
+
+        view = Project.view(items())
+        self.assertEqual(made, [])
+        first = next(view)
+        self.assertEqual((first.id, made), (0, [0]))
+        self.assertEqual([p["id"] for p in view], [1, 2])
+        self.assertEqual(Project.from_dict({"id": 1}),
+                         Project(id=1))
@@ -0,0 +1,110 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from openci.signatures import SignatureMatcher, group_failures
+
+LOG = """Started by user admin
+Building in workspace /var/lib/jenkins/workspace/app
+[app] $ mvn test
+Running com.example.AppTest
+Tests run: 3, Failures: 1, Errors: 0, Skipped: 0
+There are test failures.
+java.lang.OutOfMemoryError: Java heap space
+Finished: FAILURE
+"""
+
+
+class SignaturesTestCase(unittest.TestCase):
+    """
+    Unit tests for matching failure signatures in console logs
+    """
+
+    def setUp(self):
+        self.matcher = SignatureMatcher([
+            {"name": "tests", "patterns": ["There are test failures",
+                                           "Failures: 1"]},
+            {"name": "oom", "patterns": ["OutOfMemoryError"]},
+            {"name": "disk", "patterns": ["No space left on device"]},
+        ])
+
+    def test_scan(self):
+        """
+        signatures should be found with their first line, in any chunks
+        """
+        for size in (1, 3, 10, len(LOG)):
+            chunks = [LOG[i:i + size] for i in range(0, len(LOG), size)]
+            matches = self.matcher.scan(chunks)
+            self.assertEqual(sorted(matches), ["oom", "tests"])
+            self.assertEqual(matches["tests"]["line"], 5)
+            self.assertEqual(matches["tests"]["count"], 2)
+            self.assertEqual(matches["oom"]["line"], 7)
+            self.assertEqual(matches["oom"]["text"],
+                             "java.lang.OutOfMemoryError: Java heap space")
+
+    def test_overlapping_patterns(self):
+        """
+        automaton should find every pattern, same as a plain search
+        """
+        rand = random.Random(7)
+        patterns = ["he", "she", "his", "hers", "ers", "s", "rshe"]
+        matcher = SignatureMatcher(
+            [{"name": p, "patterns": [p]} for p in patterns])
+        for _ in range(50):
+            text = "".join(rand.choice("hers i") for _ in range(40))
+            self.assertEqual(sorted(matcher.scan([text])),
+                             sorted(p for p in patterns if p in text))
+
+    def test_unicode_patterns(self):
+        """
+        non ascii patterns from yaml should match utf-8 logs
+        """
+        matcher = SignatureMatcher([
+            {"name": "disk", "patterns": [u"Plus d'espace disponible \xe9"]}])
+        log = u"cp: Plus d'espace disponible \xe9\n".encode("utf-8")
+        matches = matcher.scan([log[:20], log[20:]])
+        self.assertEqual(matches["disk"]["text"],
+                         u"cp: Plus d'espace disponible \xe9")
+
+    @patch('openci.signatures.CHUNK_SIZE', 16)
+    def test_long_line(self):
+        """
+        patterns split between parts of a huge line should be found
+        """
+        log = "x" * 30 + "OutOfMemoryError" + "y" * 30 + "\nok\n"
+        for size in (5, 7, 16):
+            chunks = [log[i:i + size] for i in range(0, len(log), size)]
+            matches = self.matcher.scan(chunks)
+            self.assertEqual(sorted(matches), ["oom"])
+            self.assertEqual(matches["oom"]["count"], 1)
+            self.assertEqual(matches["oom"]["line"], 1)
+
+    def test_scan_file(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fpath = os.path.join(tmpdir, "console.log")
+            with open(fpath, "w") as f:
+                f.write(LOG)
+            self.assertEqual(sorted(self.matcher.scan_file(fpath)),
+                             ["oom", "tests"])
+
+            open(fpath, "w").close()
+            self.assertEqual(self.matcher.scan_file(fpath), {})
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_group_failures(self):
+        groups = group_failures([
+            ("app#1", {"oom": {}, "tests": {}}),
+            ("app#2", {"tests": {}}),
+            ("lib#7", {"tests": {}}),
+            ("docs#3", {}),
+        ])
+        self.assertEqual(groups, [
+            ("tests", ["app#1", "app#2", "lib#7"], ["app", "lib"]),
+            ("oom", ["app#1"], ["app"]),
+        ])
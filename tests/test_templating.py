@@ -0,0 +1,48 @@
+import unittest
+
+from openci.templating import JobTemplate, load_param_table
+from openci.utils import get_file_data
+
+
+class JobTemplateTestCase(unittest.TestCase):
+    """
+    Unit tests for jenkins job config templates
+    """
+
+    def test_render_placeholders(self):
+        """
+        placeholders should be replaced by xml escaped values
+        """
+        template = JobTemplate("<a>${name}</a><b>${desc}</b>")
+        self.assertEqual(
+                template.placeholders, set(["name", "desc"]))
+        self.assertEqual(
+                template.render({"name": "job", "desc": "x < y & z"}),
+                "<a>job</a><b>x &lt; y &amp; z</b>")
+
+    def test_render_escaped_placeholder(self):
+        """
+        $${name} should be rendered as a literal ${name}
+        """
+        template = JobTemplate("<a>$${HOME}/${name}</a>")
+        self.assertEqual(template.placeholders, set(["name"]))
+        self.assertEqual(
+                template.render({"name": "job"}), "<a>${HOME}/job</a>")
+
+    def test_render_missing_param(self):
+        """
+        rendering must fail when a placeholder has no value
+        """
+        template = JobTemplate("<a>${name}</a><b>${desc}</b>")
+        self.assertRaises(KeyError, template.render, {"name": "job"})
+
+    def test_sample_template_and_params(self):
+        """
+        every row of the sample param table should render the sample template
+        """
+        template = JobTemplate(
+                get_file_data("openci/config_samples/template.xml"))
+        rows = load_param_table("openci/config_samples/params.csv")
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertTrue(row["tasks"] in template.render(row))
@@ -0,0 +1,96 @@
+import unittest
+
+from openci.throttle import ThrottledTrigger, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ThrottleTestCase(unittest.TestCase):
+    """
+    Unit tests for throttled build triggering
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.queue = []
+        self.builds = []
+
+    def build(self, name):
+        self.builds.append((self.clock(), name))
+        self.queue.append({"id": len(self.builds),
+                           "task": {"name": name.split("/")[-1]},
+                           "inQueueSince": self.clock() * 1000})
+
+    def make_trigger(self, rate, burst, high_water):
+        return ThrottledTrigger(
+            self.build, lambda: list(self.queue),
+            TokenBucket(rate, burst, self.clock), high_water,
+            poll=1.0, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(2.0, 2, self.clock)
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+        self.clock.sleep(0.5)
+        self.assertTrue(bucket.take())
+
+    def test_submit_rate(self):
+        """
+        builds should be submitted at bucket rate after a burst
+        """
+        trigger = self.make_trigger(2.0, 2, 100)
+        for i in range(6):
+            trigger.submit("job%d" % i)
+
+        times = [t - 1000.0 for t, _ in self.builds]
+        self.assertEqual(times[:2], [0.0, 0.0])
+        for i, t in enumerate(times[2:]):
+            self.assertAlmostEqual(t, 0.5 * (i + 1))
+
+    def test_high_water(self):
+        """
+        builds should wait while queue is at high water mark and
+        queue waits of submitted builds should be recorded
+        """
+        trigger = self.make_trigger(100.0, 10, 2)
+        trigger.submit("a")
+        trigger.submit("folder/b")
+        self.assertEqual(len(self.builds), 2)
+
+        # queue is full, executors take items 3 seconds later
+        def take_items(seconds):
+            self.clock.now += seconds
+            if self.clock.now >= 1003.0:
+                del self.queue[:]
+
+        trigger.sleep = take_items
+        trigger.submit("c")
+        self.assertEqual(self.builds[2][1], "c")
+        self.assertTrue(self.builds[2][0] >= 1003.0)
+        self.assertEqual(len(trigger.waits), 2)
+        self.assertTrue(all(w >= 3.0 for w in trigger.waits))
+
+        self.assertEqual(trigger.drain(10), 0)
+        self.assertEqual(trigger.submitted, 3)
+
+    def test_failed_build(self):
+        def build(name):
+            raise Exception("boom")
+
+        trigger = self.make_trigger(1.0, 1, 10)
+        trigger.build = build
+        self.assertFalse(trigger.submit("a"))
+        self.assertEqual(trigger.failed, [("a", "boom")])
+        self.assertEqual(trigger.submitted, 0)
@@ -0,0 +1,153 @@
+import gzip
+import threading
+import unittest
+import urllib2
+import zlib
+from cStringIO import StringIO
+
+import BaseHTTPServer
+
+from openci import transport
+from openci.transport import CompressionHandler, DecodingReader
+from openci.transport import MIN_COMPRESS_SIZE, gzip_data
+
+BODY = '{"jobs": [%s]}' % ",".join(
+    '{"name": "job-%d", "color": "blue"}' % i for i in range(2000))
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    # request bodies received by server, decoded
+    received = []
+    accept_gzip = True
+
+    # status and body of response to a gzipped request body refused
+    rejection = (415, "")
+
+    def do_GET(self):
+        body = BODY
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip_data(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            if not Handler.accept_gzip:
+                code, body = Handler.rejection
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            data = gzip.GzipFile(fileobj=StringIO(data)).read()
+        Handler.received.append(data)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write("OK")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TransportTestCase(unittest.TestCase):
+    """
+    Unit tests for compressed transport
+    """
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = "http://127.0.0.1:%d/" % self.server.server_address[1]
+
+        self.handler = CompressionHandler()
+        self.opener = urllib2.build_opener(self.handler)
+        transport.stats = transport.TransferStats()
+        Handler.received = []
+        Handler.accept_gzip = True
+        Handler.rejection = (415, "")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_compressed_response(self):
+        """
+        gzipped response should be decoded and counted
+        """
+        self.assertEqual(self.opener.open(self.url).read(), BODY)
+
+        [(host, count, wire, decoded)] = transport.stats.rows()
+        self.assertEqual(count, 1)
+        self.assertEqual(decoded, len(BODY))
+        self.assertTrue(wire < len(BODY) / 10)
+
+    def test_streamed_read(self):
+        resp = self.opener.open(self.url)
+        data = "".join(iter(lambda: resp.read(1000), ""))
+        self.assertEqual(data, BODY)
+
+    def test_compressed_request(self):
+        """
+        large request body should be gzipped for hosts accepting it
+        """
+        data = "<project>%s</project>" % ("x" * MIN_COMPRESS_SIZE)
+        self.handler.hosts.add(self.url.split("/")[2])
+        self.assertEqual(self.opener.open(self.url, data).read(), "OK")
+        self.assertEqual(Handler.received, [data])
+
+    def test_compressed_request_rejected(self):
+        """
+        request rejected for compression should be sent again plain
+        """
+        data = "x" * MIN_COMPRESS_SIZE
+        host = self.url.split("/")[2]
+        self.handler.hosts.add(host)
+        Handler.accept_gzip = False
+        self.assertEqual(self.opener.open(self.url, data).read(), "OK")
+        self.assertEqual(Handler.received, [data])
+        self.assertFalse(host in self.handler.hosts)
+
+    def test_compressed_request_bad_encoding(self):
+        """
+        400 naming the encoding should be taken as compression refused
+        """
+        data = "x" * MIN_COMPRESS_SIZE
+        self.handler.hosts.add(self.url.split("/")[2])
+        Handler.accept_gzip = False
+        Handler.rejection = (400, "Unsupported Content-Encoding: gzip")
+        self.assertEqual(self.opener.open(self.url, data).read(), "OK")
+        self.assertEqual(Handler.received, [data])
+
+    def test_compressed_request_error(self):
+        """
+        other 400 errors should be returned, request never sent again
+        """
+        data = "x" * MIN_COMPRESS_SIZE
+        host = self.url.split("/")[2]
+        self.handler.hosts.add(host)
+        Handler.accept_gzip = False
+        Handler.rejection = (400, "Invalid job name")
+        try:
+            self.opener.open(self.url, data)
+            self.fail("HTTPError not raised")
+        except urllib2.HTTPError as e:
+            self.assertEqual(e.code, 400)
+            self.assertEqual(e.read(), "Invalid job name")
+        self.assertEqual(Handler.received, [])
+        self.assertTrue(host in self.handler.hosts)
+
+    def test_raw_deflate(self):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = compressor.compress(BODY) + compressor.flush()
+        reader = DecodingReader(StringIO(data), "deflate", self.url)
+        self.assertEqual(reader.read(), BODY)
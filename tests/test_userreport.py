@@ -0,0 +1,93 @@
+import json
+import unittest
+
+from openci.records import User
+from openci.tests import mocked
+from openci.userreport import user_report
+
+USERS = [
+    {"id": 1, "username": "root", "name": "Admin", "state": "active",
+     "keys": [{"id": 10, "title": "laptop", "key": "ssh-rsa AAA root"}],
+     "emails": [{"id": 5, "email": "root@example.com"}]},
+    {"id": 2, "username": "alice", "name": "Alice", "state": "blocked",
+     "keys": [{"id": 12, "title": "b", "key": "ssh-rsa BBB"},
+              {"id": 11, "title": "a", "key": "ssh-rsa AAA"}],
+     "emails": []},
+    {"id": 3, "username": "bob", "name": "Bob", "state": "active",
+     "keys": [], "emails": [{"id": 6, "email": "b@example.com"},
+                            {"id": 7, "email": "a@example.com"}]},
+]
+
+
+class FakeGitlabCI:
+    """
+    gitlab with rest api, and graphql api having emails but not ssh
+    keys nested in users
+    """
+
+    def __init__(self, graphql=True):
+        self.has_graphql = graphql
+        self.queries = []
+        self.rest_calls = 0
+
+    def list_all_users(self, workers=8):
+        self.rest_calls += 1
+        return [User.from_dict(u) for u in USERS]
+
+    def list_ssh_keys_for_user(self, uid):
+        self.rest_calls += 1
+        return mocked.json_response(USERS[uid - 1]["keys"])
+
+    def list_emails_for_user(self, uid):
+        self.rest_calls += 1
+        return mocked.json_response(USERS[uid - 1]["emails"])
+
+    def graphql(self, query, variables=None):
+        if not self.has_graphql:
+            raise Exception("Graphql query failed: 404")
+        self.queries.append(variables)
+        if "__type" in query:
+            return {"__type": {"fields": [
+                {"name": "username"}, {"name": "emails"}]}}
+
+        # two users per page
+        start = int(variables["after"] or 0)
+        nodes = [{"id": "gid://gitlab/User/%d" % u["id"],
+                  "username": u["username"], "name": u["name"],
+                  "state": u["state"],
+                  "emails": {"pageInfo": {"hasNextPage": False},
+                             "nodes": [{"id": "gid://gitlab/Email/%d" %
+                                        e["id"], "email": e["email"]}
+                                       for e in u["emails"]]}}
+                 for u in USERS[start:start + 2]]
+        return {"users": {"nodes": nodes, "pageInfo": {
+            "hasNextPage": start + 2 < len(USERS),
+            "endCursor": str(start + 2)}}}
+
+
+class UserReportTestCase(unittest.TestCase):
+    """
+    Unit tests for report of users with their keys and emails
+    """
+
+    def test_same_report(self):
+        """
+        graphql and rest should give same report
+        """
+        gitlab = FakeGitlabCI()
+        report, source = user_report(gitlab)
+        self.assertEqual(source, "graphql")
+        # schema query and two pages of users
+        self.assertEqual(len(gitlab.queries), 3)
+        # only ssh keys, missing in graphql schema, read with rest
+        self.assertEqual(gitlab.rest_calls, 3)
+
+        rest = FakeGitlabCI(graphql=False)
+        self.assertEqual(user_report(rest), (report, "rest"))
+        self.assertEqual(rest.rest_calls, 7)
+
+        self.assertEqual([u["id"] for u in report], [1, 2, 3])
+        self.assertEqual([k["id"] for k in report[1]["keys"]], [11, 12])
+        self.assertEqual(report[2]["emails"],
+                         ["a@example.com", "b@example.com"])
+        json.dumps(report)
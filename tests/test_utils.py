@@ -0,0 +1,39 @@
+import unittest
+import ConfigParser
+
+from openci.utils import get_server_sections, run_concurrently
+from openci.utils import format_duration
+
+
+class UtilsTestCase(unittest.TestCase):
+    """
+    Unit tests for convenience utils
+    """
+
+    def test_get_server_sections(self):
+        """
+        [ci] should be the default server and [ci:<name>] named ones
+        """
+        config = ConfigParser.ConfigParser()
+        config.read('openci/tests/openci.cfg')
+        config.add_section('ci:old')
+        config.add_section('git:mirror')
+        self.assertEqual(get_server_sections(config, 'ci'),
+                         [('default', 'ci'), ('old', 'ci:old')])
+        self.assertEqual(get_server_sections(config, 'git'),
+                         [('default', 'git'), ('mirror', 'git:mirror')])
+
+    def test_run_concurrently(self):
+        """
+        results should keep order of items and errors should be returned
+        """
+        results = run_concurrently(lambda x: 10 / x, [1, 0, 5], 3)
+        self.assertEqual([r[:2] for r in results],
+                         [(1, 10), (0, None), (5, 2)])
+        self.assertTrue(isinstance(results[1][2], ZeroDivisionError))
+        self.assertEqual(run_concurrently(abs, []), [])
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(12), "12s")
+        self.assertEqual(format_duration(187), "3m07s")
+        self.assertEqual(format_duration(3720), "1h02m")
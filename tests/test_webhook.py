@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+import unittest
+import urllib2
+
+from openci.webhook import Coalescer, PooledHTTPServer
+from openci.webhook import event_project, make_handler
+
+
+class WebhookTestCase(unittest.TestCase):
+    """
+    Unit tests for gitlab webhook listener
+    """
+
+    def setUp(self):
+        self.fired = []
+        self.coalescer = Coalescer(
+                lambda key, count: self.fired.append((key, count)), 0.2)
+
+    def _wait_fired(self, count):
+        for _ in range(50):
+            if len(self.fired) >= count:
+                return
+            time.sleep(0.05)
+
+    def test_coalesce_burst(self):
+        """
+        a burst of triggers of a job should fire it once
+        """
+        self.assertTrue(self.coalescer.add("app"))
+        for _ in range(9):
+            self.assertFalse(self.coalescer.add("app"))
+        self.coalescer.add("docs")
+        self._wait_fired(2)
+        time.sleep(0.1)
+        self.assertEqual(sorted(self.fired), [("app", 10), ("docs", 1)])
+
+    def test_event_project(self):
+        push = {"object_kind": "push",
+                "project": {"path_with_namespace": "group/app"}}
+        merge = {"object_kind": "merge_request",
+                 "object_attributes": {
+                     "target": {"path_with_namespace": "group/app"}}}
+        self.assertEqual(event_project(push), "group/app")
+        self.assertEqual(event_project(merge), "group/app")
+        self.assertEqual(event_project({"object_kind": "note"}), None)
+
+    def test_listener(self):
+        """
+        pushes posted to listener should queue mapped jobs
+        """
+        handler = make_handler(
+                {"group/app": ["app-build", "app-tests"]},
+                self.coalescer, "secret")
+        server = PooledHTTPServer(("127.0.0.1", 0), handler, 2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        url = "http://127.0.0.1:%d/" % server.server_address[1]
+        push = json.dumps({"object_kind": "push",
+                           "project": {"path_with_namespace": "group/app"}})
+        try:
+            for _ in range(3):
+                resp = urllib2.urlopen(urllib2.Request(
+                        url, push, {"X-Gitlab-Token": "secret"}))
+                self.assertEqual(resp.getcode(), 202)
+
+            try:
+                urllib2.urlopen(urllib2.Request(url, push))
+                self.fail("request without token should be rejected")
+            except urllib2.HTTPError as e:
+                self.assertEqual(e.code, 403)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self._wait_fired(2)
+        time.sleep(0.1)
+        self.assertEqual(sorted(self.fired),
+                         [("app-build", 3), ("app-tests", 3)])
@@ -0,0 +1,155 @@
+##############################################################################
+#
+# throttled triggering of many jenkins builds, builds are submitted at
+# a token bucket rate and only while the build queue is short enough
+#
+##############################################################################
+
+import time
+
+from queuewatch import diff_snapshots, queue_snapshot
+
+
+class TokenBucket:
+    """
+    Class for a token bucket, refilled with rate tokens per second
+    up to burst tokens
+    """
+
+    def __init__(self, rate, burst=1, clock=time.time):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """
+        Function returns seconds until a token is available
+        """
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """
+        Function takes a token if one is available, returns True if taken
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ThrottledTrigger:
+    """
+    Class for submitting builds of many jobs without flooding the queue
+
+    build(name) triggers a build, get_queue_items() returns jenkins
+    queue items (see JenkinsCI.get_queue_items). A build is submitted
+    when bucket has a token and queue holds fewer than high_water items,
+    queue is polled at most every poll seconds. Items of submitted jobs
+    leaving the queue are timed to report queue wait times.
+    """
+
+    def __init__(self, build, get_queue_items, bucket, high_water,
+                 poll=2.0, clock=time.time, sleep=time.sleep):
+        self.build = build
+        self.get_queue_items = get_queue_items
+        self.bucket = bucket
+        self.high_water = high_water
+        self.poll = poll
+        self.clock = clock
+        self.sleep = sleep
+
+        self.snapshot = {}
+        self.polled = None
+        self.unseen = 0  # builds submitted since last poll
+        self.pending = {}  # queue task name -> builds waiting to be seen
+        self.waits = []
+        self.submitted = 0
+        self.failed = []
+
+    def refresh(self):
+        """
+        Function polls the queue, recording waits of submitted builds
+        which left it, returns number of items in queue
+        """
+        current = queue_snapshot(self.get_queue_items())
+        now = self.clock()
+        _, left, _ = diff_snapshots(self.snapshot, current)
+        for i in left:
+            name, _, _, since = self.snapshot[i]
+            if self.pending.get(name):
+                self.pending[name] -= 1
+                self.waits.append(max(0, now * 1000 - since) / 1000.0)
+
+        # jenkins merges queued builds of a job, so builds not seen
+        # leaving are dropped once their job has nothing queued
+        queued = set(item[0] for item in current.values())
+        for name in self.pending:
+            if name not in queued:
+                self.pending[name] = 0
+
+        self.snapshot = current
+        self.polled = now
+        self.unseen = 0
+        return len(current)
+
+    def queue_length(self):
+        """
+        Function returns queue length, polling server if last poll
+        is older than poll interval
+        """
+        if self.polled is None or self.clock() - self.polled >= self.poll:
+            return self.refresh()
+        return len(self.snapshot) + self.unseen
+
+    def submit(self, name):
+        """
+        Function waits for a token and room in the queue,
+        then triggers a build of job name
+        """
+        while True:
+            length = self.queue_length()
+            if length >= self.high_water:
+                self.sleep(max(0.1, self.poll - (self.clock() - self.polled)))
+                continue
+            delay = self.bucket.delay()
+            if delay > 0:
+                self.sleep(delay)
+                continue
+            self.bucket.take()
+            break
+
+        try:
+            self.build(name)
+        except Exception as e:
+            self.failed.append((name, str(e)))
+            return False
+
+        # queue item of a job in a folder is named by job's short name
+        task = name.split("/")[-1]
+        self.pending[task] = self.pending.get(task, 0) + 1
+        self.unseen += 1
+        self.submitted += 1
+        return True
+
+    def drain(self, timeout):
+        """
+        Function polls the queue until submitted builds left it or
+        timeout seconds passed, returns number of builds still queued
+        """
+        deadline = self.clock() + timeout
+        while sum(self.pending.values()) and self.clock() < deadline:
+            self.sleep(self.poll)
+            self.refresh()
+        return sum(self.pending.values())
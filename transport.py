@@ -0,0 +1,260 @@
+##############################################################################
+#
+# compressed transport for api traffic
+#
+# requests already asks for gzip/deflate responses and decodes them
+# while streaming, python-jenkins talks through urllib2 which doesn't,
+# so a urllib2 handler is installed negotiating compressed responses,
+# decoding them chunk by chunk and gzipping large request bodies for
+# servers known to accept them. Bytes on wire and decoded bytes of
+# responses are counted per host for diagnostics.
+#
+##############################################################################
+
+import gzip
+import threading
+import urllib2
+import urlparse
+import zlib
+from cStringIO import StringIO
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+# request bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 16 * 1024
+
+# size of chunks read from server
+CHUNK_SIZE = 64 * 1024
+
+
+class TransferStats:
+    """
+    Class for counting requests, bytes on wire and decoded bytes
+    of responses per host
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def add(self, url, wire, decoded):
+        host = urlparse.urlparse(url).netloc
+        with self.lock:
+            counts = self.hosts.setdefault(host, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += wire
+            counts[2] += decoded
+
+    def rows(self):
+        """
+        Function returns a python list of
+        (host, requests, bytes on wire, decoded bytes) sorted by host
+        """
+        with self.lock:
+            return [(host,) + tuple(counts)
+                    for host, counts in sorted(self.hosts.items())]
+
+
+# counters of all traffic of this process
+stats = TransferStats()
+
+
+def record_response(resp):
+    """
+    Function counts a fully read response of requests module,
+    bytes on wire are taken from underlying urllib3 response
+    """
+    try:
+        decoded = len(resp.content)
+        wire = resp.raw.tell() or decoded
+        url = resp.url
+    except (AttributeError, TypeError):
+        # not a real requests response, eg mocked in tests
+        return
+    stats.add(url, wire, decoded)
+
+
+def iter_response(resp, chunk_size=CHUNK_SIZE):
+    """
+    Function yields decoded chunks of a streamed response of requests
+    module, counting it into stats once it is read to its end
+    """
+    decoded = 0
+    for chunk in resp.iter_content(chunk_size):
+        decoded += len(chunk)
+        yield chunk
+    stats.add(resp.url, resp.raw.tell() or decoded, decoded)
+
+
+def gzip_data(data):
+    """
+    Function returns data compressed in gzip format
+    """
+    buf = StringIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class DecodingReader:
+    """
+    Class for a file like object decoding a gzip or deflate encoded
+    response while it is read, counting bytes on wire and decoded
+    bytes into stats when response is read to its end
+    """
+
+    def __init__(self, fp, encoding, url):
+        self.fp = fp
+        self.url = url
+        self.wire = 0
+        self.decoded = 0
+        self.buffer = ""
+        self.done = False
+        if encoding == "gzip":
+            self.decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self.decoder = zlib.decompressobj()
+        else:
+            self.decoder = None
+
+    def _decode(self, chunk):
+        if self.decoder is None:
+            return chunk
+        try:
+            return self.decoder.decompress(chunk)
+        except zlib.error:
+            if self.wire != len(chunk):
+                raise
+            # some servers send raw deflate data without zlib header
+            self.decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self.decoder.decompress(chunk)
+
+    def _fill(self, size):
+        while not self.done and (size < 0 or len(self.buffer) < size):
+            chunk = self.fp.read(CHUNK_SIZE)
+            if not chunk:
+                if self.decoder is not None:
+                    self.buffer += self.decoder.flush()
+                self.done = True
+                stats.add(self.url, self.wire,
+                          self.decoded + len(self.buffer))
+                break
+            self.wire += len(chunk)
+            self.buffer += self._decode(chunk)
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0:
+            data, self.buffer = self.buffer, ""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.decoded += len(data)
+        return data
+
+    def readline(self, size=-1):
+        while "\n" not in self.buffer and not self.done:
+            self._fill(len(self.buffer) + 1)
+        end = self.buffer.find("\n") + 1 or len(self.buffer)
+        if size >= 0:
+            end = min(end, size)
+        return self.read(end)
+
+    def readlines(self):
+        return list(iter(self.readline, ""))
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+    def fileno(self):
+        return self.fp.fileno()
+
+    def close(self):
+        self.fp.close()
+
+
+def rejects_encoding(body):
+    """
+    Function tells whether body of a 400 response complains about
+    encoding of request body
+    """
+    body = body.lower()
+    return "gzip" in body or "encoding" in body
+
+
+class CompressionHandler(urllib2.BaseHandler):
+    """
+    Class for a urllib2 handler negotiating compressed responses and
+    gzipping request bodies for hosts added with compress_requests()
+
+    A host answering a compressed request with 415, or with 400 and
+    an error naming the encoding, is taken as not supporting it and
+    the request is sent again uncompressed
+    """
+
+    # runs before HTTPHandler sets Content-Length of request body
+    handler_order = 400
+
+    def __init__(self):
+        self.hosts = set()
+
+    def http_request(self, req):
+        if not req.has_header("Accept-encoding"):
+            req.add_unredirected_header("Accept-encoding", ACCEPT_ENCODING)
+
+        data = req.get_data()
+        if (data and len(data) >= MIN_COMPRESS_SIZE and
+                req.get_host() in self.hosts and
+                not req.has_header("Content-encoding")):
+            req.uncompressed = data
+            req.add_data(gzip_data(data))
+            req.add_unredirected_header("Content-encoding", "gzip")
+        return req
+
+    def http_response(self, req, resp):
+        encoding = resp.info().get("Content-Encoding", "").strip().lower()
+        reader = DecodingReader(resp, encoding, req.get_full_url())
+
+        if getattr(req, "uncompressed", None) and resp.code in (400, 415):
+            # a 400 is a rejected encoding only if its body says so,
+            # any other error is returned as is, never sent again
+            body = reader.read() if resp.code == 400 else ""
+            if resp.code == 415 or rejects_encoding(body):
+                resp.close()
+                self.hosts.discard(req.get_host())
+                retry = urllib2.Request(
+                    req.get_full_url(), req.uncompressed, dict(
+                        (k, v) for k, v in req.header_items()
+                        if k.lower() not in ("content-encoding",
+                                             "content-length")))
+                return self.parent.open(retry, timeout=req.timeout)
+            reader = StringIO(body)
+
+        decoded = urllib2.addinfourl(
+            reader, resp.info(), resp.geturl(), resp.code)
+        decoded.msg = resp.msg
+        return decoded
+
+    https_request = http_request
+    https_response = http_response
+
+
+_handler = None
+
+
+def install():
+    """
+    Function installs compression handler into the default urllib2
+    opener used by python-jenkins, returns the handler
+    """
+    global _handler
+    if _handler is None:
+        _handler = CompressionHandler()
+        urllib2.install_opener(urllib2.build_opener(_handler))
+    return _handler
+
+
+def compress_requests(url):
+    """
+    Function enables gzipped request bodies for server at given url
+    """
+    install().hosts.add(urlparse.urlparse(url).netloc)
@@ -0,0 +1,154 @@
+##############################################################################
+#
+# report of gitlab users with their ssh keys and emails, read with
+# batched graphql queries, users with nested keys and emails a page at
+# a time, or with concurrent rest requests on servers without graphql
+#
+##############################################################################
+
+import json
+
+from utils import run_concurrently
+
+# users per graphql query, and keys or emails per user in it
+PAGE_SIZE = 100
+
+# nested user lists read with graphql when server's schema has them,
+# name of field -> fields of its nodes
+NESTED = {"emails": "id email", "sshKeys": "id title key"}
+
+FIELDS_QUERY = '{ __type(name: "User") { fields { name } } }'
+
+USERS_QUERY = """
+query($first: Int!, $after: String) {
+  users(first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    nodes { id username name state %s }
+  }
+}
+"""
+
+
+def gid(value):
+    """
+    Function returns numeric id of a graphql global id,
+    eg 'gid://gitlab/User/12' is 12
+    """
+    return int(str(value).rsplit("/", 1)[-1])
+
+
+def make_entry(user, keys, emails):
+    """
+    Function returns report entry of a user, same for graphql and rest
+    """
+    return {"id": user["id"], "username": user["username"],
+            "name": user["name"], "state": user["state"],
+            "keys": sorted(({"id": k["id"], "title": k["title"],
+                             "key": k["key"]} for k in keys),
+                           key=lambda k: k["id"]),
+            "emails": sorted(e["email"] for e in emails)}
+
+
+def nested_fields(gitlabci):
+    """
+    Function returns names of nested user lists of NESTED which
+    graphql schema of server has
+    """
+    data = gitlabci.graphql(FIELDS_QUERY)
+    names = set(f["name"] for f in (data.get("__type") or {}).get(
+        "fields") or [])
+    return sorted(name for name in NESTED if name in names)
+
+
+def read_rest(gitlabci, uid, kind):
+    """
+    Function returns ssh keys ('keys') or emails ('emails') of a user
+    """
+    if kind == "keys":
+        resp = gitlabci.list_ssh_keys_for_user(uid)
+    else:
+        resp = gitlabci.list_emails_for_user(uid)
+    if resp.status_code != 200:
+        raise Exception("Failed to get %s of user %d: %s" % (
+            kind, uid, resp.content))
+    return json.loads(resp.content)
+
+
+def fill_rest(gitlabci, tasks, workers):
+    """
+    Function reads nested lists of users with a rest request for each
+    task of (user dict, 'keys' or 'emails'), in parallel, into the
+    users' dicts
+    """
+    for (user, kind), items, error in run_concurrently(
+            lambda task: read_rest(gitlabci, task[0]["id"], task[1]),
+            tasks, workers):
+        if error:
+            raise error
+        user[kind] = items
+
+
+def graphql_users(gitlabci, page_size=PAGE_SIZE):
+    """
+    Function reads all users with graphql, with their keys and emails
+    nested in users' pages
+
+    Returns a tuple of (python list of user dicts, tasks of lists left
+    to read with rest), for lists the server's schema doesn't have and
+    for users with more keys or emails than fit in a page
+    """
+    nested = nested_fields(gitlabci)
+    query = USERS_QUERY % " ".join(
+        "%s(first: %d) { pageInfo { hasNextPage } nodes { %s } }" % (
+            name, page_size, NESTED[name])
+        for name in nested)
+    kinds = (("keys", "sshKeys"), ("emails", "emails"))
+
+    users = []
+    tasks = []
+    after = None
+    while True:
+        page = gitlabci.graphql(
+            query, {"first": page_size, "after": after})["users"]
+        for node in page["nodes"]:
+            user = {"id": gid(node["id"]), "username": node["username"],
+                    "name": node["name"], "state": node["state"].lower()}
+            for kind, name in kinds:
+                if name not in nested or \
+                        node[name]["pageInfo"]["hasNextPage"]:
+                    tasks.append((user, kind))
+                else:
+                    user[kind] = node[name]["nodes"]
+            for key in user.get("keys", []):
+                key["id"] = gid(key["id"])
+            users.append(user)
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+    return users, tasks
+
+
+def user_report(gitlabci, graphql=True, workers=8):
+    """
+    Function returns a tuple of (report entries sorted by user id,
+    'graphql' or 'rest')
+
+    Without graphql, or when it fails, users are listed with rest and
+    keys and emails of every user are read in parallel
+    """
+    users = None
+    if graphql:
+        try:
+            users, tasks = graphql_users(gitlabci)
+            source = "graphql"
+        except Exception:
+            users = None
+    if users is None:
+        users = [u.to_dict() for u in gitlabci.list_all_users(workers)]
+        tasks = [(user, kind) for user in users
+                 for kind in ("keys", "emails")]
+        source = "rest"
+
+    fill_rest(gitlabci, tasks, workers)
+    report = [make_entry(u, u["keys"], u["emails"]) for u in users]
+    return sorted(report, key=lambda u: u["id"]), source
@@ -4,14 +4,20 @@
 #
 ##############################################################################
 
+import json
+import os
 import random
 import string
 import sys
 import ConfigParser
+from multiprocessing.pool import ThreadPool
 from os.path import expanduser, isfile
 
 VERBOSE = True
 
+# directory for local caches/state of openci
+DATA_DIR = '~/.openci.d'
+
 if VERBOSE:
     def verbose_print(*args):
         """
@@ -78,6 +84,116 @@ def confirm_yes_no(question, default="yes"):
                              "(or 'y' or 'n').\n")
 
 
+def get_data_path(*parts):
+    """
+    Function returns path of a file under openci's local data directory,
+    parent directories are created when missing
+    """
+    path = os.path.join(expanduser(DATA_DIR), *parts)
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        os.makedirs(parent)
+    return path
+
+
+def load_json(fpath, default=None):
+    """
+    Function returns the json content of given file,
+    or default when file doesn't exist or is broken
+    """
+    try:
+        with open(fpath) as f:
+            return json.load(f)
+    except (EnvironmentError, ValueError):
+        return default
+
+
+def save_json(fpath, data):
+    """
+    Function writes data as json to given file
+
+    Data is written to a temp file first and renamed over fpath,
+    so readers never see a half written file
+    """
+    tmp = "%s.tmp" % fpath
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp, fpath)
+
+
+def run_concurrently(func, items, workers=8):
+    """
+    Function calls func for every item of items on a pool of worker threads
+
+    Returns a list of (item, result, error) tuples in the order of items,
+    error is None when the call succeeded, otherwise the raised exception
+    """
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    items = list(items)
+    if not items:
+        return []
+
+    pool = ThreadPool(max(1, min(workers, len(items))))
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def print_table(headers, rows):
+    """
+    Function prints rows as a plain text table with given column headers
+    """
+    rows = [[str(c) for c in row] for row in rows]
+    widths = [len(h) for h in headers]
+    for row in rows:
+        widths = [max(w, len(c)) for w, c in zip(widths, row)]
+
+    fmt = "  ".join("%%-%ds" % w for w in widths)
+    print (fmt % tuple(headers)).rstrip()
+    print (fmt % tuple("-" * w for w in widths)).rstrip()
+    for row in rows:
+        print (fmt % tuple(row)).rstrip()
+
+
+def format_duration(seconds):
+    """
+    Function returns given seconds as a short human readable duration,
+    eg '1h02m', '3m07s' or '12s'
+    """
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return "%dh%02dm" % (seconds / 3600, seconds % 3600 / 60)
+    if seconds >= 60:
+        return "%dm%02ds" % (seconds / 60, seconds % 60)
+    return "%ds" % seconds
+
+
+def get_server_sections(config, kind):
+    """
+    Function returns a python list of (server name, config section)
+    for servers of given kind, 'git' or 'ci', in config
+
+    Section [ci] is the server named 'default', more servers are
+    defined in sections named like [ci:<server name>]
+    """
+    servers = []
+    for section in config.sections():
+        if section == kind:
+            servers.append(("default", section))
+        elif section.startswith(kind + ":"):
+            servers.append((section[len(kind) + 1:], section))
+    return servers
+
+
 def create_config(config_path):
     """
     I am called when ~/.openci does not exist. I ask the user for
@@ -89,7 +205,7 @@ def create_config(config_path):
     git_server = raw_input(
         "git server[http://gitlab.com]:") or "http://gitlab.com"
     git_api_key = raw_input("git api key[prompt]:") or ''
-    api_version = 1.0
+    api_version = raw_input("git api version[4]:") or 4
     timeout = 10
     ci_server = raw_input(
         "ci server[http://127.0.0.1:8080]:") or "http://127.0.0.1:8080"
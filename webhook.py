@@ -0,0 +1,167 @@
+##############################################################################
+#
+# http listener for gitlab push and merge request webhooks, triggering
+# builds of mapped jenkins jobs, bursts of events are coalesced per job
+#
+##############################################################################
+
+import json
+import threading
+import time
+import yaml
+import BaseHTTPServer
+import Queue
+from multiprocessing.pool import ThreadPool
+
+
+class Coalescer:
+    """
+    Class for coalescing triggers of same key within a window
+
+    First trigger of a key schedules it for window seconds later, more
+    triggers of that key until then are folded into the same run.
+    Due keys are passed to fire(key, count) on a pool of workers.
+    """
+
+    def __init__(self, fire, window=5.0, workers=4):
+        self.fire = fire
+        self.window = window
+        self.pool = ThreadPool(workers)
+
+        # key -> [deadline, number of triggers]
+        self.pending = {}
+        self.cond = threading.Condition()
+
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, key):
+        """
+        Function schedules key, returns True if it was not pending yet
+        """
+        with self.cond:
+            if key in self.pending:
+                self.pending[key][1] += 1
+                return False
+            self.pending[key] = [time.time() + self.window, 1]
+            self.cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+
+                now = time.time()
+                due = [key for key, (deadline, _) in self.pending.items()
+                       if deadline <= now]
+                if not due:
+                    earliest = min(d for d, _ in self.pending.values())
+                    self.cond.wait(earliest - now)
+                    continue
+                fired = [(key, self.pending.pop(key)[1]) for key in due]
+
+            for key, count in fired:
+                self.pool.apply_async(self.fire, (key, count))
+
+
+class PooledHTTPServer(BaseHTTPServer.HTTPServer):
+    """
+    Class for a http server handling requests on a fixed pool of
+    worker threads instead of a thread per request
+    """
+
+    def __init__(self, address, handler, workers=4):
+        BaseHTTPServer.HTTPServer.__init__(self, address, handler)
+        self.requests = Queue.Queue(workers * 64)
+        for _ in range(workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+
+    def process_request(self, request, client_address):
+        self.requests.put((request, client_address))
+
+    def _work(self):
+        while True:
+            request, client_address = self.requests.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+def event_project(event):
+    """
+    Function returns path with namespace of project a gitlab push or
+    merge request event is for, None for other events
+    """
+    kind = event.get("object_kind")
+    if kind == "push":
+        project = event.get("project") or {}
+        return project.get("path_with_namespace")
+    if kind == "merge_request":
+        target = (event.get("object_attributes") or {}).get("target") or {}
+        return (target.get("path_with_namespace") or
+                (event.get("project") or {}).get("path_with_namespace"))
+    return None
+
+
+def make_handler(mapping, coalescer, secret=None):
+    """
+    Function returns a request handler class for gitlab webhooks
+
+    mapping is a dict of project path with namespace to a python list
+    of jenkins job names to build for events of that project
+    """
+
+    class WebhookHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            if secret and self.headers.get("X-Gitlab-Token") != secret:
+                return self.reply(403, "invalid token")
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                event = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self.reply(400, "invalid json")
+            if not isinstance(event, dict):
+                return self.reply(400, "invalid event")
+
+            jobs = mapping.get(event_project(event)) or []
+            for job in jobs:
+                coalescer.add(job)
+            self.reply(202 if jobs else 200,
+                       "queued %d jobs" % len(jobs) if jobs else "ignored")
+
+        def reply(self, code, message):
+            self.send_response(code)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(message)))
+            self.end_headers()
+            self.wfile.write(message)
+
+        def log_message(self, format, *args):
+            # requests are logged only as triggered builds
+            pass
+
+    return WebhookHandler
+
+
+def load_mapping(fpath):
+    """
+    Function loads yaml map of gitlab project paths to a job name or
+    a list of job names, eg:-
+
+        group/website: website-build
+        group/app: [app-build, app-tests]
+    """
+    with open(fpath) as f:
+        data = yaml.safe_load(f) or {}
+    return dict((project, [jobs] if isinstance(jobs, basestring) else jobs)
+                for project, jobs in data.items())